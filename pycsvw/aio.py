@@ -0,0 +1,285 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Asyncio variants of the CSVW conversions (Python 3.5+ only).
+
+The methods here are attached to the CSVW class, blocking work such as reading the
+sources and the NT-serialization is run in an executor and riot is run as an asyncio
+subprocess so that many conversions can share one event loop.
+"""
+import asyncio
+import io
+import os
+import shlex
+from asyncio.subprocess import PIPE
+from tempfile import TemporaryFile, SpooledTemporaryFile
+
+from .sinks import Sink, SinkFile, SINK_QUEUE_BATCHES
+
+
+# Size of the blocks copied between files and riot pipes in a single step
+ASYNC_BLOCK_SIZE = 1 << 16
+# Number of rows serialized in a single step
+ASYNC_BATCH_ROWS = 1000
+
+
+async def open_csvw(*args, **kwargs):
+    """ Create a CSVW object without blocking the event loop.
+    Accepts the arguments of CSVW, except for 'executor' which is the executor
+    in which the metadata and csv sources are read.
+    """
+    from .csvw import CSVW
+    executor = kwargs.pop("executor", None)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, lambda: CSVW(*args, **kwargs))
+
+
+async def _copy_file(loop, executor, path, file_obj):
+    """ Copy the file at path into file_obj block by block in the executor."""
+    with io.open(path, 'rb') as in_file:
+        while True:
+            block = await loop.run_in_executor(executor, in_file.read, ASYNC_BLOCK_SIZE)
+            if not block:
+                break
+            await loop.run_in_executor(executor, file_obj.write, block)
+
+
+def _run_steps(steps, num_steps):
+    """ Advance an iterator of steps by up to num_steps.
+    :return: Whether the iterator has more steps.
+    """
+    for _ in range(num_steps):
+        if next(steps, StopIteration) is StopIteration:
+            return False
+    return True
+
+
+async def _arun_steps(loop, executor, steps):
+    """ Run an iterator of steps, e.g. CSVW._iter_serialize_nt, in the executor ASYNC_BATCH_ROWS
+    steps at a time, so that other coroutines get to run between batches of rows."""
+    while await loop.run_in_executor(executor, _run_steps, steps, ASYNC_BATCH_ROWS):
+        pass
+
+
+async def _copy_spool(loop, executor, csvw, file_obj):
+    """ Copy the spooled NT-serialization of csvw into file_obj block by block in the executor."""
+    start, end = 0, csvw._get_nt_output_size()
+    while start < end:
+        block = await loop.run_in_executor(executor, csvw._read_nt_block, start, end)
+        await loop.run_in_executor(executor, file_obj.write, block)
+        start += len(block)
+
+
+async def _run_riot(loop, executor, cmd, file_obj, csvw=None, nt_range=None):
+    """ Run riot command and stream its output into file_obj. If nt_range is specified,
+    the prefixes and that range of the spooled NT-serialization of csvw are fed into stdin.
+    :return: Tuple of return code and the contents of stderr.
+    """
+    riot_process = await asyncio.create_subprocess_exec(*shlex.split(cmd),
+                                                        stdin=PIPE if nt_range else None,
+                                                        stdout=PIPE, stderr=PIPE)
+
+    async def feed_stdin():
+        """ Write the prefixes and the NT-serialization into stdin of riot."""
+        if nt_range is None:
+            return
+        start, end = nt_range
+        try:
+            riot_process.stdin.write(csvw._get_prefixes_ttl())
+            while start < end:
+                block = await loop.run_in_executor(executor, csvw._read_nt_block, start, end)
+                riot_process.stdin.write(block)
+                await riot_process.stdin.drain()
+                start += len(block)
+        except (BrokenPipeError, ConnectionResetError):
+            # riot exited early, the error is reported from its return code
+            pass
+        finally:
+            riot_process.stdin.close()
+
+    async def copy_stdout():
+        """ Copy stdout of riot into file_obj."""
+        while True:
+            block = await riot_process.stdout.read(ASYNC_BLOCK_SIZE)
+            if not block:
+                break
+            await loop.run_in_executor(executor, file_obj.write, block)
+
+    # Read stderr concurrently so that riot never blocks on a full pipe
+    _, _, err = await asyncio.gather(feed_stdin(), copy_stdout(), riot_process.stderr.read())
+    return await riot_process.wait(), err
+
+
+class _LoopSink(Sink):
+    """ Sink passing the batches written in executor threads to a coroutine of the event loop
+    through a queue of max_batches batches, see _drain_sink."""
+
+    def __init__(self, loop, max_batches=SINK_QUEUE_BATCHES):
+        self.loop = loop
+        self.queue = asyncio.Queue(max(max_batches, 1))
+        self.error = None
+
+    def write_batch(self, data):
+        """ Queue a batch, waiting while the queue is full."""
+        if self.error is not None:
+            raise self.error
+        asyncio.run_coroutine_threadsafe(self.queue.put(data), self.loop).result()
+
+
+async def _call_sink(loop, executor, sink, method, *args):
+    """ Await the coroutine variant of a method of sink if it has one, or run the method in
+    the executor."""
+    coroutine = getattr(sink, "a" + method, None)
+    if coroutine is not None:
+        return await coroutine(*args)
+    return await loop.run_in_executor(executor, getattr(sink, method), *args)
+
+
+async def _drain_sink(loop, executor, loop_sink, sink):
+    """ Write the batches queued in loop_sink into sink until None is queued, then flush it.
+    Batches after an error of the sink are dropped, so that writers never wait forever."""
+    while True:
+        data = await loop_sink.queue.get()
+        if data is None:
+            break
+        if loop_sink.error is None:
+            try:
+                await _call_sink(loop, executor, sink, "write_batch", data)
+            except Exception as exc:  # pylint: disable=broad-except
+                loop_sink.error = exc
+    if loop_sink.error is not None:
+        raise loop_sink.error
+    await _call_sink(loop, executor, sink, "flush")
+
+
+async def ato_rdf_files(self, file_format_tuples, executor=None, close_sinks=False):
+    """ Asyncio variant of to_rdf_files. Sinks among the outputs are fed in the event loop,
+    awaiting their awrite_batch, aflush and aclose coroutines if they have them.
+    :param file_format_tuples: A list of tuples of file-like object or sinks.Sink and format
+    string.
+    :param executor: The executor to run blocking work in, default executor of the loop if None.
+    :param close_sinks: Whether to close the sinks once their outputs are written or the
+    conversion failed, see to_rdf_files.
+    :return: None.
+    """
+    loop = asyncio.get_event_loop()
+    outputs = []
+    sink_tasks = []
+    for file_obj, fmt in file_format_tuples:
+        if isinstance(file_obj, Sink):
+            loop_sink = _LoopSink(loop)
+            sink_tasks.append((SinkFile(loop_sink), loop_sink,
+                               asyncio.ensure_future(_drain_sink(loop, executor, loop_sink,
+                                                                 file_obj)), file_obj))
+            file_obj = sink_tasks[-1][0]
+        outputs.append((file_obj, fmt))
+    # Sinks not flushed or closed yet
+    pending = list(sink_tasks)
+    try:
+        await _awrite_rdf_files(self, loop, outputs, executor)
+        while pending:
+            sink_file, loop_sink, task, sink = pending[0]
+            await loop.run_in_executor(executor, sink_file.flush)
+            await loop_sink.queue.put(None)
+            await task
+            pending.pop(0)
+            if close_sinks:
+                await _call_sink(loop, executor, sink, "close")
+    except Exception:
+        # Stop the coroutines of the remaining sinks, the error of the outputs is raised
+        for _, loop_sink, task, sink in pending:
+            if not task.done():
+                await loop_sink.queue.put(None)
+                await asyncio.gather(task, return_exceptions=True)
+            if close_sinks:
+                await asyncio.gather(_call_sink(loop, executor, sink, "close"),
+                                     return_exceptions=True)
+        raise
+
+
+async def _awrite_rdf_files(self, loop, file_format_tuples, executor):
+    """ Generate rdf serializations into the file objects without blocking the event loop,
+    running the steps planned by CSVW._plan_conversions, see ato_rdf_files."""
+    native_outputs = [(file_obj, fmt) for file_obj, fmt in file_format_tuples
+                      if self._writes_natively(fmt)]
+    if len(native_outputs) < len(file_format_tuples):
+        await _arun_steps(loop, executor, self._iter_serialize_nt())
+    if native_outputs:
+        await _arun_steps(loop, executor, self._iter_write_native(native_outputs))
+    steps = await loop.run_in_executor(executor, self._plan_conversions, file_format_tuples)
+    for step in steps:
+        await _arun_conversion(self, loop, executor, *step)
+    await loop.run_in_executor(executor, self._set_phase, "done")
+
+
+def _close_all(file_objs, paths=()):
+    """ Close the file objects and remove the files at paths."""
+    for file_obj in file_objs:
+        file_obj.close()
+    for path in paths:
+        os.remove(path)
+
+
+async def _arun_conversion(self, loop, executor, step, file_obj, fmt, chunks):
+    """ Asyncio variant of CSVW._run_conversion, riot processes are asyncio subprocesses
+    and blocking work is run in the executor."""
+    if step == "copy":
+        if self._nt_spool is not None:
+            await _copy_spool(loop, executor, self, file_obj)
+        else:
+            await _copy_file(loop, executor, self._nt_output_file, file_obj)
+    elif step == "rdflib":
+        await loop.run_in_executor(executor, self._convert_with_rdflib, file_obj, fmt)
+    elif self._nt_spool is not None:
+        chunk_outputs = await loop.run_in_executor(executor, lambda: [
+            SpooledTemporaryFile(self.spool_max_size, dir=self.temp_dir) for _ in chunks])
+        try:
+            cmd = self._riot_command(fmt)
+            results = await asyncio.gather(*[
+                _run_riot(loop, executor, cmd, out, self, chunk)
+                for chunk, out in zip(chunks, chunk_outputs)])
+            for returncode, err in results:
+                self._check_riot_result(cmd, returncode, err)
+            await loop.run_in_executor(executor, self._concatenate_chunk_outputs,
+                                       file_obj, chunk_outputs)
+        finally:
+            await loop.run_in_executor(executor, _close_all, chunk_outputs)
+    elif len(chunks) > 1:
+        chunk_files = await loop.run_in_executor(executor, self._write_nt_chunks, chunks)
+        chunk_outputs = []
+        try:
+            chunk_outputs = await loop.run_in_executor(executor, lambda: [
+                TemporaryFile(dir=self.temp_dir) for _ in chunk_files])
+            cmds = [self._riot_command(fmt, x) for x in chunk_files]
+            results = await asyncio.gather(*[
+                _run_riot(loop, executor, cmd, out)
+                for cmd, out in zip(cmds, chunk_outputs)])
+            for cmd, (returncode, err) in zip(cmds, results):
+                self._check_riot_result(cmd, returncode, err)
+            await loop.run_in_executor(executor, self._concatenate_chunk_outputs,
+                                       file_obj, chunk_outputs)
+        finally:
+            await loop.run_in_executor(executor, _close_all, chunk_outputs, chunk_files)
+    else:
+        cmd = self._riot_command(fmt, self._nt_output_file)
+        returncode, err = await _run_riot(loop, executor, cmd, file_obj)
+        self._check_riot_result(cmd, returncode, err)
+
+
+async def ato_rdf(self, fmt="turtle", executor=None):
+    """ Asyncio variant of to_rdf, return rdf serialization for the specified format as unicode."""
+    from .rdf_writers import NATIVE_ONLY_FORMATS
+    if fmt.upper() in NATIVE_ONLY_FORMATS:
+        raise ValueError("Format '{}' is binary, use ato_rdf_files instead".format(fmt))
+    out = io.BytesIO()
+    await self.ato_rdf_files([(out, fmt)], executor)
+    return out.getvalue().decode("utf-8")
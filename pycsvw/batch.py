@@ -0,0 +1,139 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Run conversions of many csv files and their metadata on a pool of worker processes. """
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from multiprocessing import Pool
+
+from six import string_types
+
+from .csvw import CSVW
+
+# Keys of a job specification passed to CSVW as they are
+JOB_CSVW_KEYS = ["csv_url", "csv_path", "metadata_url", "csv_encoding"]
+
+# Number of compiled metadata files kept by a worker
+METADATA_CACHE_SIZE = 32
+
+# CSVW options shared by the jobs run by a worker, set by init_worker
+_WORKER_OPTIONS = {}
+# Compiled metadata of the metadata files most recently read by a worker, keyed by their
+# absolute path, modification time and size, least recently used first
+_METADATA_CACHE = OrderedDict()
+
+
+def read_jobs(handle):
+    """ Read job specifications, one JSON object per line.
+    Each job should specify csv_path or csv_url, metadata_path or metadata_url
+    and rdf_dest, a list of pairs of format and destination path. The id of a
+    job defaults to its line number.
+    :param handle: File-like object of the job specifications.
+    :return: A list of dictionaries.
+    """
+    jobs = []
+    for line_num, line in enumerate(handle):
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("Job on line {} should be a JSON object.".format(line_num + 1))
+        if not job.get("rdf_dest"):
+            raise ValueError("Job on line {} should specify 'rdf_dest'.".format(line_num + 1))
+        job.setdefault("id", line_num + 1)
+        jobs.append(job)
+    return jobs
+
+
+def init_worker(options):
+    """ Initialize a worker with the CSVW options shared by all jobs and an empty cache of
+    compiled metadata."""
+    _WORKER_OPTIONS.clear()
+    _WORKER_OPTIONS.update(options)
+    _METADATA_CACHE.clear()
+
+
+def get_compiled_metadata(metadata_path):
+    """ Return the compiled metadata for the file, reading it only if it changed.
+    At most METADATA_CACHE_SIZE compiled metadata files are kept."""
+    stat_info = os.stat(metadata_path)
+    key = (os.path.abspath(metadata_path), stat_info.st_mtime, stat_info.st_size)
+    compiled = _METADATA_CACHE.pop(key, None)
+    if compiled is None:
+        compiled = CSVW.compile_metadata(metadata_path=metadata_path)
+        while len(_METADATA_CACHE) >= METADATA_CACHE_SIZE:
+            _METADATA_CACHE.popitem(last=False)
+    _METADATA_CACHE[key] = compiled
+    return compiled
+
+
+def run_job(job):
+    """ Run a single job.
+    :param job: Job specification as returned by read_jobs.
+    :return: A dictionary reporting the status and timing of the job.
+    """
+    start = time.time()
+    result = {"id": job["id"], "worker": os.getpid()}
+    try:
+        kwargs = dict(_WORKER_OPTIONS)
+        kwargs.update({key: job[key] for key in JOB_CSVW_KEYS if job.get(key)})
+        # Multiple csv files are specified as a list
+        for key in ["csv_url", "csv_path"]:
+            if key in kwargs and not isinstance(kwargs[key], string_types):
+                kwargs[key] = tuple(kwargs[key])
+        if job.get("metadata_path"):
+            kwargs["compiled_metadata"] = get_compiled_metadata(job["metadata_path"])
+
+        with CSVW(**kwargs) as csvw:
+            rdf_files = [(io.open(dest, "wb"), fmt) for fmt, dest in job["rdf_dest"]]
+            try:
+                csvw.to_rdf_files(rdf_files)
+            finally:
+                for rdf_file, _ in rdf_files:
+                    rdf_file.close()
+            if csvw.row_errors is not None:
+                result["row_errors"] = csvw.row_errors.summary()
+        result["status"] = "ok"
+    except Exception as exc:  # pylint: disable=broad-except
+        result["status"] = "error"
+        result["error"] = "{}: {}".format(type(exc).__name__, exc)
+    result["seconds"] = round(time.time() - start, 3)
+    return result
+
+
+def run_batch(jobs, num_workers=1, options=None):
+    """ Run the jobs on a pool of worker processes.
+    Workers are kept alive for all jobs, so that imports and compiled metadata are reused.
+    :param jobs: A list of job specifications as returned by read_jobs.
+    :param num_workers: Number of worker processes, jobs are run in this process if 1.
+    :param options: Dictionary of CSVW options shared by all jobs, e.g. temp_dir.
+    :return: An iterator over the results of run_job, in order of completion.
+    """
+    options = options if options else {}
+    if num_workers <= 1:
+        init_worker(options)
+        for job in jobs:
+            yield run_job(job)
+        return
+
+    pool = Pool(num_workers, initializer=init_worker, initargs=(options,))
+    try:
+        for result in pool.imap_unordered(run_job, jobs):
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,251 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Binary format of dictionary-encoded triples.
+
+The file starts with a header of the magic bytes and the version, followed by blocks of a
+one byte kind and the length of their payload:
+* 'D' blocks add terms to the dictionary, which get consecutive IDs from 0
+* 'T' blocks are triples as consecutive subject, predicate and object IDs, little-endian
+  unsigned 32-bit integers of the terms defined before them
+* 'R' blocks clear the dictionary, IDs start over from 0
+Writers clear the dictionary after the first block at which it has max_terms terms, so
+neither side keeps much more than that many terms in memory. Readers memory-map the file and
+return the IDs of each triples block as an array.
+"""
+import io
+import mmap
+import struct
+import sys
+from array import array
+
+from .triple_handlers import BNODE, LITERAL, URI, Term
+
+MAGIC = b"PYCSVWBT"
+BINARY_VERSION = 1
+HEADER = struct.Struct("<8sI")
+# Kind and payload length of blocks
+BLOCK_HEADER = struct.Struct("<cI")
+TERMS_BLOCK = b"D"
+TRIPLES_BLOCK = b"T"
+RESET_BLOCK = b"R"
+# Kind and length of the UTF-8 value of terms, followed by the ID of the datatype of typed
+# literals or the length and the language tag of literals with a language
+TERM_HEADER = struct.Struct("<BI")
+TERM_COUNT = struct.Struct("<I")
+DATATYPE_ID = struct.Struct("<I")
+LANG_LENGTH = struct.Struct("<B")
+IRI_TERM, BNODE_TERM, LITERAL_TERM, TYPED_LITERAL_TERM, LANG_LITERAL_TERM = range(5)
+# Number of triples in each triples block
+BLOCK_TRIPLES = 1 << 16
+# Number of terms after which the dictionary is cleared
+MAX_TERMS = 1 << 20
+# Typecode of arrays of unsigned 32-bit integers
+ID_TYPECODE = "I" if array("I").itemsize == 4 else "L"
+
+
+def ids_to_bytes(ids):
+    """Get the little-endian bytes of an array of IDs."""
+    if sys.byteorder != "little":
+        ids = array(ID_TYPECODE, ids)
+        ids.byteswap()
+    return ids.tobytes() if hasattr(ids, "tobytes") else ids.tostring()
+
+
+def ids_from_bytes(data):
+    """Get the array of IDs of little-endian bytes."""
+    ids = array(ID_TYPECODE)
+    if hasattr(ids, "frombytes"):
+        ids.frombytes(data)
+    else:
+        ids.fromstring(data)
+    if sys.byteorder != "little":
+        ids.byteswap()
+    return ids
+
+
+class BinaryTriplesWriter(object):
+    """
+    Writer of the binary format of dictionary-encoded triples, see rdf_writers.RDFWriter.
+    Triples are written in blocks of block_triples, each preceded by the terms they
+    introduce. Named graphs are not kept.
+    """
+
+    def __init__(self, output_obj, namespaces=None, graph_iris=None,
+                 block_triples=BLOCK_TRIPLES, max_terms=MAX_TERMS):
+        """
+        :param output_obj: Binary file-like object to write into.
+        :param block_triples: Number of triples in each triples block.
+        :param max_terms: Number of terms after which the dictionary is cleared.
+        """
+        self.output_obj = output_obj
+        self.block_triples = block_triples
+        self.max_terms = max_terms
+        # Terms to their IDs
+        self._ids = {}
+        self._new_terms = []
+        self._triples = array(ID_TYPECODE)
+
+    def _write_block(self, kind, payload):
+        """Write a block."""
+        self.output_obj.write(BLOCK_HEADER.pack(kind, len(payload)))
+        self.output_obj.write(payload)
+
+    def _id(self, term):
+        """Get the ID of a term, adding it to the dictionary if it is new."""
+        term_id = self._ids.get(term)
+        if term_id is not None:
+            return term_id
+        suffix = b""
+        if term.kind == URI:
+            kind = IRI_TERM
+        elif term.kind == BNODE:
+            kind = BNODE_TERM
+        elif term.datatype is not None:
+            kind = TYPED_LITERAL_TERM
+            suffix = DATATYPE_ID.pack(self._id(Term(URI, term.datatype, None, None)))
+        elif term.lang is not None:
+            kind = LANG_LITERAL_TERM
+            lang = term.lang.encode('utf-8')
+            suffix = LANG_LENGTH.pack(len(lang)) + lang
+        else:
+            kind = LITERAL_TERM
+        value = term.value.encode('utf-8')
+        self._new_terms.append(TERM_HEADER.pack(kind, len(value)) + value + suffix)
+        term_id = self._ids[term] = len(self._ids)
+        return term_id
+
+    def _flush(self):
+        """Write the new terms and the triples, and clear the dictionary once it is full."""
+        if self._new_terms:
+            self._write_block(TERMS_BLOCK,
+                              TERM_COUNT.pack(len(self._new_terms)) + b"".join(self._new_terms))
+            self._new_terms = []
+        if self._triples:
+            self._write_block(TRIPLES_BLOCK, ids_to_bytes(self._triples))
+            self._triples = array(ID_TYPECODE)
+        if len(self._ids) >= self.max_terms:
+            self._write_block(RESET_BLOCK, b"")
+            self._ids = {}
+
+    def start(self, md_tables=None):
+        """Write the header."""
+        self.output_obj.write(HEADER.pack(MAGIC, BINARY_VERSION))
+
+    def start_table(self, table_url):
+        """Start the triples of a table."""
+        pass
+
+    def write_triples(self, triples):
+        """Write the triples of a row, flushing a block once it is full."""
+        for subject, predicate, obj in triples:
+            self._triples.append(self._id(subject))
+            self._triples.append(self._id(predicate))
+            self._triples.append(self._id(obj))
+        if len(self._triples) >= 3 * self.block_triples:
+            self._flush()
+
+    def end_table(self):
+        """Finish the triples of a table."""
+        pass
+
+    def finish(self):
+        """Write the last block."""
+        self._flush()
+
+
+class BinaryTriplesReader(object):
+    """
+    Reader of the binary format of dictionary-encoded triples from a memory-mapped file.
+    """
+
+    def __init__(self, path):
+        self._file = io.open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self._file.close()
+            raise ValueError("'{}' is not a binary triples file".format(path))
+        if len(self._map) < HEADER.size or HEADER.unpack_from(self._map, 0)[0] != MAGIC:
+            self.close()
+            raise ValueError("'{}' is not a binary triples file".format(path))
+        version = HEADER.unpack_from(self._map, 0)[1]
+        if version != BINARY_VERSION:
+            self.close()
+            raise ValueError("Unsupported binary triples version {} in '{}'".format(version, path))
+        # Terms of the dictionary by their IDs
+        self.terms = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+    def _read_terms(self, pos):
+        """Add the terms of a terms block at pos to the dictionary."""
+        data = self._map
+        num_terms = TERM_COUNT.unpack_from(data, pos)[0]
+        pos += TERM_COUNT.size
+        for _ in range(num_terms):
+            kind, length = TERM_HEADER.unpack_from(data, pos)
+            pos += TERM_HEADER.size
+            value = data[pos:pos + length].decode('utf-8')
+            pos += length
+            if kind == IRI_TERM:
+                term = Term(URI, value, None, None)
+            elif kind == BNODE_TERM:
+                term = Term(BNODE, value, None, None)
+            elif kind == TYPED_LITERAL_TERM:
+                datatype = self.terms[DATATYPE_ID.unpack_from(data, pos)[0]].value
+                pos += DATATYPE_ID.size
+                term = Term(LITERAL, value, datatype, None)
+            elif kind == LANG_LITERAL_TERM:
+                lang_length = LANG_LENGTH.unpack_from(data, pos)[0]
+                pos += LANG_LENGTH.size
+                term = Term(LITERAL, value, None, data[pos:pos + lang_length].decode('utf-8'))
+                pos += lang_length
+            else:
+                term = Term(LITERAL, value, None, None)
+            self.terms.append(term)
+
+    def iter_blocks(self):
+        """Iterate over the triples blocks.
+        :return: An iterator over arrays of consecutive subject, predicate and object IDs,
+        which are indexes into terms until the next block is read.
+        """
+        data = self._map
+        pos = HEADER.size
+        while pos < len(data):
+            kind, length = BLOCK_HEADER.unpack_from(data, pos)
+            pos += BLOCK_HEADER.size
+            if kind == TERMS_BLOCK:
+                self._read_terms(pos)
+            elif kind == TRIPLES_BLOCK:
+                yield ids_from_bytes(data[pos:pos + length])
+            elif kind == RESET_BLOCK:
+                self.terms = []
+            else:
+                raise ValueError("Unknown block kind {!r} at offset {}".format(kind, pos))
+            pos += length
+
+    def iter_triples(self):
+        """Iterate over the triples as tuples of subject, predicate and object Terms."""
+        for ids in self.iter_blocks():
+            terms = self.terms
+            for ind in range(0, len(ids), 3):
+                yield terms[ids[ind]], terms[ids[ind + 1]], terms[ids[ind + 2]]
@@ -0,0 +1,133 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checkpoints of NT-serializations to resume long conversions.
+
+A checkpoint records the table and the number of the last row whose triples are in the
+output along with the length of the output at that point. Both the output and the
+checkpoint are synced to disk before the checkpoint is replaced, so a checkpoint never
+refers to triples that were not written. Resuming truncates the output, and the file of
+quarantined rows, to the recorded lengths and continues from the next row. The signatures of
+the csv files are recorded as well, so that a checkpoint is not resumed once they changed.
+"""
+import io
+import json
+import os
+
+from six import text_type
+
+# Number of rows between checkpoints
+CHECKPOINT_ROWS = 100000
+CHECKPOINT_VERSION = 2
+# Suffix of the NT-serialization kept next to the checkpoint
+CHECKPOINT_OUTPUT_SUFFIX = ".nt"
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def load_checkpoint(path):
+    """Load a checkpoint.
+    :return: The checkpoint as a dictionary, None if there is none at path.
+    """
+    if not os.path.exists(path):
+        return None
+    with io.open(path, 'r', encoding="utf-8") as checkpoint_file:
+        state = json.load(checkpoint_file)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError("Unsupported checkpoint version in '{}'".format(path))
+    return state
+
+
+class Checkpointer(object):
+    """
+    Records checkpoints of an NT-serialization of tables every so many rows, see
+    nt_serializer.serialize.
+    """
+
+    def __init__(self, path, table_urls, every_rows=CHECKPOINT_ROWS, state=None,
+                 signatures=None):
+        """
+        :param path: Path of the checkpoint file.
+        :param table_urls: Urls of the serialized tables, in order.
+        :param every_rows: Number of rows between checkpoints.
+        :param state: Checkpoint to resume from, see load_checkpoint.
+        :param signatures: List of the signatures of the csv files of the tables, see
+        row_index.get_signature, None for tables not read from files.
+        """
+        signatures = signatures if signatures is not None else [None] * len(table_urls)
+        if state is not None:
+            if state["tables"] != table_urls:
+                raise ValueError("Checkpoint '{}' is of the tables {}, not {}".format(
+                    path, state["tables"], table_urls))
+            for table_url, old, new in zip(table_urls, state["signatures"], signatures):
+                if old != new:
+                    raise ValueError("The csv file of '{}' changed since checkpoint '{}'".format(
+                        table_url, path))
+        self.path = path
+        self.table_urls = table_urls
+        self.every_rows = every_rows
+        self.resumed = state is not None
+        self.state = state if state is not None else {
+            "version": CHECKPOINT_VERSION, "tables": table_urls, "signatures": signatures,
+            "table_index": 0, "row": 0, "output_bytes": 0, "reject_bytes": 0, "complete": False}
+        # File of the quarantined rows whose length is recorded with each checkpoint
+        self.reject_file = None
+        self._rows_since = 0
+
+    @property
+    def complete(self):
+        """Whether all the tables have been serialized."""
+        return self.state["complete"]
+
+    def get_resume_row(self, table_ind):
+        """Get the number of the row to resume a table from.
+        :return: The row number, 1 for tables not started yet and None for finished tables.
+        """
+        if self.complete or table_ind < self.state["table_index"]:
+            return None
+        if table_ind > self.state["table_index"]:
+            return 1
+        return self.state["row"] + 1
+
+    def _save(self, output_obj):
+        """Sync the output and the reject file and replace the checkpoint with the current
+        state."""
+        output_obj.flush()
+        os.fsync(output_obj.fileno())
+        self.state["output_bytes"] = output_obj.tell()
+        if self.reject_file is not None:
+            self.reject_file.flush()
+            os.fsync(self.reject_file.fileno())
+            self.state["reject_bytes"] = os.fstat(self.reject_file.fileno()).st_size
+        temp_path = self.path + ".tmp"
+        with io.open(temp_path, 'w', encoding="utf-8") as checkpoint_file:
+            checkpoint_file.write(text_type(json.dumps(self.state, sort_keys=True)))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        _replace(temp_path, self.path)
+        self._rows_since = 0
+
+    def add_row(self, output_obj, table_ind, row_num):
+        """Record that the triples of a row are in the output, saving a checkpoint every
+        every_rows rows."""
+        self.state["table_index"] = table_ind
+        self.state["row"] = int(row_num)
+        self._rows_since += 1
+        if self._rows_since >= self.every_rows:
+            self._save(output_obj)
+
+    def finish_table(self, output_obj, table_ind):
+        """Record that all rows of a table are in the output."""
+        self.state["table_index"] = table_ind + 1
+        self.state["row"] = 0
+        self.state["complete"] = self.state["table_index"] >= len(self.table_urls)
+        self._save(output_obj)
@@ -10,33 +10,190 @@
 # limitations under the License.
 
 """ Define CSVW class """
+import bisect
 import io
 import logging
 import json
 import os
-from tempfile import gettempdir, NamedTemporaryFile
+import re
+import shutil
+from contextlib import contextmanager
+from tempfile import gettempdir, NamedTemporaryFile, TemporaryFile, SpooledTemporaryFile
+from threading import Lock, Thread
 from subprocess import Popen, PIPE
 import shlex
 import warnings
 from distutils.spawn import find_executable
 import stat
+import sys
+import time
 
-from six.moves.urllib.request import urlopen  # pylint: disable=import-error
+from six.moves.urllib.parse import urljoin  # pylint: disable=import-error
+from six.moves.urllib.request import pathname2url, urlopen  # pylint: disable=import-error
 from six import string_types
-from rdflib import Graph
+from rdflib import Graph, URIRef, BNode
 from past.builtins import basestring
 
-from . import nt_serializer
+from . import checkpoint, nt_serializer, nt_sort, rdf_writers, row_index, sharding
+from .triple_handlers import GraphBuilder, TermCollector, GRAPH_BATCH_SIZE, TRIPLE_BATCH_SIZE
+from .rdf_utils import is_row_invariant
+from .graph_store import GraphStoreWriter
+from .metrics import ConversionMetrics, METRICS_INTERVAL
+from .progress import Progress, PROGRESS_INTERVAL
+from .row_errors import RowErrors, ON_ERROR_POLICIES
+from .sinks import Sink, open_sink_file
 from .csvw_exceptions import NoDefaultOrValueUrlError, \
     BothDefaultAndValueUrlError, BothLangAndDatatypeError, \
     VirtualColumnPrecedesNonVirtualColumn, RiotWarning, RiotError
 
 READ_PERMISSIONS = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+NT_FORMATS = ["NT", "N-TRIPLE", "N-TRIPLES"]
+# Formats whose riot outputs for separate chunks of NT can be concatenated
+# once the prefix declarations of all but the first chunk are dropped
+CONCATENABLE_FORMATS = ["TURTLE", "TTL", "N3", "TRIG", "NQUADS", "N-QUADS", "NQ"]
+PREFIX_LINE_PATTERN = re.compile(br"^(@prefix|@base|PREFIX|BASE)\b|^\s*$")
+# Size of the blocks used when copying files around
+COPY_BLOCK_SIZE = 1 << 20
+# The 'native' backend writes the formats in rdf_writers.NATIVE_FORMATS directly from the
+# csv files and converts the others with riot
+BACKENDS = ["riot", "rdflib", "auto", "native"]
+# Estimated number of triples below which the 'auto' backend converts in-process,
+# since starting the JVM for riot dominates the conversion time of small outputs
+AUTO_BACKEND_THRESHOLD = 5000
+# Number of characters of each csv file read to estimate its number of rows
+ROW_ESTIMATE_SAMPLE_SIZE = 1 << 16
+# rdflib serialization formats for the formats riot is called with
+RDFLIB_FORMATS = {
+    "TURTLE": "turtle",
+    "TTL": "turtle",
+    "N3": "n3",
+    "RDF": "pretty-xml",
+    "XML": "pretty-xml",
+    "RDFXML": "pretty-xml",
+    "RDF/XML": "pretty-xml",
+    "JSON-LD": "json-ld",
+    "JSONLD": "json-ld",
+    "TRIG": "trig",
+    "NQUADS": "nquads",
+    "N-QUADS": "nquads",
+    "NQ": "nquads"
+}
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TableSource(object):
+    """ Source of the csv file of a table, specified by exactly one of a path, a url,
+    a file-like object or its contents. Paths and urls are opened or fetched only
+    when the source is opened and closed right after, file-like objects are owned
+    by the caller and only closed through close.
+    """
+
+    def __init__(self, path=None, url=None, handle=None, contents=None, encoding="utf-8",
+                 row_index_stride=None):
+        self.path = path
+        self.url = url
+        self.handle = handle
+        self.contents = contents
+        self.encoding = encoding
+        # Rows between the offsets of the row index of a csv file on disk, None for no index
+        self.row_index_stride = row_index_stride
+        # Number of row indexes loaded from their sidecar files and built
+        self.row_index_hits = 0
+        self.row_index_misses = 0
+
+    @contextmanager
+    def open(self):
+        """ Open the csv file for reading from its beginning.
+        :return: A context manager yielding a file-like object in text mode.
+        """
+        if self.handle is not None:
+            self.handle.seek(0)
+            yield self.handle
+        elif self.path is not None:
+            with io.open(self.path, 'r', encoding=self.encoding) as handle:
+                yield handle
+        else:
+            contents = self.contents
+            if contents is None:
+                contents = urlopen(self.url).read()
+            if isinstance(contents, bytes):
+                contents = contents.decode(self.encoding)
+            with io.StringIO(contents) as handle:
+                yield handle
+
+    @contextmanager
+    def open_at_row(self, row_num=None):
+        """ Open the csv file for reading from the closest row at or before row_num that
+        the row index of the file locates, from its beginning if there is no row index.
+        :param row_num: Number of the row to read from, starting from 1.
+        :return: A context manager yielding a tuple of a file-like object in text mode and
+        the number of the row it is positioned at, None if it is at the beginning.
+        """
+        location = None
+        if self.path is not None and self.row_index_stride and row_num and row_num > 1 and \
+                row_index.supports_encoding(self.encoding):
+            index = row_index.get_row_index(self.path, self.row_index_stride)
+            if index.from_sidecar:
+                self.row_index_hits += 1
+            else:
+                self.row_index_misses += 1
+            location = index.locate(row_num)
+        if location is None:
+            with self.open() as handle:
+                yield handle, None
+            return
+        first_row, offset = location
+        with io.open(self.path, 'rb') as raw:
+            raw.seek(offset)
+            with io.TextIOWrapper(raw, encoding=self.encoding) as handle:
+                yield handle, first_row
+
+    def size(self):
+        """ Return the size of the csv file, None if it is only known after it is fetched."""
+        if self.path is not None:
+            return os.path.getsize(self.path)
+        if self.contents is not None:
+            return len(self.contents)
+        if self.handle is not None:
+            if hasattr(self.handle, "fileno"):
+                try:
+                    return os.fstat(self.handle.fileno()).st_size
+                except (OSError, io.UnsupportedOperation):
+                    pass
+            self.handle.seek(0, io.SEEK_END)
+            size = self.handle.tell()
+            self.handle.seek(0)
+            return size
+        return None
+
+    def picklable(self):
+        """ Return an equivalent source that can be passed to a worker process.
+        A file-like object is replaced by its path if it is a file on disk,
+        by its contents otherwise.
+        """
+        if self.handle is None:
+            return self
+        name = getattr(self.handle, "name", None)
+        if isinstance(name, string_types) and os.path.isfile(name):
+            return TableSource(path=name, encoding=getattr(self.handle, "encoding", self.encoding),
+                               row_index_stride=self.row_index_stride)
+        with self.open() as handle:
+            return TableSource(contents=handle.read())
+
+    def close(self):
+        """ Close the file-like object if the source was specified by one."""
+        if self.handle is not None:
+            self.handle.close()
 
 
 class CSVW(object):
     """ CSVW class to generate rdf/json given csv and its metadata. """
 
+    if sys.version_info >= (3, 5):
+        # Asyncio variants of to_rdf_files and to_rdf
+        from .aio import ato_rdf_files, ato_rdf  # pylint: disable=import-outside-toplevel
+
     @staticmethod
     def _read_metadata(handle):
         """ Read metadata json file.
@@ -93,6 +250,9 @@ class CSVW(object):
 
                 col["aboutUrl"] = col.get("aboutUrl", None)
                 col["suppressOutput"] = col.get("suppressOutput", False)
+                # Triples of row-invariant virtual columns are generated once per table
+                col["rowInvariant"] = col["virtual"] and is_row_invariant(
+                    col, table_schema["aboutUrl"])
             # Non-virtual columns should precede virtual columns
             virtual_seen_yet = False
             for col in table_schema["columns"]:
@@ -123,8 +283,39 @@ class CSVW(object):
 
         return metadata_handle
 
-    def _read_tables(self, table_urls, csv_url, csv_path, csv_handle, csv_encoding):
-        """Read the CSV file(s) into tables"""
+    @classmethod
+    def compile_metadata(cls, metadata_url=None, metadata_path=None, metadata_handle=None):
+        """ Read the metadata and extract its namespaces.
+        The result can be passed as compiled_metadata to multiple CSVW objects
+        to avoid reading the same metadata again.
+        :return: A tuple of namespaces dictionary and metadata dictionary.
+        """
+        metadata_handle = cls._get_metadata_handle(metadata_url, metadata_path, metadata_handle)
+
+        # Extract namespaces from metadata
+        # Note that this throws warnings since curly braces are not valid URIs,
+        # disable those warnings temporarily
+        logging.disable(logging.WARNING)
+        graph = Graph().parse(data=metadata_handle.read(), format="json-ld")
+        logging.disable(logging.NOTSET)
+        # Convert it into a dictionary
+        namespaces = {prefix: url.toPython() for prefix, url in graph.namespaces()}
+        # Set it back to the beginning of file
+        metadata_handle.seek(0)
+
+        # Read metadata - csv_url does not need to be passed if it is a list, since
+        # urls have to be specified in metadata in that case anyhow.
+        try:
+            metadata = cls._read_metadata(metadata_handle)
+        finally:
+            metadata_handle.close()
+        return namespaces, metadata
+
+    def _read_tables(self, table_urls, csv_url, csv_path, csv_handle, csv_encoding,
+                     row_index_stride=None):
+        """Map the table(s) to the sources of their CSV file(s), which are opened
+        only when the tables are serialized. CSV files on disk use row indexes
+        with row_index_stride if it is specified."""
 
         csv_args = (csv_url, csv_path, csv_handle)
         len_csv_args = len([x for x in csv_args if x])
@@ -178,57 +369,165 @@ class CSVW(object):
         for table_url in table_urls:
             if specified_by_path:
                 if isinstance(csv_path, basestring):
-                    this_csv_handle = io.open(csv_path, 'r', encoding=csv_encoding)
+                    source = TableSource(path=csv_path, encoding=csv_encoding,
+                                         row_index_stride=row_index_stride)
                 else:
                     # Find this one
                     csv_ind = file_names.index(table_url)
-                    this_csv_handle = io.open(csv_path[csv_ind], 'r', encoding=csv_encoding)
+                    source = TableSource(path=csv_path[csv_ind], encoding=csv_encoding,
+                                         row_index_stride=row_index_stride)
             elif specified_by_url:
-                url_resp = urlopen(table_url)
-                this_csv_handle = io.StringIO(url_resp.read())
+                source = TableSource(url=table_url, encoding=csv_encoding)
             else:
-                this_csv_handle = csv_handle[handle_offset]
+                source = TableSource(handle=csv_handle[handle_offset],
+                                     row_index_stride=row_index_stride)
                 handle_offset += 1
-            self._tables[table_url] = this_csv_handle
+            self._tables[table_url] = source
 
     def __init__(self, csv_url=None, csv_path=None, csv_handle=None,
                  metadata_url=None, metadata_path=None, metadata_handle=None,
-                 csv_encoding="utf-8", temp_dir=None, riot_path=None):
+                 csv_encoding="utf-8", temp_dir=None, riot_path=None, riot_jobs=1,
+                 backend="riot", auto_backend_threshold=AUTO_BACKEND_THRESHOLD,
+                 compiled_metadata=None, table_jobs=1, spool_max_size=None,
+                 blank_nodes="random", skolem_base=None, per_row_invariants=False,
+                 sort_by=None, unique=False, sort_memory=nt_sort.SORT_MEMORY, sort_jobs=1,
+                 row_start=None, row_end=None, columns=None, exclude_columns=None,
+                 row_index=False, row_index_stride=row_index.ROW_INDEX_STRIDE,
+                 checkpoint_path=None, checkpoint_rows=checkpoint.CHECKPOINT_ROWS, resume=False,
+                 on_error="fail", reject_path=None, max_errors=None, progress=None,
+                 progress_interval=PROGRESS_INTERVAL, metrics_path=None,
+                 metrics_interval=METRICS_INTERVAL, graph_iris=None):
+        if backend not in BACKENDS:
+            raise ValueError("backend should be one of {}, not '{}'".format(BACKENDS, backend))
+        if blank_nodes not in nt_serializer.BLANK_NODES:
+            raise ValueError("blank_nodes should be one of {}, not '{}'".format(
+                nt_serializer.BLANK_NODES, blank_nodes))
+        if blank_nodes == "skolem" and not skolem_base:
+            raise ValueError("skolem_base is required for blank_nodes='skolem'")
+        if row_start is not None and row_start < 1:
+            raise ValueError("row_start should be at least 1")
+        if row_end is not None and row_end < (row_start if row_start else 1):
+            raise ValueError("row_end should not be less than row_start")
+        if row_index and row_index_stride < 1:
+            raise ValueError("row_index_stride should be at least 1")
+        if checkpoint_path is not None and spool_max_size is not None:
+            raise ValueError("checkpoint_path can not be used with spool_max_size")
+        if resume and checkpoint_path is None:
+            raise ValueError("checkpoint_path is required to resume")
+        if on_error not in ON_ERROR_POLICIES:
+            raise ValueError("on_error should be one of {}, not '{}'".format(
+                ON_ERROR_POLICIES, on_error))
+        if on_error == "quarantine" and not reject_path:
+            raise ValueError("reject_path is required for on_error='quarantine'")
+        if sort_by is not None and sort_by not in nt_sort.SORT_KEYS:
+            raise ValueError("sort_by should be one of {}, not '{}'".format(
+                nt_sort.SORT_KEYS, sort_by))
         self.temp_dir = temp_dir if temp_dir else gettempdir()
         self.riot_path = riot_path if riot_path else "riot"
+        # Number of riot processes to run in parallel for concatenable formats
+        self.riot_jobs = riot_jobs
+        # Backend converting NT-serialization to other formats, 'auto' chooses
+        # rdflib when the estimated number of triples is below auto_backend_threshold
+        self.backend = backend
+        self.auto_backend_threshold = auto_backend_threshold
+        # Backend used for the last conversion and the reason it was chosen
+        self.chosen_backend = None
+        self.backend_reason = None
+        # Table urls to the IRIs of their named graphs in native outputs, the table urls
+        # resolved against the location of the metadata by default
+        self.graph_iris = graph_iris if graph_iris is not None else {}
+        if metadata_url:
+            self._metadata_location = metadata_url
+        elif metadata_path:
+            self._metadata_location = urljoin("file:",
+                                              pathname2url(os.path.abspath(metadata_path)))
+        else:
+            self._metadata_location = None
+        self._estimated_triples = None
+        # Keep intermediate files in memory up to spool_max_size bytes if specified,
+        # riot then reads them through a pipe instead of temporary files
+        self.spool_max_size = spool_max_size
         self._nt_output_file = None
+        # Whether the nt output file is the checkpointed one kept after close
+        self._keep_nt_output = False
+        self._nt_spool = None
+        self._nt_spool_lock = Lock()
+        # Number of worker processes to serialize multiple tables in parallel
+        self.table_jobs = table_jobs
+        # Sort the NT-serialization by subject or whole triples and/or drop duplicate triples,
+        # in runs of at most sort_memory bytes merged by sort_jobs worker processes
+        self.sort_by = sort_by
+        self.unique = unique
+        self.sort_memory = sort_memory
+        self.sort_jobs = sort_jobs
+        # Options passed to NT-serialization of each table, blank nodes are derived
+        # from the contents of their rows unless they are random and triples of
+        # row-invariant virtual columns are written once per table unless per_row_invariants
+        # Only the rows from row_start to row_end and the columns in columns but
+        # not in exclude_columns generate triples if specified
+        self._serialize_options = {"blank_nodes": blank_nodes, "skolem_base": skolem_base,
+                                   "per_row_invariants": per_row_invariants,
+                                   "row_start": row_start, "row_end": row_end,
+                                   "columns": set(columns) if columns else None,
+                                   "exclude_columns": set(exclude_columns) if exclude_columns
+                                                      else None}
+        # Record a checkpoint every checkpoint_rows rows into checkpoint_path while serializing
+        # into a file next to it, which is kept after close, and continue from it if resume
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_rows = checkpoint_rows
+        self.resume = resume
+        # Rows failing to serialize abort it unless on_error is 'skip' or 'quarantine', then
+        # they are recorded into row_errors, written into reject_path if quarantined, until
+        # there are more than max_errors of them
+        self.on_error = on_error
+        self.reject_path = reject_path
+        self.max_errors = max_errors
+        self.row_errors = None
+        # Pass reports of the progress of conversions to the progress callback at most
+        # once every progress_interval seconds, see progress.Progress
+        # Write metrics of conversions into the textfile metrics_path when their phases start,
+        # at most once every metrics_interval seconds during them and on close
+        self._metrics = ConversionMetrics(metrics_path, metrics_interval) if metrics_path else None
+        self._progress = None
+        if progress or self._metrics is not None:
+            callbacks = [x for x in [progress, self._metrics and self._metrics.on_progress] if x]
+
+            def report_progress(report):
+                """ Pass progress reports to the progress callback and the metrics."""
+                for callback in callbacks:
+                    callback(report)
+            self._progress = Progress(report_progress, progress_interval)
+        # Byte offsets in the nt output file where rows start
+        self._nt_row_offsets = nt_serializer.RowOffsets()
         self._prefixes_ttl_file = None
-        self._namespaces = {}
-        # tables is a dictionary from table url to a file-like obj for csv file
+        # tables is a dictionary from table url to the TableSource of its csv file
         self._tables = {}
         # Put csv_handle into a list if it is specified
         if not isinstance(csv_handle, (list, set, tuple)) and csv_handle is not None:
             csv_handle = [csv_handle]
 
-        metadata_handle = self._get_metadata_handle(metadata_url, metadata_path, metadata_handle)
-
-        # Extract namespaces from metadata
-        # Note that this throws warnings since curly braces are not valid URIs,
-        # disable those warnings temporarily
-        logging.disable(logging.WARNING)
-        graph = Graph().parse(data=metadata_handle.read(), format="json-ld")
-        logging.disable(logging.NOTSET)
-        # Convert it into a dictionary
-        self._namespaces = {prefix: url.toPython() for prefix, url in graph.namespaces()}
-        # Set it back to the beginning of file
-        metadata_handle.seek(0)
-
-        # Read metadata - csv_url does not need to be passed if it is a list, since
-        # urls have to be specified in metadata in that case anyhow.
-        try:
-            self._metadata = self._read_metadata(metadata_handle)
-        finally:
-            metadata_handle.close()
+        if compiled_metadata is None:
+            metadata_start = time.time()
+            compiled_metadata = self.compile_metadata(metadata_url, metadata_path, metadata_handle)
+            if self._metrics is not None:
+                self._metrics.observe_phase("metadata", time.time() - metadata_start)
+        self._namespaces, self._metadata = compiled_metadata
         # Get the table url(s), this will be used to map tables to corresponding metadata
         table_urls = [x["url"] for x in self._metadata["tables"]]
+        self._check_column_names(set(columns or []) | set(exclude_columns or []))
 
-        # Read the table(s)
-        self._read_tables(table_urls, csv_url, csv_path, csv_handle, csv_encoding)
+        # Read the table(s), csv files on disk are read from row_start through
+        # their row index sidecar files if row_index
+        self._read_tables(table_urls, csv_url, csv_path, csv_handle, csv_encoding,
+                          row_index_stride if row_index else None)
+
+    def _check_column_names(self, names):
+        """ Check that the names of projected columns exist in the metadata."""
+        known_names = {nt_serializer.get_column_name(col) for table in self._metadata["tables"]
+                       for col in table["tableSchema"]["columns"]}
+        unknown_names = names - known_names
+        if unknown_names:
+            raise ValueError("Columns {} are not in the metadata".format(sorted(unknown_names)))
 
     def __enter__(self):
         return self
@@ -237,80 +536,752 @@ class CSVW(object):
         self.close()
 
     def close(self):
-        # Close all csv handles
+        # Close csv handles specified by the caller, other sources are closed after reading
         for t in self._tables:
             self._tables[t].close()
 
         # Remove temporary files
-        if self._nt_output_file:
+        if self._nt_spool:
+            self._nt_spool.close()
+        if self._nt_output_file and not self._keep_nt_output:
             os.remove(self._nt_output_file)
         if self._prefixes_ttl_file:
             os.remove(self._prefixes_ttl_file)
+        if self._metrics is not None:
+            self._metrics.write()
 
-    def to_rdf_files(self, file_format_tuples):
-        """ Generate rdf serializations for specified formats into the specified file objects.
-        :param file_format_tuples: A list of tuples of file-like object and format string. Example:
-        [(ttl_file_obj, "turtle"), (nt_file_obj, "nt")]
-        :return: None.
+    def _estimate_num_triples(self):
+        """ Estimate the number of triples to generate from the size of the csv files
+        and the number of columns in their metadata."""
+        if self._estimated_triples is not None:
+            return self._estimated_triples
+
+        num_triples = 0
+        for metadata in self._metadata["tables"]:
+            if metadata["suppressOutput"]:
+                continue
+            source = self._tables[metadata["url"]]
+            num_columns = sum([1 for x in metadata["tableSchema"]["columns"]
+                               if not x["suppressOutput"]])
+            size = source.size()
+            if size is None:
+                # Do not fetch remote csv files again, count the triples generated instead
+                return self._count_nt_triples()
+            with source.open() as handle:
+                sample = handle.read(ROW_ESTIMATE_SAMPLE_SIZE)
+            if len(sample) < ROW_ESTIMATE_SAMPLE_SIZE:
+                size = len(sample)
+            num_lines = sample.count("\n") + (1 if sample and not sample.endswith("\n") else 0)
+            # Exclude the header from the number of rows
+            num_rows = max(num_lines * size // max(len(sample), 1) - 1, 0)
+            num_triples += num_rows * num_columns
+
+        self._estimated_triples = num_triples
+        return num_triples
+
+    def _count_nt_triples(self):
+        """ Estimate the number of triples in the NT-serialization from a sample of its lines."""
+        size = self._get_nt_output_size()
+        with self._open_nt_output() as nt_file:
+            sample = nt_file.read(ROW_ESTIMATE_SAMPLE_SIZE)
+        self._estimated_triples = sample.count(b"\n") * size // max(len(sample), 1)
+        return self._estimated_triples
+
+    def _writes_natively(self, fmt):
+        """ Check if fmt is written directly from the csv files rather than converted from the
+        NT-serialization, which sorted outputs always are unless fmt is only written natively."""
+        if fmt.upper() in rdf_writers.NATIVE_ONLY_FORMATS:
+            if self.sort_by or self.unique:
+                raise ValueError("Format '{}' can not be sorted".format(fmt))
+            return True
+        return self.backend == "native" and fmt.upper() in rdf_writers.NATIVE_FORMATS and \
+            not (self.sort_by or self.unique)
+
+    def _choose_backend(self, fmt):
+        """ Choose the backend to convert the NT-serialization into fmt and record why."""
+        if fmt.upper() in rdf_writers.NATIVE_ONLY_FORMATS:
+            backend, reason = "native", "format '{}' is only written natively".format(fmt)
+        elif self._writes_natively(fmt):
+            backend, reason = "native", "backend='native' requested"
+        elif self.backend == "native":
+            backend = "riot"
+            reason = "format '{}' is not written natively".format(fmt) \
+                if fmt.upper() not in rdf_writers.NATIVE_FORMATS \
+                else "sorted outputs are converted from the NT-serialization"
+        elif self.backend != "auto":
+            backend, reason = self.backend, "backend='{}' requested".format(self.backend)
+        elif fmt.upper() not in RDFLIB_FORMATS:
+            backend, reason = "riot", "format '{}' is not supported by rdflib".format(fmt)
+        elif find_executable(self.riot_path) is None:
+            backend, reason = "rdflib", "'{}' could not be located".format(self.riot_path)
+        else:
+            num_triples = self._estimate_num_triples()
+            if num_triples < self.auto_backend_threshold:
+                backend = "rdflib"
+                reason = "estimated {} triples below threshold {}".format(
+                    num_triples, self.auto_backend_threshold)
+            else:
+                backend = "riot"
+                reason = "estimated {} triples at or above threshold {}".format(
+                    num_triples, self.auto_backend_threshold)
+
+        self.chosen_backend, self.backend_reason = backend, reason
+        LOGGER.info("Converting to '%s' with %s: %s", fmt, backend, reason)
+        return backend
+
+    def _convert_with_rdflib(self, file_obj, fmt):
+        """ Convert the NT-serialization into fmt in-process with rdflib."""
+        rdflib_fmt = RDFLIB_FORMATS.get(fmt.upper())
+        if rdflib_fmt is None:
+            raise ValueError("Format '{}' is not supported by rdflib backend".format(fmt))
+        parsed = Graph()
+        with self._open_nt_output() as nt_file:
+            parsed.parse(data=nt_file.read().decode("utf-8"), format="nt")
+
+        # Blank nodes are written as <_:label> for riot, turn them back into blank nodes
+        def to_node(term):
+            """ Return the blank node for the '_:' prefixed IRIs."""
+            if isinstance(term, URIRef) and term.startswith("_:"):
+                return BNode(term[2:])
+            return term
+
+        graph = Graph()
+        for pre, url in self._namespaces.items():
+            graph.bind(pre, url, override=True)
+        for subj, pred, obj in parsed:
+            graph.add((to_node(subj), pred, to_node(obj)))
+        graph.serialize(destination=file_obj, format=rdflib_fmt, encoding="utf-8")
+
+    def _riot_command(self, fmt, nt_path=None):
+        """ Return the riot command converting the nt file at nt_path to the specified format.
+        If nt_path is None, riot reads the prefixes followed by NT-serialization from stdin."""
+        # Translate RDF to RDFXML and XML to RDFXML
+        fmt = "RDFXML" if fmt.upper() == "RDF" or fmt.upper() == "XML" else fmt
+        if nt_path is None:
+            return self.riot_path + " --syntax=TTL --formatted='{}'".format(fmt)
+        prefixes = self._prefixes_ttl_file + " " if self._namespaces != {} else ""
+        return self.riot_path + " --formatted='{}' {} {}".format(fmt, prefixes, nt_path)
+
+    @contextmanager
+    def _open_nt_output(self):
+        """ Open the NT-serialization for reading in binary mode."""
+        if self._nt_spool is not None:
+            with self._nt_spool_lock:
+                self._nt_spool.seek(0)
+                yield self._nt_spool
+        else:
+            with io.open(self._nt_output_file, 'rb') as nt_file:
+                yield nt_file
+
+    def _get_nt_output_size(self):
+        """ Return the size of the NT-serialization in bytes."""
+        if self._nt_spool is not None:
+            with self._nt_spool_lock:
+                self._nt_spool.seek(0, io.SEEK_END)
+                return self._nt_spool.tell()
+        return os.path.getsize(self._nt_output_file)
+
+    def _read_nt_block(self, start, end):
+        """ Read a block of at most COPY_BLOCK_SIZE bytes of the spooled NT-serialization
+        from start, but not beyond end. Blocks can be read from multiple threads."""
+        with self._nt_spool_lock:
+            self._nt_spool.seek(start)
+            return self._nt_spool.read(min(COPY_BLOCK_SIZE, end - start))
+
+    def _get_prefixes_ttl(self):
+        """ Return the prefixes in turtle format."""
+        return u"".join(u"@prefix {}: <{}> .\n".format(pre, url)
+                        for pre, url in self._namespaces.items()).encode('utf-8')
+
+    def _feed_riot(self, riot_stdin, start, end):
+        """ Write the prefixes and the range of spooled NT-serialization into stdin of riot."""
+        try:
+            riot_stdin.write(self._get_prefixes_ttl())
+            while start < end:
+                block = self._read_nt_block(start, end)
+                riot_stdin.write(block)
+                start += len(block)
+        except (IOError, OSError):
+            # riot exited early, the error is reported from its return code
+            pass
+        finally:
+            try:
+                riot_stdin.close()
+            except (IOError, OSError):
+                pass
+
+    @staticmethod
+    def _get_fileno(file_obj):
+        """ Return the file descriptor of file_obj or None if it does not have one."""
+        try:
+            return file_obj.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return None
+
+    def _run_riot_piped(self, fmt, file_obj, start, end):
+        """ Run riot on the range of the spooled NT-serialization fed through a pipe.
+        :return: A tuple of the riot command, its return code and stderr contents.
+        """
+        cmd = self._riot_command(fmt)
+        # Spooled files only have a file descriptor once they are rolled over to disk
+        is_spool = isinstance(file_obj, SpooledTemporaryFile)
+        to_pipe = is_spool or self._get_fileno(file_obj) is None
+        riot_process = Popen(shlex.split(cmd), stdin=PIPE, stdout=PIPE if to_pipe else file_obj,
+                             stderr=PIPE)
+        threads = [Thread(target=self._feed_riot, args=(riot_process.stdin, start, end))]
+        if to_pipe:
+            threads.append(Thread(target=shutil.copyfileobj,
+                                  args=(riot_process.stdout, file_obj, COPY_BLOCK_SIZE)))
+        for thread in threads:
+            thread.start()
+        err = riot_process.stderr.read()
+        for thread in threads:
+            thread.join()
+        riot_process.wait()
+        return cmd, riot_process.returncode, err
+
+    def _check_riot_result(self, cmd, returncode, err):
+        """ Raise if riot failed and report its warnings otherwise."""
+        if self._metrics is not None:
+            self._metrics.observe_riot(returncode, bool(err))
+        if returncode != 0:
+            raise RiotError(
+                "The riot command='{}' returned with following rc={} and error:\n"
+                "{}".format(cmd, returncode, err))
+        if err:
+            # Report riot warnings
+            warnings.warn(RiotWarning("cmd='{}' generated riot warnings:\n{}".format(
+                cmd, err)))
+
+    def _split_nt_output(self, num_chunks):
+        """ Split the nt output file into at most num_chunks byte ranges on row boundaries.
+        :return: A list of (start, end) tuples.
+        """
+        total_size = self._get_nt_output_size()
+        bounds = [0]
+        for chunk_ind in range(1, num_chunks):
+            target = total_size * chunk_ind // num_chunks
+            offset_ind = bisect.bisect_left(self._nt_row_offsets, target)
+            if offset_ind == len(self._nt_row_offsets):
+                break
+            offset = self._nt_row_offsets[offset_ind]
+            if offset > bounds[-1]:
+                bounds.append(offset)
+        bounds.append(total_size)
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    def _write_nt_chunks(self, chunks):
+        """ Write each byte range of the nt output file into its own temporary file.
+        :return: The list of paths of the chunk files.
+        """
+        chunk_files = []
+        try:
+            with io.open(self._nt_output_file, 'rb') as nt_file:
+                for start, end in chunks:
+                    nt_file.seek(start)
+                    chunk_in = NamedTemporaryFile(dir=self.temp_dir, suffix=".nt", delete=False)
+                    chunk_files.append(chunk_in.name)
+                    remaining = end - start
+                    while remaining > 0:
+                        block = nt_file.read(min(COPY_BLOCK_SIZE, remaining))
+                        chunk_in.write(block)
+                        remaining -= len(block)
+                    chunk_in.close()
+        except Exception:
+            for chunk_file in chunk_files:
+                os.remove(chunk_file)
+            raise
+        return chunk_files
+
+    @staticmethod
+    def _concatenate_chunk_outputs(file_obj, chunk_outputs):
+        """ Concatenate riot outputs of the chunks into file_obj,
+        keeping the prefixes of the first one only."""
+        # No separator before the first chunk, whose prefix block is kept
+        separator = None
+        for chunk_out in chunk_outputs:
+            chunk_out.seek(0, io.SEEK_END)
+            chunk_size = chunk_out.tell()
+            if chunk_size == 0:
+                continue
+            chunk_out.seek(0)
+            if separator is not None:
+                # Skip the prefix block, which has already been written by the first chunk
+                line = chunk_out.readline()
+                while line and PREFIX_LINE_PATTERN.match(line):
+                    line = chunk_out.readline()
+                file_obj.write(separator + line)
+            shutil.copyfileobj(chunk_out, file_obj, COPY_BLOCK_SIZE)
+            # Keep subject blocks of consecutive chunks separated by a blank line
+            chunk_out.seek(max(chunk_size - 2, 0))
+            separator = b"" if chunk_out.read() == b"\n\n" else b"\n"
+
+    def _run_riot_chunks(self, file_obj, fmt, chunks):
+        """ Convert chunks of the nt output file with parallel riot processes
+        and concatenate their outputs into file_obj."""
+        if self._nt_spool is not None:
+            chunk_outputs = [SpooledTemporaryFile(self.spool_max_size, dir=self.temp_dir)
+                             for _ in chunks]
+            try:
+                results = [None] * len(chunks)
+
+                def run_chunk(ind):
+                    """ Convert a chunk into its output."""
+                    results[ind] = self._run_riot_piped(fmt, chunk_outputs[ind], *chunks[ind])
+
+                threads = [Thread(target=run_chunk, args=(ind,)) for ind in range(len(chunks))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                for result in results:
+                    self._check_riot_result(*result)
+                self._concatenate_chunk_outputs(file_obj, chunk_outputs)
+            finally:
+                for chunk_out in chunk_outputs:
+                    chunk_out.close()
+            return
+
+        chunk_files = self._write_nt_chunks(chunks)
+        chunk_outputs = []
+        try:
+            processes = []
+            for chunk_file in chunk_files:
+                cmd = self._riot_command(fmt, chunk_file)
+                chunk_outputs.append(TemporaryFile(dir=self.temp_dir))
+                processes.append((cmd, Popen(shlex.split(cmd), stdout=chunk_outputs[-1],
+                                             stderr=PIPE)))
+            for cmd, riot_process in processes:
+                _, err = riot_process.communicate()
+                self._check_riot_result(cmd, riot_process.returncode, err)
+            self._concatenate_chunk_outputs(file_obj, chunk_outputs)
+        finally:
+            for chunk_out in chunk_outputs:
+                chunk_out.close()
+            for chunk_file in chunk_files:
+                os.remove(chunk_file)
+
+    def _serialize_nt(self):
+        """ Generate the NT-serialization into a temporary file unless it is already there."""
+        nt_serializer.consume(self._iter_serialize_nt())
+
+    def _iter_serialize_nt(self):
+        """ Generate the NT-serialization one row at a time, see _serialize_nt. Sorting the
+        serialization is a single step.
+        :return: An iterator yielding after each row is serialized.
         """
+        if self.spool_max_size is not None:
+            if self._nt_spool is None:
+                nt_out = SpooledTemporaryFile(self.spool_max_size, dir=self.temp_dir)
+                self._nt_row_offsets = nt_serializer.RowOffsets()
+                self._set_phase("serialize")
+                with self._recording_row_errors() as row_errors:
+                    for step in nt_serializer.iter_serialize(self._tables,
+                                                             self._metadata["tables"],
+                                                             self._namespaces,
+                                                             nt_out,
+                                                             self._nt_row_offsets,
+                                                             self.table_jobs,
+                                                             self.temp_dir,
+                                                             self._serialize_options,
+                                                             row_errors=row_errors,
+                                                           progress=self._progress):
+                        yield step
+                if self.sort_by or self.unique:
+                    self._set_phase("sort")
+                    nt_out = self._sort_nt(nt_out, SpooledTemporaryFile(self.spool_max_size,
+                                                                        dir=self.temp_dir))
+                self._nt_spool = nt_out
+            return
+
         if self._nt_output_file is None or not os.path.exists(self._nt_output_file):
-            nt_out = NamedTemporaryFile(dir=self.temp_dir, suffix=".nt", delete=False)
-            nt_serializer.serialize(self._tables,
-                                    self._metadata["tables"],
-                                    self._namespaces,
-                                    nt_out)
+            checkpointer = None
+            if self.checkpoint_path is not None:
+                nt_out, checkpointer = self._open_checkpointed_output()
+            else:
+                nt_out = NamedTemporaryFile(dir=self.temp_dir, suffix=".nt", delete=False)
+            self._nt_row_offsets = nt_serializer.RowOffsets()
+            if checkpointer is None or not checkpointer.complete:
+                self._set_phase("serialize")
+                with self._recording_row_errors(checkpointer) as row_errors:
+                    for step in nt_serializer.iter_serialize(self._tables,
+                                                             self._metadata["tables"],
+                                                             self._namespaces,
+                                                             nt_out,
+                                                             self._nt_row_offsets,
+                                                             self.table_jobs,
+                                                             self.temp_dir,
+                                                             self._serialize_options,
+                                                             checkpointer,
+                                                             row_errors,
+                                                             self._progress):
+                        yield step
+            if self.sort_by or self.unique:
+                self._set_phase("sort")
+                unsorted_file = nt_out.name
+                nt_out = self._sort_nt(nt_out, NamedTemporaryFile(dir=self.temp_dir, suffix=".nt",
+                                                                  delete=False))
+                # The checkpointed output is kept for later runs to resume from
+                if checkpointer is None:
+                    os.remove(unsorted_file)
+            else:
+                self._keep_nt_output = checkpointer is not None
             self._nt_output_file = nt_out.name
             nt_out.close()
-            os.chmod(self._nt_output_file, READ_PERMISSIONS)
+            if not self._keep_nt_output:
+                os.chmod(self._nt_output_file, READ_PERMISSIONS)
 
-        riot_checked = False
-        for file_obj, fmt in file_format_tuples:
-            if fmt.upper() in ["NT", "N-TRIPLE", "N-TRIPLES"]:
-                # Write the contents of serialized NT directly
-                with io.open(self._nt_output_file, 'r', encoding="utf-8", newline='') as nt_file:
-                    file_obj.write(nt_file.read().encode("utf-8"))
+    def _set_phase(self, phase):
+        """ Report the start of a phase of the conversion if progress is reported."""
+        if self._metrics is not None:
+            self._metrics.set_cache("row_index",
+                                    sum(x.row_index_hits for x in self._tables.values()),
+                                    sum(x.row_index_misses for x in self._tables.values()))
+        if self._progress is not None:
+            self._progress.set_phase(phase)
+
+    @contextmanager
+    def _recording_row_errors(self, checkpointer=None):
+        """ Record the rows failing to serialize into row_errors under the skip and quarantine
+        policies. When resuming from a checkpoint, the reject file is truncated to its length
+        at the checkpoint and appended to.
+        :param checkpointer: Optional checkpoint.Checkpointer recording the reject file length.
+        :return: A context manager yielding the RowErrors, None for the fail policy.
+        """
+        if self.on_error == "fail":
+            yield None
+            return
+        reject_file = None
+        if self.on_error == "quarantine":
+            if checkpointer is not None and checkpointer.resumed and \
+                    os.path.exists(self.reject_path):
+                with io.open(self.reject_path, 'r+b') as reject_out:
+                    reject_out.truncate(checkpointer.state["reject_bytes"])
+                reject_file = io.open(self.reject_path, 'a', encoding="utf-8")
             else:
-                # Compute prefixes file
-                if self._prefixes_ttl_file is None and self._namespaces != {}:
-                    prefixes_ttl = NamedTemporaryFile(dir=self.temp_dir,
-                                                      suffix=".ttl", delete=False)
-                    self._prefixes_ttl_file = prefixes_ttl.name
-                    for pre, url in self._namespaces.items():
-                        prefixes_ttl.write(u"@prefix {}: <{}> .\n".format(pre, url).encode('utf-8'))
-                    prefixes_ttl.close()
-                    os.chmod(self._prefixes_ttl_file, READ_PERMISSIONS)
-                prefixes = self._prefixes_ttl_file + " " if self._namespaces != {} else ""
+                reject_file = io.open(self.reject_path, 'w', encoding="utf-8")
+            if checkpointer is not None:
+                checkpointer.reject_file = reject_file
+        self.row_errors = RowErrors(self.on_error, reject_file, self.max_errors)
+        try:
+            yield self.row_errors
+        finally:
+            if reject_file is not None:
+                reject_file.close()
+                if checkpointer is not None:
+                    checkpointer.reject_file = None
+            if self.row_errors.num_errors:
+                LOGGER.warning("%d rows failed to serialize: %s", self.row_errors.num_errors,
+                               dict(self.row_errors.error_types))
+
+    def _open_checkpointed_output(self):
+        """ Open the NT-serialization next to checkpoint_path, truncated to the last checkpoint
+        if resuming from it.
+        :return: Tuple of the file object in binary mode and the checkpoint.Checkpointer.
+        """
+        nt_path = self.checkpoint_path + checkpoint.CHECKPOINT_OUTPUT_SUFFIX
+        table_urls = [x["url"] for x in self._metadata["tables"] if not x["suppressOutput"]]
+        signatures = [row_index.get_signature(self._tables[x].path)
+                      if self._tables[x].path is not None else None for x in table_urls]
+        state = checkpoint.load_checkpoint(self.checkpoint_path) if self.resume else None
+        if state is None:
+            nt_out = io.open(nt_path, 'w+b')
+        else:
+            nt_out = io.open(nt_path, 'r+b')
+            nt_out.truncate(state["output_bytes"])
+            nt_out.seek(0, io.SEEK_END)
+        return nt_out, checkpoint.Checkpointer(self.checkpoint_path, table_urls,
+                                               self.checkpoint_rows, state, signatures)
+
+    def _sort_nt(self, nt_in, nt_out):
+        """ Sort the NT-serialization in nt_in into nt_out and close nt_in.
+        Rows are not contiguous anymore once sorted, so the row offsets are dropped
+        and riot converts the sorted output in a single process.
+        :return: nt_out.
+        """
+        try:
+            nt_in.seek(0)
+            nt_sort.sort_nt(nt_in, nt_out, self.sort_by if self.sort_by else "spo", self.unique,
+                            self.sort_memory, self.temp_dir, self.sort_jobs)
+        finally:
+            nt_in.close()
+        self._nt_row_offsets = nt_serializer.RowOffsets()
+        return nt_out
+
+    def _write_prefixes_file(self):
+        """ Write the prefixes into a turtle file to pass to riot unless it is already there."""
+        if self._prefixes_ttl_file is None and self._namespaces != {}:
+            prefixes_ttl = NamedTemporaryFile(dir=self.temp_dir,
+                                              suffix=".ttl", delete=False)
+            self._prefixes_ttl_file = prefixes_ttl.name
+            prefixes_ttl.write(self._get_prefixes_ttl())
+            prefixes_ttl.close()
+            os.chmod(self._prefixes_ttl_file, READ_PERMISSIONS)
 
+    @contextmanager
+    def _opening_sinks(self, file_format_tuples, close_sinks=False):
+        """ Open the sinks among the outputs as file objects, see sinks.open_sink_file, and
+        flush them once the outputs are written, or close them if close_sinks.
+        :return: A context manager yielding the outputs with file objects in place of sinks.
+        """
+        sink_files = []
+        outputs = []
+        for file_obj, fmt in file_format_tuples:
+            if isinstance(file_obj, Sink):
+                file_obj = open_sink_file(file_obj)
+                sink_files.append(file_obj)
+            outputs.append((file_obj, fmt))
+        # Sinks not flushed or closed yet
+        pending = list(sink_files)
+        try:
+            yield outputs
+            while pending:
+                sink_file = pending.pop(0)
+                if close_sinks:
+                    sink_file.close()
+                else:
+                    sink_file.flush()
+        except Exception:
+            # Stop the threads of the remaining sinks, the error of the outputs is raised
+            for sink_file in pending:
+                try:
+                    if close_sinks:
+                        sink_file.close()
+                    else:
+                        sink_file.flush()
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            raise
+
+    def to_rdf_files(self, file_format_tuples, close_sinks=False):
+        """ Generate rdf serializations for specified formats into the specified file objects.
+        :param file_format_tuples: A list of tuples of file-like object or sinks.Sink and format
+        string. Example: [(ttl_file_obj, "turtle"), (nt_file_obj, "nt")]
+        :param close_sinks: Whether to close the sinks once their outputs are written or the
+        conversion failed, otherwise they are only flushed and left open like file objects.
+        :return: None.
+        """
+        with self._opening_sinks(file_format_tuples, close_sinks) as outputs:
+            self._write_rdf_files(outputs)
+
+    def _write_rdf_files(self, file_format_tuples):
+        """ Generate rdf serializations for specified formats into the specified file objects,
+        see to_rdf_files."""
+        native_outputs = [(file_obj, fmt) for file_obj, fmt in file_format_tuples
+                          if self._writes_natively(fmt)]
+        if len(native_outputs) < len(file_format_tuples):
+            self._serialize_nt()
+        if native_outputs:
+            self._write_native(native_outputs)
+        for step in self._plan_conversions(file_format_tuples):
+            self._run_conversion(*step)
+        self._set_phase("done")
+
+    def _plan_conversions(self, file_format_tuples):
+        """ Plan the conversions of the NT-serialization into the outputs that are not written
+        natively, once it is serialized. to_rdf_files and ato_rdf_files only differ in how
+        they run the steps.
+        :return: A list of tuples of step, file object, format and the byte ranges of the
+        NT-serialization converted by parallel riot processes. Steps are 'copy' to copy the
+        NT-serialization, 'rdflib' to convert it with rdflib and 'riot' to convert it with riot.
+        """
+        steps = []
+        riot_checked = False
+        for file_obj, fmt in file_format_tuples:
+            if self._writes_natively(fmt):
+                continue
+            if not steps:
+                self._set_phase("convert")
+            if self._metrics is not None:
+                self._metrics.count_output(file_obj, fmt)
+            if fmt.upper() in NT_FORMATS:
+                steps.append(("copy", file_obj, fmt, None))
+                continue
+            if self._choose_backend(fmt) == "rdflib":
+                steps.append(("rdflib", file_obj, fmt, None))
+                continue
+            if not riot_checked:
+                if self._nt_spool is None:
+                    self._write_prefixes_file()
                 # Check that 'riot' is command in the system path
-                if (not riot_checked) and find_executable(self.riot_path) is None:
+                if find_executable(self.riot_path) is None:
                     raise ValueError("Could not locate '{}' in the system".format(self.riot_path))
                 riot_checked = True
+            chunks = []
+            if self.riot_jobs > 1 and fmt.upper() in CONCATENABLE_FORMATS:
+                chunks = self._split_nt_output(self.riot_jobs)
+            if len(chunks) < 2:
+                chunks = [(0, self._get_nt_output_size())]
+            steps.append(("riot", file_obj, fmt, chunks))
+        return steps
+
+    def _run_conversion(self, step, file_obj, fmt, chunks):
+        """ Run a step of the conversions, see _plan_conversions."""
+        if step == "copy":
+            # Write the contents of serialized NT directly
+            with self._open_nt_output() as nt_file:
+                shutil.copyfileobj(nt_file, file_obj, COPY_BLOCK_SIZE)
+        elif step == "rdflib":
+            self._convert_with_rdflib(file_obj, fmt)
+        elif len(chunks) > 1:
+            self._run_riot_chunks(file_obj, fmt, chunks)
+        elif self._nt_spool is not None:
+            self._check_riot_result(*self._run_riot_piped(fmt, file_obj, *chunks[0]))
+        else:
+            cmd = self._riot_command(fmt, self._nt_output_file)
+            if self._get_fileno(file_obj) is None:
+                riot_process = Popen(shlex.split(cmd), stdout=PIPE, stderr=PIPE)
+                copier = Thread(target=shutil.copyfileobj,
+                                args=(riot_process.stdout, file_obj, COPY_BLOCK_SIZE))
+                copier.start()
+                err = riot_process.stderr.read()
+                copier.join()
+                riot_process.wait()
+            else:
+                riot_process = Popen(shlex.split(cmd), stdout=file_obj, stderr=PIPE)
+                _, err = riot_process.communicate()
+            self._check_riot_result(cmd, riot_process.returncode, err)
+
+    def _get_graph_iris(self):
+        """ Get the IRIs of the named graphs of the tables, see graph_iris."""
+        graph_iris = {}
+        for metadata in self._metadata["tables"]:
+            url = metadata["url"]
+            if url in self.graph_iris:
+                graph_iris[url] = self.graph_iris[url]
+            else:
+                graph_iris[url] = urljoin(self._metadata_location, url) \
+                    if self._metadata_location else url
+        return graph_iris
 
-                # Translate RDF to RDFXML and XML to RDFXML
-                fmt = "RDFXML" if fmt.upper() == "RDF" or fmt.upper() == "XML" else fmt
-
-                cmd = self.riot_path + " --formatted='{}' {} {}".format(
-                    fmt, prefixes, self._nt_output_file)
-                err = PIPE
-                riot_process = Popen(shlex.split(cmd), stdout=file_obj, stderr=err)
-                file_obj, err = riot_process.communicate()
-                if riot_process.returncode != 0:
-                    raise RiotError(
-                        "The riot command='{}' returned with following rc={} and error:\n"
-                        "{}".format(cmd, riot_process.returncode, err))
-                if err:
-                    # Report riot warnings
-                    warnings.warn(RiotWarning("cmd='{}' generated riot warnings:\n{}".format(
-                        cmd, err)))
+    def _write_native(self, file_format_tuples):
+        """ Write the formats directly from the csv files in a single pass over their rows.
+        :param file_format_tuples: A list of tuples of file-like object and format string,
+        see rdf_writers.NATIVE_FORMATS.
+        """
+        nt_serializer.consume(self._iter_write_native(file_format_tuples))
+
+    def _iter_write_native(self, file_format_tuples):
+        """ Write the formats one row at a time, see _write_native.
+        :return: An iterator yielding after each row is written.
+        """
+        writers = []
+        for file_obj, fmt in file_format_tuples:
+            self._choose_backend(fmt)
+            if self._metrics is not None:
+                self._metrics.count_output(file_obj, fmt)
+            writers.append(rdf_writers.get_writer(fmt, file_obj, self._namespaces,
+                                                  self._get_graph_iris()))
+        for step in self._iter_write_rdf(writers):
+            yield step
+
+    def _write_rdf(self, writers):
+        """ Write the triples into writers in a single pass over the rows, see
+        rdf_writers.write_rdf. Rows are serialized in this process only and the output of
+        writers is not checkpointed."""
+        nt_serializer.consume(self._iter_write_rdf(writers))
+
+    def _iter_write_rdf(self, writers):
+        """ Write the triples into writers one row at a time, see _write_rdf.
+        :return: An iterator yielding after each row is written.
+        """
+        if self.checkpoint_path is not None:
+            raise ValueError("checkpoint_path can only be used with outputs converted from "
+                             "the NT-serialization, not with native outputs")
+        self._set_phase("serialize")
+        with self._recording_row_errors() as row_errors:
+            for step in rdf_writers.iter_write_rdf(writers, self._tables,
+                                                   self._metadata["tables"], self._namespaces,
+                                                   self._serialize_options, row_errors,
+                                                   self._progress):
+                yield step
 
     def to_rdf(self, fmt="turtle"):
         """ Return rdf serialization for the specified format as unicode."""
+        if fmt.upper() in rdf_writers.NATIVE_ONLY_FORMATS:
+            raise ValueError("Format '{}' is binary, use to_rdf_files instead".format(fmt))
+        if self.spool_max_size is not None:
+            out = io.BytesIO()
+            self.to_rdf_files([(out, fmt)])
+            return out.getvalue().decode("utf-8")
+
         with NamedTemporaryFile(dir=self.temp_dir, delete=True) as out:
             self.to_rdf_files([(out, fmt)])
             out.seek(0)
             output = out.read().decode("utf-8")
         return output
 
+    def to_rdf_shards(self, directory, num_shards=None, max_bytes=None, max_triples=None):
+        """ Write the NT-serialization into shards in directory, partitioned by the hash of
+        subjects into num_shards, or starting a new shard after max_bytes or max_triples.
+        Blank nodes never span shards, and a manifest listing the shards and their number of
+        triples is written along with them.
+        :return: The manifest as a dictionary.
+        """
+        if (self.sort_by or self.unique) and self._serialize_options["blank_nodes"] != "skolem":
+            # Sorting separates blank nodes from the triples referring to them
+            raise ValueError("Sorted outputs can only be sharded with blank_nodes='skolem'")
+        self._serialize_nt()
+        with self._open_nt_output() as nt_file:
+            return sharding.write_shards(nt_file, directory, num_shards, max_bytes, max_triples)
+
+    def to_graph(self, graph=None, batch_size=GRAPH_BATCH_SIZE):
+        """ Add the triples into an rdflib Graph directly, without an NT-serialization to parse.
+        :param graph: The graph to add the triples into, a new Graph if None.
+        :param batch_size: Number of triples added to the graph at once.
+        :return: The graph.
+        """
+        graph = graph if graph is not None else Graph()
+        for pre, url in self._namespaces.items():
+            graph.bind(pre, url, override=True)
+        builder = GraphBuilder(graph, batch_size)
+        with self._recording_row_errors() as row_errors:
+            nt_serializer.write_tables(self._tables, self._metadata["tables"], self._namespaces,
+                                       builder, self._serialize_options, row_errors)
+        builder.flush()
+        return graph
+
+    def to_graph_store(self, url, protocol="graph-store", **kwargs):
+        """ Send the triples into a triple store over HTTP as they are serialized, without an
+        NT-serialization, putting the triples of each table into its graph as in native
+        n-quads outputs.
+        :param url: URL of the SPARQL 1.1 Graph Store HTTP Protocol or Update endpoint.
+        :param protocol: 'graph-store' to POST N-Triples into the graphs, or 'update' to send
+        INSERT DATA requests.
+        :param kwargs: Options of the batches and connections, see
+        graph_store.GraphStoreWriter.
+        :return: Dictionary of the number of triples and batches sent and of retries.
+        """
+        writer = GraphStoreWriter(url, self._namespaces, self._get_graph_iris(), protocol,
+                                  **kwargs)
+        try:
+            self._write_rdf([writer])
+        finally:
+            writer.close()
+        self._set_phase("done")
+        return writer.stats
+
+    def iter_triples(self, batch_size=TRIPLE_BATCH_SIZE):
+        """ Iterate over the triples in batches, without an NT-serialization to parse.
+        Triples are tuples of subject, predicate and object Terms, whose kind is one of
+        'uri', 'bnode' or 'literal', with datatype and lang fields for literals.
+        Terms of predicates are reused across rows.
+        :param batch_size: Number of triples after which a batch is yielded, batches
+        end on row boundaries so they may be slightly larger.
+        :return: An iterator over lists of triples.
+        """
+        collector = TermCollector()
+        with self._recording_row_errors() as row_errors:
+            for row_num, row, table_info, include_invariants in nt_serializer.iter_rows(
+                    self._tables, self._metadata["tables"], self._namespaces,
+                    self._serialize_options, row_errors):
+                nt_serializer.try_write_row(collector, row_num, row, table_info,
+                                            include_invariants, row_errors)
+                if len(collector.triples) >= batch_size:
+                    yield collector.pop()
+        if collector.triples:
+            yield collector.pop()
+
     def to_json(self):
         """ Generate JSON serialization. """
         raise NotImplementedError("JSON generation is not supported yet.")
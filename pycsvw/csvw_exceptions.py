@@ -120,3 +120,11 @@ class FailedSubstitutionError(Exception):
     def __init__(self, msg, cause, *args):
         super(FailedSubstitutionError, self).__init__(msg, *args)
         self.cause = cause
+
+
+class TooManyRowErrors(Exception):
+    """
+    The exception thrown when more rows than the maximum number of errors fail
+    to serialize under the skip or quarantine error policies.
+    """
+    pass
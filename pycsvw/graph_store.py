@@ -0,0 +1,251 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Sink of triples into a triple store over HTTP, either POSTing N-Triples into the graph of
+each table with the SPARQL 1.1 Graph Store HTTP Protocol ('graph-store'), or sending them
+in SPARQL 1.1 Update INSERT DATA requests ('update').
+
+Triples are sent in batches of batch_triples, which end on row boundaries so that the blank
+nodes of a row are never split across requests. Sender threads each keep a persistent
+keep-alive connection to the endpoint and take batches from a queue. At most max_in_flight
+batches are queued or being sent, beyond that serialization waits for the store to catch
+up. Requests failing with connection errors or 5xx and 429 responses are retried with
+exponential backoff, other responses fail the conversion.
+"""
+import logging
+import socket
+import time
+from threading import BoundedSemaphore, Lock, Thread
+
+from six.moves import http_client, queue  # pylint: disable=import-error
+from six.moves.urllib.parse import quote, urlsplit  # pylint: disable=import-error
+
+from .rdf_writers import RDFWriter, format_term
+
+LOGGER = logging.getLogger(__name__)
+
+PROTOCOLS = ["graph-store", "update"]
+CONTENT_TYPES = {
+    "graph-store": "application/n-triples",
+    "update": "application/sparql-update"
+}
+# Number of triples in each request
+STORE_BATCH_TRIPLES = 10000
+# Number of persistent connections, and thus of concurrent requests
+STORE_CONNECTIONS = 4
+# Number of batches queued or being sent before serialization waits
+STORE_MAX_IN_FLIGHT = 8
+# Number of times a failed request is retried, and the delay in seconds before the first retry
+STORE_RETRIES = 3
+STORE_RETRY_DELAY = 1.0
+STORE_TIMEOUT = 60.0
+
+
+class GraphStoreError(IOError):
+    """
+    The exception thrown when a batch of triples could not be sent to the store.
+    """
+    pass
+
+
+def is_retryable(status):
+    """Check if a request failing with a response status may succeed when retried."""
+    return status >= 500 or status == 429
+
+
+class GraphStoreWriter(RDFWriter):
+    """
+    Writer of the triples into a store over HTTP, see write_rdf.
+    """
+
+    def __init__(self, url, namespaces=None, graph_iris=None, protocol="graph-store",
+                 batch_triples=STORE_BATCH_TRIPLES, connections=STORE_CONNECTIONS,
+                 max_in_flight=STORE_MAX_IN_FLIGHT, retries=STORE_RETRIES,
+                 retry_delay=STORE_RETRY_DELAY, timeout=STORE_TIMEOUT, headers=None):
+        """
+        :param url: URL of the graph store or update endpoint.
+        :param graph_iris: Dictionary of table urls to the IRIs of their named graphs, which
+        are the table urls by default. Tables mapped to None go into the default graph.
+        :param protocol: One of PROTOCOLS.
+        :param batch_triples: Number of triples after which a batch is sent, batches end on
+        row boundaries so they may be slightly larger.
+        :param connections: Number of persistent connections to the endpoint.
+        :param max_in_flight: Number of batches queued or being sent before write_triples
+        blocks.
+        :param retries: Number of times a failed request is retried.
+        :param retry_delay: Seconds before the first retry, doubled for each further one.
+        :param timeout: Timeout of the connections in seconds.
+        :param headers: Dictionary of additional headers of the requests, e.g. Authorization.
+        """
+        super(GraphStoreWriter, self).__init__(None, namespaces, graph_iris)
+        if protocol not in PROTOCOLS:
+            raise ValueError("Protocol must be one of {}".format(PROTOCOLS))
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError("'{}' is not an http or https url".format(url))
+        self.url = url
+        self.protocol = protocol
+        self.batch_triples = batch_triples
+        self.connections = connections
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.headers["Content-Type"] = CONTENT_TYPES[protocol]
+        self._parts = parts
+        self._in_flight = BoundedSemaphore(max(max_in_flight, 1))
+        self._queue = queue.Queue()
+        self._senders = []
+        self._lock = Lock()
+        self._error = None
+        self._graph = None
+        self._lines = []
+        self._num_triples = 0
+        # Counts of triples and batches sent and of retried requests
+        self.stats = {"triples": 0, "batches": 0, "retries": 0}
+
+    def _connect(self):
+        """Open a connection to the endpoint."""
+        if self._parts.scheme == "https":
+            return http_client.HTTPSConnection(self._parts.netloc, timeout=self.timeout)
+        return http_client.HTTPConnection(self._parts.netloc, timeout=self.timeout)
+
+    def _request_target(self, graph):
+        """Get the path and query of the requests of a graph."""
+        target = self._parts.path or "/"
+        query = self._parts.query
+        if self.protocol == "graph-store":
+            graph_param = "graph=" + quote(graph, safe="") if graph is not None else "default"
+            query = query + "&" + graph_param if query else graph_param
+        return target + "?" + query if query else target
+
+    def _request_body(self, graph, lines):
+        """Get the body of the request of a batch."""
+        triples = u"".join(lines)
+        if self.protocol == "update":
+            if graph is not None:
+                triples = u"GRAPH <{}> {{\n{}}}\n".format(graph, triples)
+            triples = u"INSERT DATA {{\n{}}}\n".format(triples)
+        return triples.encode('utf-8')
+
+    def _send(self, conn, batch):
+        """Send a batch, retrying failed requests.
+        :return: The connection to reuse, None if it was closed.
+        """
+        graph, lines = batch
+        target, body = self._request_target(graph), self._request_body(graph, lines)
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                if conn is None:
+                    conn = self._connect()
+                conn.request("POST", target, body, self.headers)
+                response = conn.getresponse()
+                content = response.read()
+            except (http_client.HTTPException, socket.error) as exc:
+                # Connecting may fail before there is a connection, e.g. on an invalid port
+                if conn is not None:
+                    conn.close()
+                conn = None
+                error = exc
+                LOGGER.warning("Sending %d triples to '%s' failed: %s", len(lines), self.url, exc)
+                continue
+            if response.status < 300:
+                with self._lock:
+                    self.stats["triples"] += len(lines)
+                    self.stats["batches"] += 1
+                return conn
+            error = "{} {}: {}".format(response.status, response.reason,
+                                       content[:200].decode('utf-8', 'replace'))
+            LOGGER.warning("Sending %d triples to '%s' failed: %s", len(lines), self.url, error)
+            if not is_retryable(response.status):
+                break
+        raise GraphStoreError("Sending {} triples to '{}' failed: {}".format(
+            len(lines), self.url, error))
+
+    def _run_sender(self):
+        """Send the queued batches over a persistent connection until None is queued."""
+        conn = None
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            try:
+                if self._error is None:
+                    conn = self._send(conn, batch)
+            except Exception as exc:  # pylint: disable=broad-except
+                with self._lock:
+                    self._error = self._error or exc
+            finally:
+                self._in_flight.release()
+        if conn is not None:
+            conn.close()
+
+    def _raise_error(self):
+        """Stop the senders and raise the error of a failed batch, if any."""
+        if self._error is not None:
+            self.close()
+            raise self._error
+
+    def _flush(self):
+        """Queue the current batch, waiting while max_in_flight batches are in flight."""
+        self._raise_error()
+        if not self._lines:
+            return
+        self._in_flight.acquire()
+        self._queue.put((self._graph, self._lines))
+        self._lines = []
+
+    def start(self, md_tables=None):
+        """Start the senders."""
+        for _ in range(self.connections):
+            sender = Thread(target=self._run_sender)
+            sender.daemon = True
+            sender.start()
+            self._senders.append(sender)
+
+    def start_table(self, table_url):
+        """Start the graph of a table."""
+        self._flush()
+        self._graph = self.graph_iris.get(table_url, table_url)
+
+    def write_triples(self, triples):
+        """Add the triples of a row to the current batch, queueing it once it is full."""
+        self._lines.extend(u"{} {} {} .\n".format(format_term(subject), format_term(predicate),
+                                                  format_term(obj))
+                           for subject, predicate, obj in triples)
+        if len(self._lines) >= self.batch_triples:
+            self._flush()
+
+    def end_table(self):
+        """Queue the last batch of a table."""
+        self._flush()
+
+    def finish(self):
+        """Wait for all batches to be sent.
+        :raises GraphStoreError: If a batch could not be sent.
+        """
+        self._flush()
+        self.close()
+        self._raise_error()
+
+    def close(self):
+        """Stop the senders once the queued batches are sent, or skipped after an error."""
+        senders, self._senders = self._senders, []
+        for _ in senders:
+            self._queue.put(None)
+        for sender in senders:
+            sender.join()
@@ -0,0 +1,163 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Metrics of conversions in the OpenMetrics text format, e.g. for the textfile collector of
+the Prometheus node exporter. The textfile is replaced atomically so that it is never
+read half written. Each conversion writes the metrics of its own run, which start from zero,
+so all of them are gauges rather than counters that would appear to reset between runs.
+"""
+import io
+import os
+import time
+from collections import Counter
+
+from six import text_type
+
+# Minimum number of seconds between writes of the textfile during a conversion
+METRICS_INTERVAL = 15.0
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def escape_label(value):
+    """Escape a label value."""
+    return text_type(value).replace(u"\\", u"\\\\").replace(u"\n", u"\\n").replace(u'"', u'\\"')
+
+
+def format_sample(name, labels, value):
+    """Format a sample line of a metric."""
+    if labels:
+        label_text = u",".join(u'{}="{}"'.format(key, escape_label(val))
+                               for key, val in sorted(labels.items()))
+        name = u"{}{{{}}}".format(name, label_text)
+    return u"{} {}".format(name, repr(float(value)) if isinstance(value, float) else value)
+
+
+class ConversionMetrics(object):
+    """
+    Collects the metrics of a conversion: rows, triples and bytes read of each table,
+    durations of its phases, bytes written in each format, riot exit codes and warnings
+    and the hits of cached row indexes, and writes them into a textfile.
+    """
+
+    def __init__(self, path, interval=METRICS_INTERVAL):
+        self.path = path
+        self.interval = interval
+        # Table url to dictionary of rows, triples and bytes_read
+        self.tables = {}
+        self.durations = {}
+        self.bytes_out = Counter()
+        self.riot_exit_codes = Counter()
+        self.riot_warnings = 0
+        self.cache_lookups = Counter()
+        self._outputs = []
+        self._phase = None
+        self._last_write = None
+
+    def observe_phase(self, phase, seconds):
+        """Record the duration of a phase."""
+        self.durations[phase] = self.durations.get(phase, 0) + seconds
+
+    def observe_riot(self, returncode, warned):
+        """Record the exit code of a riot process and whether it wrote warnings."""
+        self.riot_exit_codes[returncode] += 1
+        if warned:
+            self.riot_warnings += 1
+
+    def set_cache(self, cache, hits, misses):
+        """Set the number of hits and misses of a cache."""
+        self.cache_lookups[(cache, "hit")] = hits
+        self.cache_lookups[(cache, "miss")] = misses
+
+    def count_output(self, file_obj, fmt):
+        """Count the bytes written into file_obj in a format once it is written, if file_obj
+        tells its position."""
+        try:
+            start = file_obj.tell()
+        except (AttributeError, IOError, OSError, ValueError):
+            return
+        self._outputs.append((file_obj, fmt, start))
+
+    def _update_outputs(self):
+        """Count the bytes written into the outputs so far."""
+        for file_obj, fmt, start in self._outputs:
+            try:
+                self.bytes_out[fmt] = file_obj.tell() - start
+            except (IOError, OSError, ValueError):
+                # Closed already, keep the last count
+                pass
+
+    def on_progress(self, report):
+        """Update the metrics from a progress report, see progress.Progress, and write them
+        when a phase starts and otherwise at most once every interval seconds."""
+        for table_url, counts in report["tables"].items():
+            self.tables[table_url] = counts
+        self.durations.update(report["durations"])
+        if report["phase"] != self._phase or self._last_write is None or \
+                time.time() - self._last_write >= self.interval:
+            self._phase = report["phase"]
+            self.write()
+
+    def render(self):
+        """Render the metrics in the OpenMetrics text format."""
+        self._update_outputs()
+        lines = []
+
+        def metric(name, metric_type, help_text, samples, unit=None):
+            lines.append(u"# TYPE {} {}".format(name, metric_type))
+            if unit:
+                lines.append(u"# UNIT {} {}".format(name, unit))
+            lines.append(u"# HELP {} {}".format(name, help_text))
+            lines.extend(samples)
+
+        for key, help_text in [("rows", "Rows serialized"), ("triples", "Triples serialized"),
+                               ("bytes_read", "Bytes read from the csv file")]:
+            metric(u"pycsvw_table_" + key, "gauge", help_text + " per table",
+                   [format_sample(u"pycsvw_table_" + key, {"table": url}, counts[key])
+                    for url, counts in sorted(self.tables.items())])
+        metric(u"pycsvw_output_bytes", "gauge", "Bytes written per format",
+               [format_sample(u"pycsvw_output_bytes", {"format": fmt}, num)
+                for fmt, num in sorted(self.bytes_out.items())], unit="bytes")
+        metric(u"pycsvw_phase_duration_seconds", "gauge",
+               "Duration of the conversion per phase",
+               [format_sample(u"pycsvw_phase_duration_seconds", {"phase": phase}, float(seconds))
+                for phase, seconds in sorted(self.durations.items())], unit="seconds")
+        metric(u"pycsvw_riot_runs", "gauge", "Riot processes per exit code",
+               [format_sample(u"pycsvw_riot_runs", {"exit_code": code}, num)
+                for code, num in sorted(self.riot_exit_codes.items())])
+        metric(u"pycsvw_riot_warnings", "gauge", "Riot processes writing warnings",
+               [format_sample(u"pycsvw_riot_warnings", {}, self.riot_warnings)])
+        metric(u"pycsvw_cache_lookups", "gauge", "Cache lookups per cache and result",
+               [format_sample(u"pycsvw_cache_lookups", {"cache": cache, "result": result},
+                              num) for (cache, result), num in sorted(self.cache_lookups.items())])
+        samples = []
+        for cache in sorted({x[0] for x in self.cache_lookups}):
+            lookups = self.cache_lookups[(cache, "hit")] + self.cache_lookups[(cache, "miss")]
+            if lookups:
+                samples.append(format_sample(u"pycsvw_cache_hit_ratio", {"cache": cache},
+                                             float(self.cache_lookups[(cache, "hit")]) / lookups))
+        metric(u"pycsvw_cache_hit_ratio", "gauge", "Ratio of cache lookups that hit per cache",
+               samples, unit="ratio")
+        metric(u"pycsvw_last_update_timestamp_seconds", "gauge",
+               "Time the metrics were last updated",
+               [format_sample(u"pycsvw_last_update_timestamp_seconds", {}, float(time.time()))],
+               unit="seconds")
+        lines.append(u"# EOF")
+        return u"\n".join(lines) + u"\n"
+
+    def write(self):
+        """Replace the textfile with the current metrics."""
+        temp_path = self.path + ".tmp"
+        with io.open(temp_path, 'w', encoding="utf-8") as metrics_file:
+            metrics_file.write(self.render())
+        _replace(temp_path, self.path)
+        self._last_write = time.time()
@@ -10,6 +10,13 @@
 # limitations under the License.
 
 """ RDF serialization in NT-format """
+import hashlib
+import io
+import itertools
+import os
+import shutil
+from multiprocessing import Manager, Pool
+from tempfile import NamedTemporaryFile
 from uuid import uuid4
 
 from six import string_types
@@ -17,7 +24,9 @@ from six import string_types
 from .generator_utils import process_dates_times, DATATYPE_MAP, read_csv
 from .csvw_exceptions import NullValueException, BothValueAndLiteralError, \
     BothValueAndDatatypeError, NoValueOrLiteralError, InvalidItemError, \
-    NumberOfNonVirtualColumnsMismatch
+    NumberOfNonVirtualColumnsMismatch, TooManyRowErrors
+from .progress import get_bytes_read, SharedProgress, PROGRESS_CHECK_ROWS
+from .row_errors import RowErrors
 from .rdf_utils import is_null_value, get_column_map, get_subject_for_cell, \
     get_predicate_for_cell, apply_all_subs
 
@@ -26,6 +35,14 @@ RDF_FIRST = "http://www.w3.org/1999/02/22-rdf-syntax-ns#first"
 RDF_REST = "http://www.w3.org/1999/02/22-rdf-syntax-ns#rest"
 RDF_NIL = "http://www.w3.org/1999/02/22-rdf-syntax-ns#nil"
 DATE_TIME_TYPES = ["date", "time", "dateTime"]
+# Upper bound on the number of row start offsets kept by RowOffsets
+MAX_ROW_OFFSETS = 4096
+# Size of the blocks used when concatenating fragments of tables serialized in parallel
+COPY_BLOCK_SIZE = 1 << 20
+# Blank nodes are either random, or derived from the contents of their rows
+# as blank node labels ('stable') or as skolem IRIs ('skolem')
+BLANK_NODES = ["random", "stable", "skolem"]
+SKOLEM_PATH = "/.well-known/genid/"
 
 
 def create_literal(val, datatype=None, lang=None):
@@ -55,11 +72,131 @@ def get_new_blank_node():
     return u"_:" + uuid4().hex.upper()
 
 
+def get_row_id(table_url, row):
+    """Get the digest of the table url and the contents of a row."""
+    contents = u"\u001f".join([table_url] + list(row))
+    return hashlib.sha1(contents.encode('utf-8')).hexdigest().upper()
+
+
+def get_blank_node_factory(table_info, row_id, position):
+    """Get a function returning the blank nodes generated at position of a row.
+    Blank nodes are random unless table_info specifies stable or skolem blank nodes,
+    which are derived from row_id, position and their order instead.
+    :return: A function returning '_:' prefixed labels, or skolem IRIs.
+    """
+    blank_nodes = table_info.get('blank_nodes', "random")
+    if blank_nodes == "random":
+        return get_new_blank_node
+
+    counter = itertools.count()
+    if blank_nodes == "skolem":
+        prefix = table_info['skolem_base'].rstrip("/") + SKOLEM_PATH
+    else:
+        prefix = u"_:"
+    return lambda: u"{}{}P{}N{}".format(prefix, row_id, position, next(counter))
+
+
+def as_node_term(node):
+    """Get the NT term of a node returned by a blank node factory."""
+    return node if node.startswith(u"_:") else u"<{}>".format(node)
+
+
+class NTWriter(object):
+    """
+    Triple handler writing the NT-serialization into a binary file-like object.
+    Triple handlers receive the triples generated by write_row through add_uri, add_literal
+    and add_list, where subjects and IRIs starting with '_:' denote blank nodes.
+    """
+
+    def __init__(self, output_obj):
+        self.output_obj = output_obj
+        self.num_triples = 0
+
+    def add_uri(self, subject, predicate, obj):
+        """Add a triple whose object is an IRI."""
+        self.num_triples += 1
+        self.output_obj.write(u"<{}> <{}> <{}> .\n".format(
+            subject, predicate, obj
+        ).encode('utf-8'))
+
+    def add_literal(self, subject, predicate, value, datatype=None, lang=None):
+        """Add a triple whose object is a literal."""
+        self.num_triples += 1
+        self.output_obj.write(u"<{}> <{}> {} .\n".format(
+            subject, predicate, create_literal(value, datatype, lang)
+        ).encode('utf-8'))
+
+    def add_list(self, subject, predicate, items, new_node):
+        """Add a triple whose object is an RDF-list of items, which are either IRIs or tuples
+        of literal value and datatype, along with the triples of the list.
+        :param new_node: Function returning the blank nodes of the list.
+        """
+        output = self.output_obj
+        self.num_triples += 1 + 2 * len(items)
+        b_node = as_node_term(new_node())
+        output.write(u"<{}> <{}> {} .\n".format(
+            subject, predicate, b_node
+        ).encode('utf-8'))
+
+        num_items = len(items)
+        for ind, item in enumerate(items):
+            # Get the value of the item
+            if isinstance(item, string_types):
+                output.write(u"{} <{}> <{}> .\n".format(
+                    b_node, RDF_FIRST, item
+                ).encode('utf-8'))
+            else:
+                lit_value, datatype = item
+                output.write(u"{} <{}> {} .\n".format(
+                    b_node, RDF_FIRST, create_literal(lit_value, datatype)
+                ).encode('utf-8'))
+
+            if ind != (num_items - 1):
+                # Still more items to come
+                next_node = as_node_term(new_node())
+                output.write(u"{} <{}> {} .\n".format(
+                    b_node, RDF_REST, next_node
+                ).encode('utf-8'))
+                b_node = next_node
+            else:
+                # Last item, finish with a nil
+                output.write(u"{} <{}> <{}> .\n".format(
+                    b_node, RDF_REST, RDF_NIL
+                ).encode('utf-8'))
+
+
+class RowBuffer(object):
+    """
+    Triple handler buffering the triples of a row to pass them on to another triple handler
+    only once the whole row is serialized, see NTWriter.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._calls = []
+
+    def add_uri(self, subject, predicate, obj):
+        """Buffer a triple whose object is an IRI."""
+        self._calls.append((self.handler.add_uri, (subject, predicate, obj)))
+
+    def add_literal(self, subject, predicate, value, datatype=None, lang=None):
+        """Buffer a triple whose object is a literal."""
+        self._calls.append((self.handler.add_literal, (subject, predicate, value, datatype, lang)))
+
+    def add_list(self, subject, predicate, items, new_node):
+        """Buffer a triple whose object is an RDF-list of items."""
+        self._calls.append((self.handler.add_list, (subject, predicate, items, new_node)))
+
+    def commit(self):
+        """Pass the buffered triples on to the handler."""
+        for add, args in self._calls:
+            add(*args)
+        self._calls = []
+
+
 def write_objs_as_uri(output_obj, subject, predicate, raw_value):
     """Write object(s) for the column as a URI"""
-    output_obj.write(u"<{}> <{}> <{}> .\n".format(
-        subject, predicate, raw_value
-    ).encode('utf-8'))
+    output_obj.add_uri(subject, predicate, raw_value)
 
 
 def write_objs_as_literal(output_obj, subject, predicate, raw_value, column_spec):
@@ -109,16 +246,15 @@ def write_objs_as_literal(output_obj, subject, predicate, raw_value, column_spec
                 elif base in DATE_TIME_TYPES:
                     value = process_dates_times(value, base)
 
-        lit_value = create_literal(value, kwargs.get("datatype"), kwargs.get("lang"))
-
-        output_obj.write(u"<{}> <{}> {} .\n".format(
-            subject, predicate, lit_value
-        ).encode('utf-8'))
+        output_obj.add_literal(subject, predicate, value, kwargs.get("datatype"),
+                               kwargs.get("lang"))
 
 
 def write_obj_as_list(value_url, row_num, row, col, column_info,
-                      subject, predicate, output):
-    """Write the object as an RDF-list."""
+                      subject, predicate, output, new_node=get_new_blank_node):
+    """Write the object as an RDF-list.
+    :param new_node: Function returning the blank nodes of the list.
+    """
 
     # valueUrl as a list, this will be an RDF collection
     items = []
@@ -151,58 +287,53 @@ def write_obj_as_list(value_url, row_num, row, col, column_info,
                 lit_val = apply_all_subs(val["literal"], row_num, row, column_info)
                 lit_dt = val["datatype"]
                 lit_dt = DATATYPE_MAP[lit_dt] if lit_dt else lit_dt
-                items.append((lit_val, {"datatype": lit_dt}))
+                items.append((lit_val, lit_dt))
         else:
             raise InvalidItemError("Items in valueUrl of {} should be "
                                    "either a string or dictionary".format(col))
 
-    num_items = len(items)
-    if num_items > 0:
-        b_node = get_new_blank_node()
-        output.write(u"<{}> <{}> {} .\n".format(
-            subject, predicate, b_node
-        ).encode('utf-8'))
+    if items:
+        output.add_list(subject, predicate, items, new_node)
 
-        for ind, item in enumerate(items):
-            # Get the value of the item
-            if isinstance(item, string_types):
-                output.write(u"{} <{}> <{}> .\n".format(
-                    b_node, RDF_FIRST, item
-                ).encode('utf-8'))
-            else:
-                lit_value, kwargs = item
-                val = create_literal(lit_value,
-                                     kwargs.get("datatype"),
-                                     kwargs.get("lang"))
-                output.write(u"{} <{}> {} .\n".format(
-                    b_node, RDF_FIRST, val
-                ).encode('utf-8'))
 
-            if ind != (num_items - 1):
-                # Still more items to come
-                new_node = get_new_blank_node()
-                output.write(u"{} <{}> {} .\n".format(
-                    b_node, RDF_REST, new_node
-                ).encode('utf-8'))
-                b_node = new_node
-            else:
-                # Last item, finish with a nil
-                output.write(u"{} <{}> <{}> .\n".format(
-                    b_node, RDF_REST, RDF_NIL
-                ).encode('utf-8'))
-
-
-def write_row(output, row_num, row, table_info):
-    """Write the NT-serialization for csv row."""
+def try_write_row(output, row_num, row, table_info, include_invariants=True, row_errors=None):
+    """Write the triples of csv row into output, see write_row. If row_errors is specified,
+    the triples of a row are only written if the whole row succeeds and the error is
+    recorded in row_errors otherwise.
+    The triples of row-invariant virtual columns stay pending for the next row of the table
+    until a row including them is written.
+    :param row_errors: Optional row_errors.RowErrors for the skip and quarantine policies.
+    :return: Whether the row was written.
+    """
+    if row_errors is None:
+        write_row(output, row_num, row, table_info, include_invariants)
+    else:
+        buffer = RowBuffer(output)
+        try:
+            write_row(buffer, row_num, row, table_info, include_invariants)
+        except Exception as exc:  # pylint: disable=broad-except
+            row_errors.add(table_info['namespace'], row_num, row, exc)
+            return False
+        buffer.commit()
+    if include_invariants:
+        table_info['invariants_pending'] = False
+    return True
+
+
+def write_row(output, row_num, row, table_info, include_invariants=True):
+    """Write the triples of csv row into output, a triple handler such as NTWriter.
+    :param include_invariants: Whether to write the triples of row-invariant virtual columns.
+    """
     table_schema = table_info['table_schema']
     column_info = table_info['column_info']
     table_about_url = table_schema["aboutUrl"]
-    shared_subject = get_new_blank_node()
+    row_id = None
+    if table_info.get('blank_nodes', "random") != "random":
+        row_id = get_row_id(table_info['namespace'], row)
+    shared_subject = get_blank_node_factory(table_info, row_id, "R")()
 
-    for column_ind, col_value in enumerate(row):
-        column_spec = table_schema["columns"][column_ind]
-        if column_spec["suppressOutput"]:
-            continue
+    for column_ind, column_spec in table_info['cell_columns']:
+        col_value = row[column_ind]
 
         # Get the subject
         try:
@@ -227,8 +358,8 @@ def write_row(output, row_num, row, table_info):
             write_objs_as_literal(output, subject, predicate, col_value, column_spec)
 
     # Process virtual columns
-    for column_spec in table_schema["columns"]:
-        if not column_spec["virtual"]:
+    for column_ind, column_spec in table_info['virtual_columns']:
+        if column_spec.get("rowInvariant") and not include_invariants:
             continue
 
         # Get the subject
@@ -244,7 +375,8 @@ def write_row(output, row_num, row, table_info):
 
             if isinstance(value_url, list):
                 write_obj_as_list(value_url, row_num, row, column_spec, column_info,
-                                  subject, predicate, output)
+                                  subject, predicate, output,
+                                  get_blank_node_factory(table_info, row_id, column_ind))
             else:
                 # Apply any substitution first
                 obj_val = apply_all_subs(value_url, row_num, row, column_info)
@@ -255,36 +387,352 @@ def write_row(output, row_num, row, table_info):
             write_objs_as_literal(output, subject, predicate, obj_val, column_spec)
 
 
-def serialize(tables, md_tables, custom_prefixes, output_obj):
-    """Serialize tables in NT-format."""
+class RowOffsets(list):
+    """
+    Byte offsets in the output where rows start. Offsets of every stride'th row are kept
+    and the stride is doubled whenever there are more than max_size of them.
+    Since the triples of a row (including its blank nodes) are written contiguously, these
+    are the positions at which the output can safely be split.
+    """
 
-    for metadata in md_tables:
-        # Bind table url
-        table_url = metadata["url"]
-        if metadata["suppressOutput"]:
+    def __init__(self, max_size=MAX_ROW_OFFSETS):
+        super(RowOffsets, self).__init__()
+        self.max_size = max_size
+        self.stride = 1
+        self.num_rows = 0
+
+    def _thin(self):
+        """ Drop every other offset until there are at most max_size of them."""
+        while len(self) > self.max_size:
+            del self[1::2]
+            self.stride *= 2
+
+    def add(self, offset):
+        """ Record that a row starts at offset."""
+        if self.num_rows % self.stride == 0:
+            self.append(offset)
+            self._thin()
+        self.num_rows += 1
+
+    def add_shifted(self, offsets, base):
+        """ Record the offsets of rows written to another output, which starts at base."""
+        self.extend(base + x for x in offsets)
+        self._thin()
+
+
+def get_column_name(column_spec):
+    """Get the name of a column, or its (first) title if it has no name."""
+    if "name" in column_spec:
+        return column_spec["name"]
+    titles = column_spec.get("titles")
+    return titles if isinstance(titles, string_types) or titles is None else titles[0]
+
+
+def get_column_plan(table_schema, columns=None, exclude_columns=None):
+    """Get the columns generating triples, leaving out suppressed columns and, if specified,
+    the columns not in columns or in exclude_columns.
+    :return: Tuple of lists of (index, spec) tuples of non-virtual and virtual columns.
+    """
+    cell_columns, virtual_columns = [], []
+    for ind, spec in enumerate(table_schema["columns"]):
+        name = get_column_name(spec)
+        if columns is not None and name not in columns:
             continue
-
-        table_info = {
-            'table_schema': metadata["tableSchema"],
-            'namespace': table_url,
-            'column_info': {
-                'column_map': get_column_map(metadata["tableSchema"]),
-                'prefixes': custom_prefixes
-            }
+        if exclude_columns is not None and name in exclude_columns:
+            continue
+        if spec["virtual"]:
+            virtual_columns.append((ind, spec))
+        elif not spec["suppressOutput"]:
+            cell_columns.append((ind, spec))
+    return cell_columns, virtual_columns
+
+
+def get_row_start(options):
+    """Get the number of the first row to serialize from serialization options, the row
+    to resume from if it is after row_start."""
+    if not options:
+        return 1
+    return max(options.get('row_start') or 1, options.get('resume_row') or 1)
+
+
+def iter_table_rows(table_file_obj, metadata, custom_prefixes, options=None, first_row=None,
+                    row_errors=None):
+    """Iterate over the rows of a single table.
+    :param table_file_obj: File-like object of the csv file of the table.
+    :param metadata: Metadata of the table.
+    :param options: Optional dictionary of serialization options, e.g. blank_nodes, skolem_base,
+    per_row_invariants, the range of row numbers from row_start to row_end (inclusive) and
+    the names of columns and exclude_columns to project the columns generating triples,
+    and resume_row to skip the rows before it that are already serialized.
+    :param first_row: Number of the row table_file_obj is positioned at, if it was opened at
+    a row through its row index, see TableSource.open_at_row.
+    :param row_errors: Optional row_errors.RowErrors to record rows with a wrong number of
+    columns into instead of raising.
+    :return: An iterator over tuples of row number, row, table info and whether the row
+    should include the triples of row-invariant virtual columns, as passed to write_row.
+    """
+    # Bind table url
+    table_url = metadata["url"]
+    table_info = {
+        'table_schema': metadata["tableSchema"],
+        'namespace': table_url,
+        'column_info': {
+            'column_map': get_column_map(metadata["tableSchema"]),
+            'prefixes': custom_prefixes
         }
-        num_nonvirtual_columns = sum([1 for x in metadata["tableSchema"]["columns"] if not x["virtual"]])
+    }
+    table_info.update(options if options else {})
+    table_info['cell_columns'], table_info['virtual_columns'] = get_column_plan(
+        metadata["tableSchema"], table_info.get('columns'), table_info.get('exclude_columns'))
+    num_nonvirtual_columns = sum([1 for x in metadata["tableSchema"]["columns"] if not x["virtual"]])
+    per_row_invariants = table_info.get('per_row_invariants', False)
+    skip_to = get_row_start(table_info)
+    # Triples of row-invariant virtual columns are written with the first row written only,
+    # unless the rows are resumed after it, see try_write_row
+    table_info['invariants_pending'] = skip_to == (table_info.get('row_start') or 1)
+    row_end = table_info.get('row_end')
+    if first_row is None:
         # Read the csv file fresh after rewinding the file
-        table_file_obj = tables[table_url]
         table_file_obj.seek(0)
         table_csv_reader = read_csv(table_file_obj)
-
         next(table_csv_reader)  # Ignore header
+        first_row = 1
+    else:
+        table_csv_reader = read_csv(table_file_obj)
+
+    # Rows before row_start, or the row to resume from, are skipped without generating triples
+    for row_num, row in itertools.islice(enumerate(table_csv_reader, first_row),
+                                         skip_to - first_row,
+                                         row_end - first_row + 1 if row_end else None):
+        if len(row) != num_nonvirtual_columns:
+            exc = NumberOfNonVirtualColumnsMismatch(
+                "The number of non-virtual columns in metadata, {}, "
+                "do not match with the number of columns in row {}, {}, "
+                "of the csv file '{}'.".format(
+                    num_nonvirtual_columns, row_num, len(row), table_url))
+            if row_errors is None:
+                raise exc
+            row_errors.add(table_url, row_num, row, exc)
+            continue
+        yield str(row_num), row, table_info, \
+            per_row_invariants or table_info['invariants_pending']
+
+
+def serialize_table(table_file_obj, metadata, custom_prefixes, output_obj, row_offsets=None,
+                    options=None, first_row=None, checkpointer=None, table_ind=0,
+                    row_errors=None, progress=None):
+    """Serialize a single table in NT-format.
+    :param table_file_obj: File-like object of the csv file of the table.
+    :param metadata: Metadata of the table.
+    :param row_offsets: Optional RowOffsets to record where rows start in output_obj.
+    :param options: Optional dictionary of serialization options, see iter_table_rows.
+    :param first_row: Number of the row table_file_obj is positioned at, see iter_table_rows.
+    :param checkpointer: Optional checkpoint.Checkpointer to record the rows written.
+    :param table_ind: Index of the table among the serialized tables, for checkpointer.
+    :param row_errors: Optional row_errors.RowErrors to record failed rows into instead of raising.
+    :param progress: Optional progress.Progress or progress.SharedProgress to update the counts
+    of the table in every PROGRESS_CHECK_ROWS rows.
+    """
+    consume(iter_serialize_table(table_file_obj, metadata, custom_prefixes, output_obj,
+                                 row_offsets, options, first_row, checkpointer, table_ind,
+                                 row_errors, progress))
 
-        for row_num, row in enumerate(table_csv_reader):
-            if len(row) != num_nonvirtual_columns:
-                raise NumberOfNonVirtualColumnsMismatch(
-                    "The number of non-virtual columns in metadata, {}, "
-                    "do not match with the number of columns in row {}, {}, "
-                    "of the csv file '{}'.".format(
-                        num_nonvirtual_columns, row_num + 1, len(row), table_url))
-            write_row(output_obj, str(row_num + 1), row, table_info)
+
+def iter_serialize_table(table_file_obj, metadata, custom_prefixes, output_obj, row_offsets=None,
+                         options=None, first_row=None, checkpointer=None, table_ind=0,
+                         row_errors=None, progress=None):
+    """Serialize a single table in NT-format one row at a time, see serialize_table.
+    :return: An iterator yielding after each row is serialized.
+    """
+    writer = NTWriter(output_obj)
+    num_rows = 0
+    for row_num, row, table_info, include_invariants in iter_table_rows(
+            table_file_obj, metadata, custom_prefixes, options, first_row, row_errors):
+        if row_offsets is not None:
+            row_offsets.add(output_obj.tell())
+        try_write_row(writer, row_num, row, table_info, include_invariants, row_errors)
+        if checkpointer is not None:
+            checkpointer.add_row(output_obj, table_ind, row_num)
+        if progress is not None:
+            num_rows += 1
+            if num_rows % PROGRESS_CHECK_ROWS == 0:
+                progress.update_table(metadata["url"], num_rows, writer.num_triples,
+                                      get_bytes_read(table_file_obj))
+        yield
+    if progress is not None:
+        progress.update_table(metadata["url"], num_rows, writer.num_triples,
+                              get_bytes_read(table_file_obj))
+
+
+def consume(steps):
+    """Run an iterator of steps to its end, see iter_serialize.
+    :param steps: Iterator to run.
+    """
+    for _ in steps:
+        pass
+
+
+def iter_rows(tables, md_tables, custom_prefixes, options=None, row_errors=None):
+    """Iterate over the rows of tables, opening the source of each table only while its rows
+    are iterated over.
+    :param tables: Dictionary from table url to its TableSource.
+    :param options: Optional dictionary of serialization options, see iter_table_rows.
+    :param row_errors: Optional row_errors.RowErrors, see iter_table_rows.
+    :return: An iterator over the arguments of write_row for each row, see iter_table_rows.
+    """
+    for metadata in md_tables:
+        if metadata["suppressOutput"]:
+            continue
+        with tables[metadata["url"]].open_at_row(get_row_start(options)) as (table_file_obj,
+                                                                             first_row):
+            for row_args in iter_table_rows(table_file_obj, metadata, custom_prefixes, options,
+                                            first_row, row_errors):
+                yield row_args
+
+
+def write_tables(tables, md_tables, custom_prefixes, handler, options=None, row_errors=None):
+    """Write the triples of tables into a triple handler, see iter_rows.
+    :param handler: Triple handler, see NTWriter.
+    """
+    for row_num, row, table_info, include_invariants in iter_rows(
+            tables, md_tables, custom_prefixes, options, row_errors):
+        try_write_row(handler, row_num, row, table_info, include_invariants, row_errors)
+
+
+def _serialize_table_fragment(table_source, metadata, custom_prefixes, fragment_path, options,
+                              on_error, max_errors, progress_counts):
+    """Serialize a single table into the fragment file in a worker process.
+    :param on_error: Error policy of failed rows, see row_errors.ON_ERROR_POLICIES.
+    :param max_errors: Maximum number of failed rows, so that the worker aborts as soon as
+    the table alone fails more rows. The rows failed so far are still returned, for the main
+    process to record them and raise TooManyRowErrors.
+    :param progress_counts: Optional dictionary shared with the main process to update the
+    counts of the table in, see progress.SharedProgress.
+    :return: Tuple of offsets where rows start in the fragment and records of failed rows.
+    """
+    row_offsets = RowOffsets()
+    row_errors = RowErrors(on_error, max_errors=max_errors, keep_records=True) \
+        if on_error != "fail" else None
+    progress = SharedProgress(progress_counts) if progress_counts is not None else None
+    try:
+        with table_source.open_at_row(get_row_start(options)) as (table_file_obj, first_row), \
+                io.open(fragment_path, 'wb') as fragment:
+            serialize_table(table_file_obj, metadata, custom_prefixes, fragment, row_offsets,
+                            options, first_row, row_errors=row_errors, progress=progress)
+    except TooManyRowErrors:
+        pass
+    return list(row_offsets), row_errors.records if row_errors is not None else []
+
+
+def _serialize_parallel(tables, md_tables, custom_prefixes, output_obj, row_offsets, jobs,
+                        temp_dir, options, row_errors, progress):
+    """Serialize tables in parallel worker processes into fragment files,
+    largest csv files first, and concatenate fragments in the order of the metadata.
+    Rows failed in the workers are recorded into row_errors in the order of the metadata,
+    those of all tables even once more than max_errors failed, before TooManyRowErrors is
+    raised. The counts of the workers are aggregated into progress while waiting for them."""
+    sources = [tables[x["url"]].picklable() for x in md_tables]
+    fragment_paths = []
+    manager, shared_progress = None, None
+    if progress is not None:
+        manager = Manager()
+        shared_progress = SharedProgress(manager.dict())
+        for source, metadata in zip(sources, md_tables):
+            shared_progress.start_table(metadata["url"], source.size())
+    pool = Pool(min(jobs, len(md_tables)))
+    try:
+        for _ in md_tables:
+            fragment = NamedTemporaryFile(dir=temp_dir, suffix=".nt", delete=False)
+            fragment.close()
+            fragment_paths.append(fragment.name)
+
+        results = [None] * len(md_tables)
+        by_size = sorted(range(len(md_tables)),
+                         key=lambda x: sources[x].size() or 0, reverse=True)
+        for ind in by_size:
+            results[ind] = pool.apply_async(_serialize_table_fragment,
+                                            (sources[ind], md_tables[ind], custom_prefixes,
+                                             fragment_paths[ind], options,
+                                             row_errors.policy if row_errors else "fail",
+                                             row_errors.max_errors if row_errors else None,
+                                             shared_progress.counts if shared_progress else None))
+        pool.close()
+
+        too_many_errors = None
+        for result, fragment_path in zip(results, fragment_paths):
+            while progress is not None and not result.ready():
+                result.wait(progress.interval)
+                shared_progress.merge_into(progress)
+                progress.report_if_due()
+            fragment_offsets, error_records = result.get()
+            for record in error_records:
+                try:
+                    row_errors.add_record(record)
+                except TooManyRowErrors as exc:
+                    too_many_errors = too_many_errors or exc
+            if too_many_errors is not None:
+                continue
+            if row_offsets is not None:
+                row_offsets.add_shifted(fragment_offsets, output_obj.tell())
+            with io.open(fragment_path, 'rb') as fragment:
+                shutil.copyfileobj(fragment, output_obj, COPY_BLOCK_SIZE)
+        if too_many_errors is not None:
+            raise too_many_errors
+    finally:
+        pool.terminate()
+        pool.join()
+        if manager is not None:
+            shared_progress.merge_into(progress)
+            manager.shutdown()
+        for fragment_path in fragment_paths:
+            os.remove(fragment_path)
+
+
+def serialize(tables, md_tables, custom_prefixes, output_obj, row_offsets=None, jobs=1,
+              temp_dir=None, options=None, checkpointer=None, row_errors=None, progress=None):
+    """Serialize tables in NT-format, opening the source of each table only while it is serialized.
+    :param tables: Dictionary from table url to its TableSource.
+    :param row_offsets: Optional RowOffsets to record where rows start in output_obj.
+    :param jobs: Number of worker processes to serialize multiple tables in parallel.
+    :param temp_dir: Directory of the fragment files written by parallel workers.
+    :param options: Optional dictionary of serialization options, see iter_table_rows.
+    :param checkpointer: Optional checkpoint.Checkpointer to record checkpoints and resume
+    from its state, only in a single process.
+    :param row_errors: Optional row_errors.RowErrors to record failed rows into instead of raising.
+    :param progress: Optional progress.Progress to report the progress of serialization to.
+    """
+    consume(iter_serialize(tables, md_tables, custom_prefixes, output_obj, row_offsets, jobs,
+                           temp_dir, options, checkpointer, row_errors, progress))
+
+
+def iter_serialize(tables, md_tables, custom_prefixes, output_obj, row_offsets=None, jobs=1,
+                   temp_dir=None, options=None, checkpointer=None, row_errors=None,
+                   progress=None):
+    """Serialize tables in NT-format one row at a time, see serialize. Tables serialized in
+    parallel by worker processes are waited for in a single step.
+    :return: An iterator yielding after each row is serialized.
+    """
+    md_tables = [x for x in md_tables if not x["suppressOutput"]]
+    if jobs > 1 and len(md_tables) > 1 and checkpointer is None:
+        _serialize_parallel(tables, md_tables, custom_prefixes, output_obj, row_offsets, jobs,
+                            temp_dir, options, row_errors, progress)
+        return
+
+    for table_ind, metadata in enumerate(md_tables):
+        table_options = options
+        if checkpointer is not None:
+            resume_row = checkpointer.get_resume_row(table_ind)
+            if resume_row is None:
+                # Already in the output
+                continue
+            table_options = dict(options if options else {}, resume_row=resume_row)
+        if progress is not None:
+            progress.start_table(metadata["url"], tables[metadata["url"]].size())
+        with tables[metadata["url"]].open_at_row(get_row_start(table_options)) as \
+                (table_file_obj, first_row):
+            for step in iter_serialize_table(table_file_obj, metadata, custom_prefixes,
+                                             output_obj, row_offsets, table_options, first_row,
+                                             checkpointer, table_ind, row_errors, progress):
+                yield step
+        if checkpointer is not None:
+            checkpointer.finish_table(output_obj, table_ind)
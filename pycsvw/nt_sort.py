@@ -0,0 +1,154 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+External merge sort of NT-serializations in bounded memory.
+
+Lines are read into runs of at most max_memory bytes, each run is sorted and spilled
+into a file in temp_dir, and the runs are merged. Since a subject never contains a space,
+sorting whole lines keeps the triples of each subject together, so 'spo' and unique
+outputs are sorted by lines while 'subject' keeps the original order within each subject.
+"""
+import heapq
+import io
+import os
+import sys
+from multiprocessing import Pool
+from tempfile import NamedTemporaryFile
+
+SORT_KEYS = ["subject", "spo"]
+# Default upper bound on the memory used by the lines of a single run
+SORT_MEMORY = 1 << 26
+
+
+def get_subject(line):
+    """Get the subject of an NT line."""
+    return line.split(b" ", 1)[0]
+
+
+def _decorate(lines, by, run_ind):
+    """Decorate the lines of a run with their keys so that merging is stable."""
+    if by == "subject":
+        return ((get_subject(line), run_ind, line) for line in lines)
+    return ((line, run_ind, line) for line in lines)
+
+
+def _merge(runs, by, unique):
+    """Merge sorted iterables of lines.
+    :return: An iterator over the merged lines, without consecutive duplicates if unique.
+    """
+    last = None
+    for _, _, line in heapq.merge(*[_decorate(run, by, ind) for ind, run in enumerate(runs)]):
+        if unique and line == last:
+            continue
+        last = line
+        yield line
+
+
+def _write_run(lines, by, unique, temp_dir):
+    """Sort the lines and spill them into a file in temp_dir.
+    :return: The path of the run file.
+    """
+    lines.sort(key=get_subject if by == "subject" else None)
+    run = NamedTemporaryFile(dir=temp_dir, suffix=".nt", delete=False)
+    with run:
+        for line in _merge([lines], by, unique):
+            run.write(line)
+    return run.name
+
+
+def _merge_run_files(run_paths, by, unique, temp_dir):
+    """Merge the run files into a single run file, in a worker process.
+    :return: The path of the merged run file.
+    """
+    run_files = [io.open(x, 'rb') for x in run_paths]
+    try:
+        merged = NamedTemporaryFile(dir=temp_dir, suffix=".nt", delete=False)
+        with merged:
+            for line in _merge(run_files, by, unique):
+                merged.write(line)
+        return merged.name
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def _merge_in_parallel(run_paths, by, unique, temp_dir, jobs):
+    """Merge consecutive groups of run files in parallel worker processes.
+    :return: The paths of at most jobs merged run files, in the order of the runs.
+    """
+    group_size = -(-len(run_paths) // jobs)
+    groups = [run_paths[ind:ind + group_size] for ind in range(0, len(run_paths), group_size)]
+    pool = Pool(len(groups))
+    try:
+        results = [pool.apply_async(_merge_run_files, (group, by, unique, temp_dir))
+                   for group in groups]
+        pool.close()
+        return [result.get() for result in results]
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def sort_nt(in_file, out_file, by="subject", unique=False, max_memory=SORT_MEMORY,
+            temp_dir=None, jobs=1):
+    """Sort the NT-serialization in in_file into out_file.
+    :param in_file: File-like object of the NT-serialization in binary mode.
+    :param out_file: File-like object to write the sorted lines into in binary mode.
+    :param by: 'subject' to group triples by their subjects, 'spo' to sort whole triples.
+    :param unique: Whether to drop duplicate triples, which sorts whole triples.
+    :param max_memory: Upper bound on the memory used by the lines of a single run.
+    :param temp_dir: Directory of the run files.
+    :param jobs: Number of worker processes merging runs in parallel.
+    :return: None.
+    """
+    if by not in SORT_KEYS:
+        raise ValueError("Sort key should be one of {}, not '{}'".format(SORT_KEYS, by))
+    # Duplicates are only consecutive when whole triples are sorted
+    by = "spo" if unique else by
+
+    run_paths = []
+    try:
+        lines, size = [], 0
+        for line in in_file:
+            lines.append(line)
+            size += sys.getsizeof(line)
+            if size >= max_memory:
+                run_paths.append(_write_run(lines, by, unique, temp_dir))
+                lines, size = [], 0
+
+        if not run_paths:
+            # Everything fits in memory
+            lines.sort(key=get_subject if by == "subject" else None)
+            for line in _merge([lines], by, unique):
+                out_file.write(line)
+            return
+        if lines:
+            run_paths.append(_write_run(lines, by, unique, temp_dir))
+        del lines
+
+        if jobs > 1 and len(run_paths) > jobs:
+            merged_paths = _merge_in_parallel(run_paths, by, unique, temp_dir, jobs)
+            for run_path in run_paths:
+                os.remove(run_path)
+            run_paths = merged_paths
+
+        run_files = [io.open(x, 'rb') for x in run_paths]
+        try:
+            for line in _merge(run_files, by, unique):
+                out_file.write(line)
+        finally:
+            for run_file in run_files:
+                run_file.close()
+    finally:
+        for run_path in run_paths:
+            if os.path.exists(run_path):
+                os.remove(run_path)
@@ -0,0 +1,152 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Progress reports of conversions.
+
+Serialization updates the counts of each table every PROGRESS_CHECK_ROWS rows, and reports
+are passed to the callback at most once every interval seconds, so the rows in between only
+cost an increment. Worker processes serializing tables in parallel update shared counts that
+the main process aggregates while it waits for them.
+"""
+import time
+
+# Minimum number of seconds between reports
+PROGRESS_INTERVAL = 1.0
+# Number of rows between updates of the counts of a table
+PROGRESS_CHECK_ROWS = 256
+
+
+def get_bytes_read(handle):
+    """Get the number of bytes read from the underlying binary file of a text file-like object,
+    None if it is not known e.g. for in-memory contents."""
+    try:
+        return handle.buffer.tell()
+    except (AttributeError, IOError, ValueError):
+        return None
+
+
+def format_progress(report):
+    """Format a progress report into a single line."""
+    parts = ["{phase}: {rows} rows, {triples} triples".format(**report)]
+    if report["bytes_read"]:
+        if report["bytes_total"]:
+            parts.append("{:.1f} of {:.1f} MB read".format(report["bytes_read"] / 1e6,
+                                                           report["bytes_total"] / 1e6))
+        else:
+            parts.append("{:.1f} MB read".format(report["bytes_read"] / 1e6))
+    if report["rows_per_second"] is not None:
+        parts.append("{:.0f} rows/s".format(report["rows_per_second"]))
+    if report["eta"] is not None:
+        parts.append("ETA {:.0f}s".format(report["eta"]))
+    parts.append("{:.1f}s elapsed".format(report["elapsed"]))
+    return ", ".join(parts)
+
+
+class Progress(object):
+    """
+    Tracks the progress of a conversion through its phases ('serialize', 'sort',
+    'convert' and 'done') and the counts of the tables, and passes throttled reports to callback.
+    Reports are dictionaries of phase, table, rows, triples, bytes_read, bytes_total, elapsed
+    seconds, the current rows_per_second, the eta in seconds if the sizes of the csv files are
+    known, the durations of the finished phases and the counts of each table in tables.
+    """
+
+    def __init__(self, callback, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.phase = None
+        self.table = None
+        # Table url to list of rows, triples, bytes read and size of the csv file
+        self.tables = {}
+        self.durations = {}
+        self._start = self._phase_start = self._last_time = time.time()
+        self._last_rows, self._last_bytes = 0, 0
+        self._rows_per_second, self._bytes_per_second = None, None
+
+    def set_phase(self, phase):
+        """Start a phase and report it."""
+        now = time.time()
+        if self.phase is not None:
+            self.durations[self.phase] = self.durations.get(self.phase, 0) + now - self._phase_start
+        self.phase, self._phase_start = phase, now
+        self.report(now)
+
+    def start_table(self, table_url, bytes_total=None):
+        """Start counting the rows of a table."""
+        self.table = table_url
+        self.tables[table_url] = [0, 0, 0, bytes_total]
+
+    def update_table(self, table_url, rows, triples, bytes_read=None):
+        """Update the counts of a table and report if the interval has passed."""
+        counts = self.tables.setdefault(table_url, [0, 0, 0, None])
+        counts[0], counts[1] = rows, triples
+        if bytes_read is not None:
+            counts[2] = bytes_read
+        self.report_if_due()
+
+    def report_if_due(self):
+        """Report if the interval has passed since the last report."""
+        now = time.time()
+        if now - self._last_time >= self.interval:
+            self.report(now)
+
+    def report(self, now=None):
+        """Pass a report to the callback."""
+        now = now if now is not None else time.time()
+        rows = sum(x[0] for x in self.tables.values())
+        bytes_read = sum(x[2] for x in self.tables.values())
+        sizes = [x[3] for x in self.tables.values()]
+        bytes_total = sum(sizes) if sizes and None not in sizes else None
+        if now > self._last_time and rows > self._last_rows:
+            self._rows_per_second = (rows - self._last_rows) / (now - self._last_time)
+            self._bytes_per_second = (bytes_read - self._last_bytes) / (now - self._last_time)
+        eta = None
+        if self.phase == "serialize" and bytes_total and self._bytes_per_second:
+            eta = max(bytes_total - bytes_read, 0) / self._bytes_per_second
+        self._last_time, self._last_rows, self._last_bytes = now, rows, bytes_read
+        self.callback({
+            "phase": self.phase,
+            "table": self.table,
+            "rows": rows,
+            "triples": sum(x[1] for x in self.tables.values()),
+            "bytes_read": bytes_read,
+            "bytes_total": bytes_total,
+            "elapsed": now - self._start,
+            "rows_per_second": self._rows_per_second,
+            "eta": eta,
+            "durations": dict(self.durations),
+            "tables": {url: {"rows": x[0], "triples": x[1], "bytes_read": x[2], "bytes_total": x[3]}
+                       for url, x in self.tables.items()}
+        })
+
+
+class SharedProgress(object):
+    """
+    Counts of the tables serialized in a worker process, kept in a dictionary shared with
+    the main process, e.g. a multiprocessing.Manager dict, see Progress.
+    """
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    def start_table(self, table_url, bytes_total=None):
+        """Start counting the rows of a table."""
+        self.counts[table_url] = (0, 0, 0, bytes_total)
+
+    def update_table(self, table_url, rows, triples, bytes_read=None):
+        """Update the counts of a table."""
+        self.counts[table_url] = (rows, triples, bytes_read or 0, self.counts[table_url][3])
+
+    def merge_into(self, progress):
+        """Copy the counts into a Progress of the main process."""
+        for table_url, counts in self.counts.items():
+            progress.tables[table_url] = list(counts)
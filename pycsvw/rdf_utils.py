@@ -13,6 +13,7 @@
 import re
 
 from six.moves.urllib.parse import quote  # pylint: disable=import-error
+from six import string_types
 
 from .csvw_exceptions import NullValueException, MissingColumnError, FailedSubstitutionError
 
@@ -86,6 +87,15 @@ def apply_all_subs(url, row_num, row, column_info, quote_sub=True):
     return resolve_url(out, column_info['prefixes'])
 
 
+def is_row_invariant(column_spec, table_about_url):
+    """ Check if a virtual column generates the same triple for every row, i.e. its subject,
+    predicate and object are not RDF-lists and do not have any substitutions."""
+    about_url = column_spec["aboutUrl"] if column_spec["aboutUrl"] else table_about_url
+    obj = column_spec["valueUrl"] if column_spec["valueUrl"] else column_spec["default"]
+    return all(isinstance(x, string_types) and "{" not in x
+               for x in [about_url, column_spec.get("propertyUrl"), obj])
+
+
 def get_subject_for_cell(row_num, row, column_spec, table_about_url, shared_subject, column_info):
     """ Get the subject for the given cell."""
     if column_spec["aboutUrl"]:
@@ -0,0 +1,552 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming writers of RDF formats.
+
+Writers receive the triples of each row as tuples of Terms right after the row is serialized,
+so formats are written in a single pass over the csv files without an NT-serialization to
+convert, and only the triples of a single row are held in memory.
+"""
+import json
+import re
+from collections import OrderedDict
+from itertools import count
+
+from six import string_types
+
+from .binary_triples import BinaryTriplesWriter
+from .generator_utils import DATATYPE_MAP, RDF
+from .nt_serializer import consume, create_literal, get_row_start, iter_table_rows, \
+    try_write_row
+from .progress import get_bytes_read, PROGRESS_CHECK_ROWS
+from .rdf_utils import get_predicate_for_cell
+from .triple_handlers import BNODE, LITERAL, URI, TermCollector
+
+RDF_TYPE = RDF + "type"
+# Prefixes and local names which can be written as prefixed names without escaping
+PREFIX_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_-]*$")
+LOCAL_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_-]*$")
+# Local names of the elements of properties in RDF/XML, and characters not allowed in XML 1.0
+XML_LOCAL_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_.-]*$")
+INVALID_XML_CHARS_PATTERN = re.compile(u"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def format_term(term):
+    """Format a Term in N-Triples syntax."""
+    if term.kind == URI:
+        return u"<{}>".format(term.value)
+    if term.kind == BNODE:
+        return u"_:" + term.value
+    return create_literal(term.value, term.datatype, term.lang)
+
+
+def split_xml_name(iri):
+    """Split an IRI into a namespace and the longest local name that is an XML name.
+    :return: Tuple of namespace and local name.
+    """
+    match = XML_LOCAL_NAME_PATTERN.search(iri)
+    if match is None or match.start() == 0:
+        raise ValueError("Property '{}' can not be written in RDF/XML".format(iri))
+    return iri[:match.start()], match.group()
+
+
+def escape_xml_text(text):
+    """Escape text content of an XML element."""
+    if INVALID_XML_CHARS_PATTERN.search(text):
+        raise ValueError("{!r} has characters not allowed in XML".format(text))
+    return text.replace(u"&", u"&amp;").replace(u"<", u"&lt;").replace(u">", u"&gt;") \
+        .replace(u"\r", u"&#13;")
+
+
+def escape_xml_attr(text):
+    """Escape the value of an XML attribute in double quotes."""
+    return escape_xml_text(text).replace(u'"', u"&quot;").replace(u"\n", u"&#10;") \
+        .replace(u"\t", u"&#9;")
+
+
+def group_by_subject(triples):
+    """Group triples by subject, in the order subjects first appear.
+    :return: A list of tuples of subject and the list of its predicate and object tuples.
+    """
+    groups = OrderedDict()
+    for subject, predicate, obj in triples:
+        groups.setdefault(subject, []).append((predicate, obj))
+    return list(groups.items())
+
+
+def get_local_name(iri):
+    """Get the part of an IRI after its last '/' or '#'."""
+    return iri[max(iri.rfind(u"/"), iri.rfind(u"#")) + 1:]
+
+
+def get_column_datatype(column_spec):
+    """Get the IRI of the datatype of the literals of a column, None for plain strings."""
+    datatype = column_spec["datatype"]
+    if datatype is None:
+        return None
+    if isinstance(datatype, string_types):
+        return DATATYPE_MAP.get(datatype, datatype) if datatype != "string" else None
+    return DATATYPE_MAP.get(datatype["base"], datatype["base"])
+
+
+def iter_column_properties(md_tables, custom_prefixes):
+    """Iterate over the columns without substitutions in their propertyUrl.
+    :return: An iterator over tuples of the column spec and the IRI of its property.
+    """
+    column_info = {"prefixes": custom_prefixes}
+    for metadata in md_tables:
+        if metadata["suppressOutput"]:
+            continue
+        for spec in metadata["tableSchema"]["columns"]:
+            if spec["suppressOutput"] or "{" in (spec.get("propertyUrl") or "") or \
+                    ("propertyUrl" not in spec and "name" not in spec):
+                continue
+            yield spec, get_predicate_for_cell(None, None, spec, metadata["url"], column_info)
+
+
+def get_metadata_iris(md_tables, custom_prefixes):
+    """Get the IRIs known from the metadata that repeat on every row: the properties of columns
+    without substitutions in their propertyUrl and the datatypes of the columns.
+    :return: A set of IRIs.
+    """
+    iris = {RDF_TYPE}
+    iris.update(x[1] for x in iter_column_properties(md_tables, custom_prefixes))
+    for metadata in md_tables:
+        for spec in metadata["tableSchema"]["columns"]:
+            datatype = get_column_datatype(spec)
+            if datatype is not None:
+                iris.add(datatype)
+    return iris
+
+
+def get_property_types(md_tables, custom_prefixes):
+    """Get the types of the objects of the properties of columns without substitutions in
+    their propertyUrl, if all the columns of a property have objects of the same type.
+    :return: Dictionary of property IRIs to '@id' for IRIs or the IRIs of datatypes.
+    """
+    types, conflicts = {}, set()
+    for spec, predicate in iter_column_properties(md_tables, custom_prefixes):
+        if isinstance(spec["valueUrl"], list):
+            continue
+        if spec["valueUrl"]:
+            obj_type = "@id"
+        else:
+            obj_type = get_column_datatype(spec) if "lang" not in spec else None
+        if types.get(predicate, obj_type) != obj_type:
+            conflicts.add(predicate)
+        types[predicate] = obj_type
+    return {x: y for x, y in types.items() if y is not None and x not in conflicts}
+
+
+class PrefixedNames(object):
+    """
+    Shortens IRIs into prefixed names of the namespaces whose IRIs end with '/' or '#'.
+    The predicates and datatypes known from the metadata are cached since they repeat on every
+    row, others, e.g. from propertyUrl substitutions, are not to keep memory bounded.
+    """
+
+    def __init__(self, namespaces):
+        self.namespaces = OrderedDict(sorted(
+            (pre, url) for pre, url in namespaces.items() if PREFIX_PATTERN.match(pre)))
+        self._prefixes = {}
+        for pre, url in self.namespaces.items():
+            self._prefixes.setdefault(url, pre)
+        self._cache = {}
+
+    def shorten(self, iri):
+        """Get the prefixed name of an IRI, None if it has none."""
+        local_name = get_local_name(iri)
+        prefix = self._prefixes.get(iri[:len(iri) - len(local_name)])
+        if prefix is None or not LOCAL_NAME_PATTERN.match(local_name):
+            return None
+        return u"{}:{}".format(prefix, local_name)
+
+    def cache(self, iris):
+        """Cache the prefixed names of IRIs, see get_metadata_iris."""
+        for iri in iris:
+            self._cache[iri] = self.shorten(iri)
+
+    def shorten_cached(self, iri):
+        """Get the prefixed name of an IRI from the cache if it is cached, None if it has
+        none."""
+        try:
+            return self._cache[iri]
+        except KeyError:
+            return self.shorten(iri)
+
+
+class RDFWriter(object):
+    """
+    Base of the writers of RDF formats. Writers get start, start_table, write_triples for
+    each row, end_table and finish called in that order, see write_rdf.
+    """
+
+    def __init__(self, output_obj, namespaces, graph_iris=None):
+        """
+        :param output_obj: Binary file-like object to write into.
+        :param namespaces: Dictionary of prefixes to namespace IRIs.
+        :param graph_iris: Dictionary of table urls to the IRIs of their named graphs,
+        which are the table urls by default, for formats with named graphs. Tables mapped
+        to None are put into the default graph.
+        """
+        self.output_obj = output_obj
+        self.namespaces = namespaces
+        self.graph_iris = graph_iris if graph_iris is not None else {}
+
+    def start(self, md_tables):
+        """Write what precedes the triples of the tables.
+        :param md_tables: Metadata of the tables.
+        """
+        pass
+
+    def start_table(self, table_url):
+        """Start the triples of a table."""
+        pass
+
+    def write_triples(self, triples):
+        """Write the triples of a row."""
+        raise NotImplementedError()
+
+    def end_table(self):
+        """Finish the triples of a table."""
+        pass
+
+    def finish(self):
+        """Write what follows the triples."""
+        pass
+
+
+class NQuadsWriter(RDFWriter):
+    """
+    Writer of N-Quads, putting the triples of each table into a named graph.
+    """
+
+    def __init__(self, output_obj, namespaces, graph_iris=None):
+        super(NQuadsWriter, self).__init__(output_obj, namespaces, graph_iris)
+        self._graph_term = None
+
+    def start_table(self, table_url):
+        """Start the named graph of a table."""
+        graph = self.graph_iris.get(table_url, table_url)
+        self._graph_term = u" <{}>".format(graph) if graph is not None else u""
+
+    def write_triples(self, triples):
+        """Write the triples of a row."""
+        self.output_obj.write(u"".join(
+            u"{} {} {}{} .\n".format(format_term(subject), format_term(predicate),
+                                     format_term(obj), self._graph_term)
+            for subject, predicate, obj in triples).encode('utf-8'))
+
+
+class TriGWriter(NQuadsWriter):
+    """
+    Writer of TriG, putting the triples of each table into a named graph block, with
+    the triples of each subject of a row grouped and IRIs shortened by the namespaces.
+    """
+
+    def __init__(self, output_obj, namespaces, graph_iris=None):
+        super(TriGWriter, self).__init__(output_obj, namespaces, graph_iris)
+        self._names = PrefixedNames(namespaces)
+
+    def _iri(self, iri, cached=False):
+        """Format an IRI as a prefixed name if it has one."""
+        name = self._names.shorten_cached(iri) if cached else self._names.shorten(iri)
+        return name if name is not None else u"<{}>".format(iri)
+
+    def _term(self, term):
+        """Format a subject or object Term."""
+        if term.kind == URI:
+            return self._iri(term.value)
+        if term.kind == BNODE:
+            return u"_:" + term.value
+        if term.datatype is not None:
+            return u"{}^^{}".format(create_literal(term.value),
+                                    self._iri(term.datatype, cached=True))
+        return create_literal(term.value, lang=term.lang)
+
+    def start(self, md_tables):
+        """Write the prefix declarations."""
+        self._names.cache(get_metadata_iris(md_tables, self.namespaces))
+        self.output_obj.write(u"".join(
+            u"@prefix {}: <{}> .\n".format(pre, url)
+            for pre, url in self._names.namespaces.items()).encode('utf-8'))
+
+    def start_table(self, table_url):
+        """Open the graph block of a table."""
+        graph = self.graph_iris.get(table_url, table_url)
+        self.output_obj.write(
+            (u"\n<{}> {{\n".format(graph) if graph is not None else u"\n{\n").encode('utf-8'))
+
+    def write_triples(self, triples):
+        """Write the triples of a row grouped by subject."""
+        lines = []
+        for subject, pairs in group_by_subject(triples):
+            lines.append(u"    {} {}".format(self._term(subject), u" ;\n        ".join(
+                u"{} {}".format(self._iri(predicate.value, cached=True), self._term(obj))
+                for predicate, obj in pairs)) + u" .\n")
+        self.output_obj.write(u"".join(lines).encode('utf-8'))
+
+    def end_table(self):
+        """Close the graph block of a table."""
+        self.output_obj.write(b"}\n")
+
+
+class JSONLDWriter(RDFWriter):
+    """
+    Writer of JSON-LD, writing a node object for each subject of a row into the @graph of a
+    single document. The @context declares the namespaces and a term for each property whose
+    objects are all IRIs or literals of the same datatype, coercing their values so that they
+    are written as plain strings.
+    """
+
+    def __init__(self, output_obj, namespaces, graph_iris=None):
+        super(JSONLDWriter, self).__init__(output_obj, namespaces, graph_iris)
+        self._names = PrefixedNames(namespaces)
+        # Property IRIs to the names of their terms and the types of their values
+        self._terms = {}
+        self._separator = u""
+
+    def _iri(self, iri, cached=False):
+        """Shorten an IRI into a prefixed name if it has one."""
+        name = self._names.shorten_cached(iri) if cached else self._names.shorten(iri)
+        return name if name is not None else iri
+
+    def _node_id(self, term):
+        """Get the identifier of an IRI or blank node Term."""
+        return self._iri(term.value) if term.kind == URI else u"_:" + term.value
+
+    def _value(self, predicate, obj):
+        """Get the key and the value of a predicate and object Term in a node object."""
+        if obj.kind != LITERAL:
+            if predicate.value == RDF_TYPE:
+                return u"@type", self._node_id(obj)
+            term = self._terms.get(predicate.value)
+            if term is not None and term[1] == "@id":
+                return term[0], self._node_id(obj)
+            return self._iri(predicate.value, cached=True), {u"@id": self._node_id(obj)}
+
+        if obj.datatype is not None:
+            term = self._terms.get(predicate.value)
+            if term is not None and term[1] == obj.datatype:
+                return term[0], obj.value
+            value = OrderedDict([(u"@value", obj.value),
+                                 (u"@type", self._iri(obj.datatype, cached=True))])
+        elif obj.lang is not None:
+            value = OrderedDict([(u"@value", obj.value), (u"@language", obj.lang)])
+        else:
+            value = obj.value
+        return self._iri(predicate.value, cached=True), value
+
+    def start(self, md_tables):
+        """Write the @context and open the @graph."""
+        self._names.cache(get_metadata_iris(md_tables, self.namespaces))
+        context = OrderedDict(self._names.namespaces.items())
+        for predicate, obj_type in sorted(get_property_types(md_tables, self.namespaces).items()):
+            name = get_local_name(predicate)
+            if not LOCAL_NAME_PATTERN.match(name) or name in context:
+                continue
+            context[name] = OrderedDict([
+                (u"@id", self._iri(predicate)),
+                (u"@type", obj_type if obj_type == "@id" else self._iri(obj_type))])
+            self._terms[predicate] = (name, obj_type)
+        self.output_obj.write(u'{{"@context": {},\n"@graph": [\n'.format(
+            json.dumps(context, indent=2, separators=(",", ": "))).encode('utf-8'))
+
+    def write_triples(self, triples):
+        """Write the node objects of the subjects of a row."""
+        lines = []
+        for subject, pairs in group_by_subject(triples):
+            node = OrderedDict([(u"@id", self._node_id(subject))])
+            for predicate, obj in pairs:
+                key, value = self._value(predicate, obj)
+                if key not in node:
+                    node[key] = value
+                elif isinstance(node[key], list):
+                    node[key].append(value)
+                else:
+                    node[key] = [node[key], value]
+            lines.append(self._separator + json.dumps(node, ensure_ascii=False))
+            self._separator = u",\n"
+        self.output_obj.write(u"".join(lines).encode('utf-8'))
+
+    def finish(self):
+        """Close the @graph."""
+        self.output_obj.write(b"\n]}\n")
+
+
+class RDFXMLWriter(RDFWriter):
+    """
+    Writer of RDF/XML, writing an rdf:Description element for each subject of a row.
+    Blank node labels are prefixed with 'b' to make them XML names.
+    The namespaces, and the namespaces of the properties of columns without substitutions,
+    are declared on the rdf:RDF element. Properties in other namespaces declare theirs on
+    their own elements, since the declarations of rdf:RDF are written before any row.
+    """
+
+    def __init__(self, output_obj, namespaces, graph_iris=None):
+        super(RDFXMLWriter, self).__init__(output_obj, namespaces, graph_iris)
+        # Namespace IRIs to their prefixes
+        self._prefixes = {RDF: u"rdf"}
+        for pre, url in PrefixedNames(namespaces).namespaces.items():
+            if not pre.lower().startswith(u"xml") and pre != u"rdf":
+                self._prefixes.setdefault(url, pre)
+        # Properties of the columns without substitutions to the start and end tags of their
+        # elements, other properties are not cached to keep memory bounded
+        self._tags = {}
+
+    def _tag(self, predicate):
+        """Get the start and end tags of the element of a property, without the closing '>'
+        of the start tag."""
+        tags = self._tags.get(predicate)
+        if tags is not None:
+            return tags
+        namespace, local_name = split_xml_name(predicate)
+        prefix = self._prefixes.get(namespace)
+        if prefix is not None:
+            name = u"{}:{}".format(prefix, local_name)
+            return u"<" + name, u"</{}>".format(name)
+        return (u'<ns:{} xmlns:ns="{}"'.format(local_name, escape_xml_attr(namespace)),
+                u"</ns:{}>".format(local_name))
+
+    def _property(self, predicate, obj):
+        """Format the element of a predicate and object Term."""
+        start_tag, end_tag = self._tag(predicate.value)
+        if obj.kind == URI:
+            return u'{} rdf:resource="{}"/>'.format(start_tag, escape_xml_attr(obj.value))
+        if obj.kind == BNODE:
+            return u'{} rdf:nodeID="b{}"/>'.format(start_tag, obj.value)
+        if obj.datatype is not None:
+            start_tag += u' rdf:datatype="{}"'.format(escape_xml_attr(obj.datatype))
+        elif obj.lang is not None:
+            start_tag += u' xml:lang="{}"'.format(escape_xml_attr(obj.lang))
+        return u"{}>{}{}".format(start_tag, escape_xml_text(obj.value), end_tag)
+
+    def start(self, md_tables):
+        """Write the XML declaration and open rdf:RDF with the namespace declarations."""
+        predicates = [x[1] for x in iter_column_properties(md_tables, self.namespaces)]
+        for predicate in predicates:
+            namespace = split_xml_name(predicate)[0]
+            if namespace not in self._prefixes:
+                self._prefixes[namespace] = next(
+                    x for x in (u"ns{}".format(ind) for ind in count(1))
+                    if x not in self._prefixes.values())
+        for predicate in predicates:
+            self._tags[predicate] = self._tag(predicate)
+        self.output_obj.write(u'<?xml version="1.0" encoding="utf-8"?>\n<rdf:RDF{}>\n'.format(
+            u"".join(u'\n    xmlns:{}="{}"'.format(pre, escape_xml_attr(url))
+                     for url, pre in sorted(self._prefixes.items(), key=lambda x: x[1]))
+        ).encode('utf-8'))
+
+    def write_triples(self, triples):
+        """Write the rdf:Description elements of the subjects of a row."""
+        lines = []
+        for subject, pairs in group_by_subject(triples):
+            if subject.kind == URI:
+                lines.append(u'  <rdf:Description rdf:about="{}">\n'.format(
+                    escape_xml_attr(subject.value)))
+            else:
+                lines.append(u'  <rdf:Description rdf:nodeID="b{}">\n'.format(subject.value))
+            for predicate, obj in pairs:
+                lines.append(u"    " + self._property(predicate, obj) + u"\n")
+            lines.append(u"  </rdf:Description>\n")
+        self.output_obj.write(u"".join(lines).encode('utf-8'))
+
+    def finish(self):
+        """Close rdf:RDF."""
+        self.output_obj.write(b"</rdf:RDF>\n")
+
+
+# Writers of the formats written natively by their upper-case names
+NATIVE_FORMATS = {
+    "NQUADS": NQuadsWriter,
+    "N-QUADS": NQuadsWriter,
+    "NQ": NQuadsWriter,
+    "TRIG": TriGWriter,
+    "JSON-LD": JSONLDWriter,
+    "JSONLD": JSONLDWriter,
+    "RDF": RDFXMLWriter,
+    "XML": RDFXMLWriter,
+    "RDFXML": RDFXMLWriter,
+    "RDF/XML": RDFXMLWriter,
+    "BINARY": BinaryTriplesWriter
+}
+# Formats which are only written natively, regardless of the backend
+NATIVE_ONLY_FORMATS = ["BINARY"]
+
+
+def get_writer(fmt, output_obj, namespaces, graph_iris=None):
+    """Get the writer of a format, see RDFWriter.
+    :param fmt: Name of the format, see NATIVE_FORMATS.
+    """
+    writer_class = NATIVE_FORMATS.get(fmt.upper())
+    if writer_class is None:
+        raise ValueError("Format '{}' is not written natively, it should be one of {}".format(
+            fmt, sorted(NATIVE_FORMATS)))
+    return writer_class(output_obj, namespaces, graph_iris)
+
+
+def write_rdf(writers, tables, md_tables, custom_prefixes, options=None, row_errors=None,
+              progress=None):
+    """Write the triples of tables into writers in a single pass over their rows.
+    :param writers: List of writers, see RDFWriter.
+    :param tables: Dictionary from table url to its TableSource.
+    :param options: Optional dictionary of serialization options, see
+    nt_serializer.iter_table_rows.
+    :param row_errors: Optional row_errors.RowErrors, see nt_serializer.iter_table_rows.
+    :param progress: Optional progress.Progress to update the counts of each table in every
+    PROGRESS_CHECK_ROWS rows.
+    """
+    consume(iter_write_rdf(writers, tables, md_tables, custom_prefixes, options, row_errors,
+                           progress))
+
+
+def iter_write_rdf(writers, tables, md_tables, custom_prefixes, options=None, row_errors=None,
+                   progress=None):
+    """Write the triples of tables into writers one row at a time, see write_rdf.
+    :return: An iterator yielding after each row is written.
+    """
+    collector = TermCollector()
+    for writer in writers:
+        writer.start(md_tables)
+    for metadata in md_tables:
+        if metadata["suppressOutput"]:
+            continue
+        table_url = metadata["url"]
+        for writer in writers:
+            writer.start_table(table_url)
+        if progress is not None:
+            progress.start_table(table_url, tables[table_url].size())
+        num_rows, num_triples = 0, 0
+        with tables[table_url].open_at_row(get_row_start(options)) as (table_file_obj,
+                                                                       first_row):
+            for row_num, row, table_info, include_invariants in iter_table_rows(
+                    table_file_obj, metadata, custom_prefixes, options, first_row, row_errors):
+                try_write_row(collector, row_num, row, table_info, include_invariants,
+                              row_errors)
+                triples = collector.pop()
+                if triples:
+                    for writer in writers:
+                        writer.write_triples(triples)
+                if progress is not None:
+                    num_rows += 1
+                    num_triples += len(triples)
+                    if num_rows % PROGRESS_CHECK_ROWS == 0:
+                        progress.update_table(table_url, num_rows, num_triples,
+                                              get_bytes_read(table_file_obj))
+                yield
+            if progress is not None:
+                progress.update_table(table_url, num_rows, num_triples,
+                                      get_bytes_read(table_file_obj))
+        for writer in writers:
+            writer.end_table()
+    for writer in writers:
+        writer.finish()
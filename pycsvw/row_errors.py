@@ -0,0 +1,72 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Error policies for rows that fail to serialize """
+import json
+from collections import Counter
+
+from six import text_type
+
+from .csvw_exceptions import TooManyRowErrors
+
+# Rows failing to serialize either abort the conversion, are skipped, or are skipped
+# and written into a reject file
+ON_ERROR_POLICIES = ["fail", "skip", "quarantine"]
+
+
+class RowErrors(object):
+    """
+    Records the rows that failed to serialize under the skip or quarantine policies.
+    Quarantined rows are written into reject_file as JSON lines with the table url, row number,
+    cells, type and message of the error.
+    """
+
+    def __init__(self, policy, reject_file=None, max_errors=None, keep_records=False):
+        """
+        :param policy: 'skip' or 'quarantine'.
+        :param reject_file: Optional file-like object in text mode to write quarantined rows into.
+        :param max_errors: Maximum number of failed rows before raising TooManyRowErrors.
+        :param keep_records: Whether to keep the records of failed rows in records, e.g. to pass
+        them back from a worker process.
+        """
+        self.policy = policy
+        self.reject_file = reject_file
+        self.max_errors = max_errors
+        self.keep_records = keep_records
+        self.num_errors = 0
+        self.error_types = Counter()
+        self.records = []
+
+    def add(self, table_url, row_num, row, exc):
+        """Record a row that failed to serialize with exc."""
+        self.add_record({"table": table_url, "row": int(row_num), "cells": row,
+                         "error": type(exc).__name__, "message": text_type(exc)})
+
+    def add_record(self, record):
+        """Record a failed row, e.g. one recorded in a worker process."""
+        self.num_errors += 1
+        self.error_types[record["error"]] += 1
+        if self.policy == "quarantine" and self.reject_file is not None:
+            self.reject_file.write(text_type(json.dumps(record)) + u"\n")
+        if self.keep_records:
+            self.records.append(record)
+        if self.max_errors is not None and self.num_errors > self.max_errors:
+            raise TooManyRowErrors("{} rows failed to serialize, more than the maximum of {}, "
+                                   "the last in row {} of '{}': {}".format(
+                                       self.num_errors, self.max_errors, record.get("row"),
+                                       record.get("table"), record.get("message")))
+
+    def summary(self):
+        """Summarize the failed rows.
+        :return: A dictionary of the policy, the number of failed rows and their error types.
+        """
+        return {"policy": self.policy, "errors": self.num_errors,
+                "error_types": dict(self.error_types)}
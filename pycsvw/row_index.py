@@ -0,0 +1,183 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Indexes of the byte offsets where the rows of csv files start.
+
+Rows can contain quoted newlines, so the offsets are found by scanning the bytes of the file
+for newlines outside quotes, which holds for encodings where '"' and newline are single bytes
+such as UTF-8 and ISO-8859-1. The offset of every stride'th row is kept in a sidecar file
+next to the csv file, along with the size, modification time and a digest of the beginning
+and end of the file to detect when it has changed.
+"""
+import codecs
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+
+from six import text_type
+
+# Rows between consecutive offsets in an index
+ROW_INDEX_STRIDE = 1024
+ROW_INDEX_SUFFIX = ".rowidx"
+ROW_INDEX_VERSION = 1
+# Size of the blocks of csv files scanned at once
+SCAN_BLOCK_SIZE = 1 << 20
+# Size of the beginning and the end of csv files in the digest of their signature
+DIGEST_BLOCK_SIZE = 1 << 16
+# Encodings whose '"' and newline characters are not single bytes
+UNSUPPORTED_ENCODING_PREFIXES = ("utf-16", "utf-32")
+
+LOGGER = logging.getLogger(__name__)
+
+
+def supports_encoding(encoding):
+    """Check if csv files in encoding can be indexed."""
+    return not codecs.lookup(encoding).name.startswith(UNSUPPORTED_ENCODING_PREFIXES)
+
+
+def get_signature(csv_path):
+    """Get the size, modification time and digest of the beginning and end of a csv file."""
+    stat_info = os.stat(csv_path)
+    digest = hashlib.sha1()
+    with io.open(csv_path, 'rb') as csv_file:
+        digest.update(csv_file.read(DIGEST_BLOCK_SIZE))
+        if stat_info.st_size > DIGEST_BLOCK_SIZE:
+            csv_file.seek(max(stat_info.st_size - DIGEST_BLOCK_SIZE, DIGEST_BLOCK_SIZE))
+            digest.update(csv_file.read())
+    return {"size": stat_info.st_size, "mtime": stat_info.st_mtime, "digest": digest.hexdigest()}
+
+
+class RowIndex(object):
+    """
+    Byte offsets of rows 1, stride + 1, 2 * stride + 1, ... of a csv file, where row 1 is
+    the first row after the header.
+    """
+
+    def __init__(self, stride, offsets, num_rows, signature=None):
+        self.stride = stride
+        self.offsets = offsets
+        self.num_rows = num_rows
+        self.signature = signature
+        # Whether the index was loaded from its sidecar file rather than built
+        self.from_sidecar = False
+
+    @classmethod
+    def build(cls, csv_file, stride=ROW_INDEX_STRIDE, signature=None):
+        """Build the index by scanning a csv file.
+        :param csv_file: File-like object of the csv file in binary mode.
+        :param stride: Rows between consecutive offsets.
+        """
+        csv_file.seek(0, io.SEEK_END)
+        size = csv_file.tell()
+        csv_file.seek(0)
+
+        offsets = []
+        # Number of records started so far, including the header
+        num_records = 1 if size > 0 else 0
+        in_quotes = False
+        base = 0
+        while True:
+            block = csv_file.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            pos, next_quote, next_newline = 0, -1, -1
+            while True:
+                if next_quote < pos:
+                    next_quote = block.find(b'"', pos)
+                if in_quotes:
+                    if next_quote < 0:
+                        break
+                    in_quotes, pos = False, next_quote + 1
+                    continue
+                if next_newline < pos:
+                    next_newline = block.find(b'\n', pos)
+                if next_newline >= 0 and (next_quote < 0 or next_newline < next_quote):
+                    pos = next_newline + 1
+                    if base + pos < size:
+                        num_records += 1
+                        if (num_records - 2) % stride == 0:
+                            offsets.append(base + pos)
+                elif next_quote >= 0:
+                    in_quotes, pos = True, next_quote + 1
+                else:
+                    break
+            base += len(block)
+
+        return cls(stride, offsets, max(num_records - 1, 0), signature)
+
+    def locate(self, row_num):
+        """Locate the closest indexed row at or before row_num.
+        :return: Tuple of the number of the indexed row and its byte offset, None if the
+        csv file has no such row.
+        """
+        if not self.offsets or row_num > self.num_rows:
+            return None
+        ind = min((row_num - 1) // self.stride, len(self.offsets) - 1)
+        return ind * self.stride + 1, self.offsets[ind]
+
+    def save(self, index_path):
+        """Save the index into a sidecar file, a JSON line followed by the offsets."""
+        header = {"version": ROW_INDEX_VERSION, "stride": self.stride,
+                  "num_rows": self.num_rows, "num_offsets": len(self.offsets),
+                  "signature": self.signature}
+        with io.open(index_path, 'wb') as index_file:
+            index_file.write(text_type(json.dumps(header, sort_keys=True)).encode('utf-8') + b"\n")
+            index_file.write(struct.pack("<{}Q".format(len(self.offsets)), *self.offsets))
+
+    @classmethod
+    def load(cls, index_path, signature=None, stride=None):
+        """Load the index from a sidecar file.
+        :return: The index, None if it does not exist or does not match signature or stride.
+        """
+        if not os.path.exists(index_path):
+            return None
+        with io.open(index_path, 'rb') as index_file:
+            try:
+                header = json.loads(index_file.readline().decode('utf-8'))
+            except ValueError:
+                return None
+            if header.get("version") != ROW_INDEX_VERSION or \
+                    (signature is not None and header.get("signature") != signature) or \
+                    (stride is not None and header.get("stride") != stride):
+                return None
+            num_offsets = header["num_offsets"]
+            contents = index_file.read(8 * num_offsets)
+            if len(contents) != 8 * num_offsets:
+                return None
+            offsets = list(struct.unpack("<{}Q".format(num_offsets), contents))
+        index = cls(header["stride"], offsets, header["num_rows"], header["signature"])
+        index.from_sidecar = True
+        return index
+
+
+def get_row_index(csv_path, stride=ROW_INDEX_STRIDE, index_path=None):
+    """Get the index of a csv file from its sidecar file, building and saving it if
+    it does not exist or is out of date.
+    :param csv_path: Path of the csv file.
+    :param stride: Rows between consecutive offsets.
+    :param index_path: Path of the sidecar file, csv_path with ROW_INDEX_SUFFIX by default.
+    :return: The RowIndex.
+    """
+    index_path = index_path if index_path else csv_path + ROW_INDEX_SUFFIX
+    signature = get_signature(csv_path)
+    index = RowIndex.load(index_path, signature, stride)
+    if index is None:
+        with io.open(csv_path, 'rb') as csv_file:
+            index = RowIndex.build(csv_file, stride, signature)
+        try:
+            index.save(index_path)
+        except (IOError, OSError) as exc:
+            LOGGER.warning("Could not save the row index of '%s': %s", csv_path, exc)
+    return index
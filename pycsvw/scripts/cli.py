@@ -12,24 +12,159 @@
 """ Command line interface for pycsvw """
 import json
 import io
+import time
 
 import click  # pylint: disable=import-error
 
 from pycsvw import CSVW
+from pycsvw.batch import read_jobs, run_batch
+from pycsvw.checkpoint import CHECKPOINT_ROWS
+from pycsvw.csvw import BACKENDS, AUTO_BACKEND_THRESHOLD
+from pycsvw.graph_store import PROTOCOLS, STORE_BATCH_TRIPLES, STORE_CONNECTIONS, STORE_RETRIES
+from pycsvw.nt_serializer import BLANK_NODES
+from pycsvw.nt_sort import SORT_KEYS, SORT_MEMORY
+from pycsvw.progress import format_progress
+from pycsvw.row_errors import ON_ERROR_POLICIES
+from pycsvw.row_index import ROW_INDEX_STRIDE
 
 
-@click.command()
+def report_progress(report):
+    """ Write a progress report to stderr."""
+    click.echo(format_progress(report), err=True)
+
+
+@click.group(invoke_without_command=True)
 @click.option("--csv-url", nargs=1, type=str, multiple=True, help="URL of the CSVW")
 @click.option("--csv-path", nargs=1, type=str, multiple=True, help="System path to the CSVW")
 @click.option("--metadata-url", help="URL of the CSVW metadata")
 @click.option("--metadata-path", help="System path to the CSVW metadata")
 @click.option("--json-dest", help="Destination of the JSON file to generate")
 @click.option("--rdf-dest", nargs=2, type=str, multiple=True,
-              help="Pair of format and destination path of RDF e.g. 'turtle out.ttl'")
+              help="Pair of format and destination path of RDF e.g. 'turtle out.ttl', "
+                   "'binary' writes dictionary-encoded triples, see pycsvw.binary_triples")
 @click.option("--temp-dir", help="Use as the temporary folder for (intermediate) nt serialization")
 @click.option("--riot-path", help="The path to the riot command e.g. '/usr/bin/jena/bin/riot'")
-def main(csv_url, csv_path, metadata_url, metadata_path, json_dest, rdf_dest, temp_dir, riot_path):
+@click.option("--riot-jobs", type=int, default=1,
+              help="Number of parallel riot processes for turtle, trig and n-quads outputs")
+@click.option("--table-jobs", type=int, default=1,
+              help="Number of worker processes serializing multiple tables in parallel")
+@click.option("--spool-max-size", type=int,
+              help="Keep intermediate files up to this many bytes in memory instead of temp-dir")
+@click.option("--backend", type=click.Choice(BACKENDS), default="riot",
+              help="Converter of nt serialization to other formats, 'auto' picks rdflib "
+                   "for small outputs, 'native' writes trig, n-quads, json-ld and rdf/xml "
+                   "directly")
+@click.option("--auto-backend-threshold", type=int, default=AUTO_BACKEND_THRESHOLD,
+              help="Estimated number of triples below which 'auto' backend uses rdflib")
+@click.option("--graph-iri", "graph_iris", nargs=2, type=str, multiple=True,
+              help="Pair of table url and IRI of its named graph in 'native' trig and "
+                   "n-quads outputs and in the store")
+@click.option("--blank-nodes", type=click.Choice(BLANK_NODES), default="random",
+              help="Random blank nodes, or labels ('stable') or skolem IRIs ('skolem') derived "
+                   "from the contents of the rows")
+@click.option("--skolem-base", help="Base of the skolem IRIs e.g. 'http://example.org'")
+@click.option("--per-row-invariants", is_flag=True,
+              help="Repeat triples of virtual columns without substitutions for every row")
+@click.option("--sort", "sort_by", type=click.Choice(SORT_KEYS),
+              help="Sort triples by subject or by subject, predicate and object")
+@click.option("--unique", is_flag=True, help="Drop duplicate triples, sorting them by 'spo'")
+@click.option("--sort-memory", type=int, default=SORT_MEMORY,
+              help="Bytes of triples sorted in memory before spilling into temp-dir")
+@click.option("--sort-jobs", type=int, default=1,
+              help="Number of worker processes merging sorted spill files")
+@click.option("--row-start", type=int, help="Number of the first row to convert, starting from 1")
+@click.option("--row-end", type=int, help="Number of the last row to convert")
+@click.option("--row-index", is_flag=True,
+              help="Seek to row-start through a row index sidecar file of the csv file, "
+                   "built on first use")
+@click.option("--row-index-stride", type=int, default=ROW_INDEX_STRIDE,
+              help="Number of rows between the offsets kept in the row index")
+@click.option("--checkpoint", "checkpoint_path",
+              help="Record checkpoints of nt serialization into this file to resume from")
+@click.option("--checkpoint-rows", type=int, default=CHECKPOINT_ROWS,
+              help="Number of rows between checkpoints")
+@click.option("--resume", is_flag=True, help="Resume from the last checkpoint")
+@click.option("--on-error", type=click.Choice(ON_ERROR_POLICIES), default="fail",
+              help="Abort on rows failing to serialize, skip them or skip and write them "
+                   "into reject-file ('quarantine')")
+@click.option("--reject-file", "reject_path",
+              help="Destination of the JSON lines of quarantined rows")
+@click.option("--max-errors", type=int,
+              help="Abort once more than this many rows failed to serialize")
+@click.option("--progress", is_flag=True,
+              help="Report the progress of the conversion to stderr every second")
+@click.option("--metrics-file", "metrics_path",
+              help="Write metrics of the conversion into this OpenMetrics textfile")
+@click.option("--column", "columns", multiple=True,
+              help="Name of a column to convert, all columns if not specified")
+@click.option("--exclude-column", "exclude_columns", multiple=True,
+              help="Name of a column not to convert")
+@click.option("--shard-dir", help="Directory to write nt serialization into as shards")
+@click.option("--num-shards", type=int,
+              help="Number of shards to partition triples into by the hash of subjects")
+@click.option("--shard-max-bytes", type=int, help="Size in bytes after which a new shard starts")
+@click.option("--shard-max-triples", type=int,
+              help="Number of triples after which a new shard starts")
+@click.option("--store-url",
+              help="URL of a SPARQL 1.1 Graph Store or Update endpoint to send the triples to")
+@click.option("--store-protocol", type=click.Choice(PROTOCOLS), default="graph-store",
+              help="POST N-Triples into the graph of each table or send INSERT DATA requests")
+@click.option("--store-batch-triples", type=int, default=STORE_BATCH_TRIPLES,
+              help="Number of triples in each request to the store")
+@click.option("--store-connections", type=int, default=STORE_CONNECTIONS,
+              help="Number of persistent connections to the store")
+@click.option("--store-retries", type=int, default=STORE_RETRIES,
+              help="Number of times a failed request to the store is retried")
+@click.pass_context
+def main(ctx, csv_url, csv_path, metadata_url, metadata_path, json_dest, rdf_dest, temp_dir,
+         riot_path, riot_jobs, table_jobs, spool_max_size, backend, auto_backend_threshold,
+         graph_iris, blank_nodes, skolem_base, per_row_invariants, sort_by, unique, sort_memory,
+         sort_jobs, row_start, row_end, row_index, row_index_stride, checkpoint_path,
+         checkpoint_rows, resume, on_error, reject_path, max_errors, progress, metrics_path,
+         columns, exclude_columns, shard_dir, num_shards, shard_max_bytes, shard_max_triples,
+         store_url, store_protocol, store_batch_triples, store_connections, store_retries):
     """ Command line interface for pycsvw."""
+    # Options shared with the jobs of batch command
+    ctx.obj = {
+        "temp_dir": temp_dir,
+        "riot_path": riot_path,
+        "riot_jobs": riot_jobs,
+        "table_jobs": table_jobs,
+        "spool_max_size": spool_max_size,
+        "backend": backend,
+        "auto_backend_threshold": auto_backend_threshold,
+        "graph_iris": dict(graph_iris),
+        "blank_nodes": blank_nodes,
+        "skolem_base": skolem_base,
+        "per_row_invariants": per_row_invariants,
+        "sort_by": sort_by,
+        "unique": unique,
+        "sort_memory": sort_memory,
+        "sort_jobs": sort_jobs,
+        "row_start": row_start,
+        "row_end": row_end,
+        "row_index": row_index,
+        "row_index_stride": row_index_stride,
+        "on_error": on_error,
+        "max_errors": max_errors,
+        "progress": report_progress if progress else None,
+        "columns": columns,
+        "exclude_columns": exclude_columns
+    }
+    if ctx.invoked_subcommand is not None:
+        # Inputs, outputs and files written by a single conversion are specified by each job
+        per_job_options = [name for name, value in [
+            ("--csv-url", csv_url), ("--csv-path", csv_path), ("--metadata-url", metadata_url),
+            ("--metadata-path", metadata_path), ("--json-dest", json_dest),
+            ("--rdf-dest", rdf_dest), ("--checkpoint", checkpoint_path), ("--resume", resume),
+            ("--on-error quarantine", on_error == "quarantine"), ("--reject-file", reject_path),
+            ("--metrics-file", metrics_path),
+            ("--shard-dir", shard_dir), ("--store-url", store_url)] if value]
+        if per_job_options:
+            raise click.UsageError("{} cannot be used with '{}'".format(
+                ", ".join(per_job_options), ctx.invoked_subcommand))
+        return
+
     # Handle no csv_path, single one and multiple ones
     if csv_path == ():
         csv_path = None
@@ -41,13 +176,79 @@ def main(csv_url, csv_path, metadata_url, metadata_path, json_dest, rdf_dest, te
               metadata_url=metadata_url,
               metadata_path=metadata_path,
               temp_dir=temp_dir,
-              riot_path=riot_path) as csvw:
+              riot_path=riot_path,
+              riot_jobs=riot_jobs,
+              table_jobs=table_jobs,
+              spool_max_size=spool_max_size,
+              backend=backend,
+              auto_backend_threshold=auto_backend_threshold,
+              graph_iris=dict(graph_iris),
+              blank_nodes=blank_nodes,
+              skolem_base=skolem_base,
+              per_row_invariants=per_row_invariants,
+              sort_by=sort_by,
+              unique=unique,
+              sort_memory=sort_memory,
+              sort_jobs=sort_jobs,
+              row_start=row_start,
+              row_end=row_end,
+              row_index=row_index,
+              row_index_stride=row_index_stride,
+              checkpoint_path=checkpoint_path,
+              checkpoint_rows=checkpoint_rows,
+              resume=resume,
+              on_error=on_error,
+              reject_path=reject_path,
+              max_errors=max_errors,
+              progress=report_progress if progress else None,
+              metrics_path=metrics_path,
+              columns=columns,
+              exclude_columns=exclude_columns) as csvw:
 
-        for form, dest in rdf_dest:
-            rdf_output = csvw.to_rdf(form)
-            with io.open(dest, "wb") as rdf_file:
-                rdf_file.write(rdf_output.encode('utf-8'))
+        # Outputs are streamed into their files, native ones in a single pass over the rows
+        rdf_files = []
+        try:
+            for form, dest in rdf_dest:
+                rdf_files.append((io.open(dest, "wb"), form))
+            if rdf_files:
+                csvw.to_rdf_files(rdf_files)
+        finally:
+            for rdf_file, _ in rdf_files:
+                rdf_file.close()
+        if shard_dir:
+            csvw.to_rdf_shards(shard_dir, num_shards, shard_max_bytes, shard_max_triples)
+        if store_url:
+            csvw.to_graph_store(store_url, store_protocol, batch_triples=store_batch_triples,
+                                connections=store_connections, retries=store_retries)
         if json_dest:
             json_output = csvw.to_json()
             with open(json_dest, "w") as json_file:
                 json.dump(json_output, json_file, indent=2)
+        if csvw.row_errors is not None:
+            click.echo(json.dumps(csvw.row_errors.summary()), err=True)
+
+
+@main.command()
+@click.argument("manifest", type=click.File("r"))
+@click.option("--jobs", type=int, default=1, help="Number of worker processes")
+@click.option("--report", type=click.File("w"), default="-",
+              help="Destination of the JSON lines report of the jobs, stdout by default")
+@click.pass_context
+def batch(ctx, manifest, jobs, report):
+    """ Run the conversions listed in MANIFEST, one JSON object per line with keys
+    csv_path or csv_url, metadata_path or metadata_url and rdf_dest e.g.
+    {"csv_path": "a.csv", "metadata_path": "a.json", "rdf_dest": [["turtle", "a.ttl"]]}
+    """
+    start = time.time()
+    num_jobs, num_failed = 0, 0
+    for result in run_batch(read_jobs(manifest), jobs, ctx.obj):
+        num_jobs += 1
+        if result["status"] != "ok":
+            num_failed += 1
+        report.write(json.dumps(result) + "\n")
+        report.flush()
+
+    click.echo("{} jobs, {} failed in {:.3f} seconds".format(
+        num_jobs, num_failed, time.time() - start), err=True)
+    if num_failed:
+        ctx.exit(1)
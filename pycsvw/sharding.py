@@ -0,0 +1,96 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Split NT-serializations into shards to load in parallel.
+
+Blank node labels are scoped to a file, so the triples of a blank node have to stay in the
+shard of the triple referring to it. Blank nodes of RDF lists are written right after the
+triple referring to them, hence triples with a blank node subject always go to the shard
+of the preceding triple and shards never roll over before them.
+"""
+import io
+import json
+import os
+import zlib
+
+from six import text_type
+
+SHARD_NAME_FORMAT = "part-{:05d}.nt"
+MANIFEST_NAME = "manifest.json"
+
+
+def get_shard_of_subject(subject, num_shards):
+    """Get the shard of a subject, the same across runs and platforms."""
+    return (zlib.crc32(subject) & 0xffffffff) % num_shards
+
+
+def write_shards(nt_file, directory, num_shards=None, max_bytes=None, max_triples=None):
+    """Write the NT-serialization into shards in directory along with a manifest.
+    :param nt_file: File-like object of the NT-serialization in binary mode.
+    :param directory: Directory to write the shards and the manifest into.
+    :param num_shards: Number of shards to partition the triples into by the hash of subjects.
+    :param max_bytes: Size in bytes after which a new shard is started, if not partitioned by hash.
+    :param max_triples: Number of triples after which a new shard is started, if not partitioned
+    by hash.
+    :return: The manifest as a dictionary.
+    """
+    if num_shards is not None and (max_bytes is not None or max_triples is not None):
+        raise ValueError("Only one of num_shards or max_bytes/max_triples should be specified")
+    if num_shards is None and max_bytes is None and max_triples is None:
+        raise ValueError("num_shards, max_bytes or max_triples argument required")
+    if num_shards is not None and num_shards < 1:
+        raise ValueError("num_shards should be at least 1")
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    shards = []
+
+    def open_shard():
+        """Start a new shard."""
+        path = os.path.join(directory, SHARD_NAME_FORMAT.format(len(shards)))
+        shards.append({"path": os.path.basename(path), "triples": 0, "bytes": 0,
+                       "file": io.open(path, 'wb')})
+        return shards[-1]
+
+    try:
+        if num_shards is not None:
+            for _ in range(num_shards):
+                open_shard()
+        shard = open_shard() if num_shards is None else None
+
+        for line in nt_file:
+            attached = line.startswith(b"_:")
+            if num_shards is not None:
+                if not attached or shard is None:
+                    subject = line.split(b" ", 1)[0]
+                    shard = shards[get_shard_of_subject(subject, num_shards)]
+            elif not attached and shard["triples"] > 0 and (
+                    (max_bytes is not None and shard["bytes"] + len(line) > max_bytes) or
+                    (max_triples is not None and shard["triples"] >= max_triples)):
+                shard["file"].close()
+                shard = open_shard()
+            shard["file"].write(line)
+            shard["triples"] += 1
+            shard["bytes"] += len(line)
+    finally:
+        for shard in shards:
+            shard.pop("file").close()
+
+    manifest = {
+        "format": "nt",
+        "partition": "subject-hash" if num_shards is not None else "rollover",
+        "triples": sum(x["triples"] for x in shards),
+        "shards": shards
+    }
+    with io.open(os.path.join(directory, MANIFEST_NAME), 'w', encoding="utf-8") as manifest_file:
+        manifest_file.write(text_type(json.dumps(manifest, indent=2)))
+    return manifest
@@ -0,0 +1,285 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Sinks receiving the bytes of rdf serializations in batches, e.g. to send them to message
+queues or custom stores, passed to to_rdf_files in place of file objects.
+
+Sinks implement write_batch, flush and close, and may implement the coroutines
+awrite_batch, aflush and aclose, which ato_rdf_files awaits in the event loop instead of
+running the blocking methods in the executor. Serializers write into a SinkFile, which
+passes the bytes on in batches of at least batch_size bytes through a QueuedSink, so the
+sink works in a thread of its own and serialization waits once max_batches batches are
+queued.
+"""
+import io
+import shlex
+from subprocess import Popen, PIPE
+from threading import Thread
+
+from six import string_types
+from six.moves import queue  # pylint: disable=import-error
+
+# Minimum number of bytes passed to a sink at once
+SINK_BATCH_SIZE = 1 << 16
+# Number of batches queued for a sink before serialization waits
+SINK_QUEUE_BATCHES = 16
+
+
+class Sink(object):
+    """
+    Base of the sinks.
+    """
+
+    def write_batch(self, data):
+        """Write a batch of bytes."""
+        raise NotImplementedError()
+
+    def flush(self):
+        """Flush the batches written so far."""
+        pass
+
+    def close(self):
+        """Flush and release the sink."""
+        self.flush()
+
+
+class FileSink(Sink):
+    """
+    Sink writing into a binary file-like object, or into the file at a path which it opens
+    and closes.
+    """
+
+    def __init__(self, file_obj):
+        """
+        :param file_obj: Binary file-like object or path of the file to write into.
+        """
+        self._owned = isinstance(file_obj, string_types)
+        self.file_obj = io.open(file_obj, 'wb') if self._owned else file_obj
+
+    def write_batch(self, data):
+        """Write a batch into the file."""
+        self.file_obj.write(data)
+
+    def flush(self):
+        """Flush the file."""
+        self.file_obj.flush()
+
+    def close(self):
+        """Flush the file, closing it if the sink opened it."""
+        if self._owned:
+            self.file_obj.close()
+        else:
+            self.flush()
+
+
+class PipeSink(Sink):
+    """
+    Sink writing into stdin of a command, e.g. a loader reading rdf from stdin.
+    """
+
+    def __init__(self, cmd, stdout=None):
+        """
+        :param cmd: The command as a string or a list of arguments.
+        :param stdout: File object the output of the command goes into, stdout if None.
+        """
+        self.cmd = shlex.split(cmd) if isinstance(cmd, string_types) else list(cmd)
+        self._process = Popen(self.cmd, stdin=PIPE, stdout=stdout)
+
+    def write_batch(self, data):
+        """Write a batch into stdin of the command."""
+        self._process.stdin.write(data)
+
+    def flush(self):
+        """Flush stdin of the command."""
+        self._process.stdin.flush()
+
+    def close(self):
+        """Close stdin of the command and wait for it to exit.
+        :raises IOError: If the command failed.
+        """
+        try:
+            self._process.stdin.close()
+        except (IOError, OSError):
+            # The command exited early, the error is reported from its return code
+            pass
+        returncode = self._process.wait()
+        if returncode != 0:
+            raise IOError("The command '{}' returned with rc={}".format(
+                " ".join(self.cmd), returncode))
+
+
+class CallbackSink(Sink):
+    """
+    Sink passing the batches to a function.
+    """
+
+    def __init__(self, callback, flush_callback=None):
+        """
+        :param callback: Function called with each batch of bytes.
+        :param flush_callback: Optional function called without arguments on flush.
+        """
+        self.callback = callback
+        self.flush_callback = flush_callback
+
+    def write_batch(self, data):
+        """Pass a batch to the callback."""
+        self.callback(data)
+
+    def flush(self):
+        """Call the flush callback."""
+        if self.flush_callback is not None:
+            self.flush_callback()
+
+
+class FanOutSink(Sink):
+    """
+    Sink writing each batch into multiple sinks, so that a single serialization feeds all of
+    them.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write_batch(self, data):
+        """Write a batch into all the sinks."""
+        for sink in self.sinks:
+            sink.write_batch(data)
+
+    def flush(self):
+        """Flush all the sinks."""
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        """Close all the sinks."""
+        for sink in self.sinks:
+            sink.close()
+
+
+class QueuedSink(Sink):
+    """
+    Sink passing the batches to another sink in a thread through a queue of max_batches
+    batches, write_batch waits while the queue is full. Errors of the sink are raised by the
+    next call of write_batch or flush, and the remaining batches are dropped. The thread does
+    not keep the interpreter from exiting, so flush or close must be called to wait for the
+    queued batches to be written.
+    """
+
+    def __init__(self, sink, max_batches=SINK_QUEUE_BATCHES):
+        self.sink = sink
+        self.max_batches = max_batches
+        self._queue = queue.Queue(max(max_batches, 1))
+        self._thread = None
+        self._error = None
+
+    def _run(self):
+        """Write the queued batches into the sink until None is queued, then flush it."""
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self._error is None:
+                try:
+                    self.sink.write_batch(data)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self._error = exc
+        if self._error is None:
+            try:
+                self.sink.flush()
+            except Exception as exc:  # pylint: disable=broad-except
+                self._error = exc
+
+    def _raise_error(self):
+        """Raise the error of the sink, if any."""
+        if self._error is not None:
+            raise self._error
+
+    def write_batch(self, data):
+        """Queue a batch, starting the thread writing into the sink if needed."""
+        self._raise_error()
+        if self._thread is None:
+            self._thread = Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        self._queue.put(data)
+
+    def flush(self):
+        """Wait for the queued batches to be written and flush the sink, the thread exits
+        until the next batch."""
+        if self._thread is None:
+            self._raise_error()
+            self.sink.flush()
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._raise_error()
+
+    def close(self):
+        """Flush and close the sink, closing it once the thread exited even if the sink
+        failed."""
+        try:
+            self.flush()
+        finally:
+            self.sink.close()
+
+
+class SinkFile(object):
+    """
+    Binary file-like object passing the bytes written into it to a sink in batches of at
+    least batch_size bytes, so that sinks can be passed wherever outputs are written into
+    file objects.
+    """
+
+    def __init__(self, sink, batch_size=SINK_BATCH_SIZE):
+        self.sink = sink
+        self.batch_size = batch_size
+        self._blocks = []
+        self._buffered = 0
+        self._position = 0
+
+    def write(self, data):
+        """Buffer data, passing the buffer to the sink once it has batch_size bytes."""
+        self._blocks.append(data)
+        self._buffered += len(data)
+        self._position += len(data)
+        if self._buffered >= self.batch_size:
+            self._write_buffer()
+        return len(data)
+
+    def _write_buffer(self):
+        """Pass the buffer to the sink."""
+        if self._blocks:
+            data = b"".join(self._blocks)
+            self._blocks, self._buffered = [], 0
+            self.sink.write_batch(data)
+
+    def tell(self):
+        """Return the number of bytes written."""
+        return self._position
+
+    def flush(self):
+        """Pass the buffer to the sink and flush it."""
+        self._write_buffer()
+        self.sink.flush()
+
+    def close(self):
+        """Pass the buffer to the sink and close it, even if the sink failed."""
+        try:
+            self._write_buffer()
+        finally:
+            self.sink.close()
+
+
+def open_sink_file(sink, batch_size=SINK_BATCH_SIZE, max_batches=SINK_QUEUE_BATCHES):
+    """Open a SinkFile writing into sink through a QueuedSink of max_batches batches."""
+    return SinkFile(QueuedSink(sink, max_batches), batch_size)
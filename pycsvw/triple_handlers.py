@@ -0,0 +1,156 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Triple handlers building terms directly instead of writing the NT-serialization """
+from collections import namedtuple
+
+from rdflib import URIRef, BNode, Literal, RDF
+
+from six import string_types
+
+from .nt_serializer import RDF_FIRST, RDF_REST, RDF_NIL
+
+# Number of triples added to a graph at once
+GRAPH_BATCH_SIZE = 10000
+# Number of triples in each batch of CSVW.iter_triples
+TRIPLE_BATCH_SIZE = 10000
+
+# Kinds of terms
+URI = "uri"
+BNODE = "bnode"
+LITERAL = "literal"
+
+# A term of a triple, datatype and lang are only set for literals
+Term = namedtuple("Term", ["kind", "value", "datatype", "lang"])
+
+
+class TermCollector(object):
+    """
+    Triple handler collecting triples as tuples of Terms into triples, see nt_serializer.NTWriter.
+    Predicates are interned since they repeat on every row.
+    """
+
+    def __init__(self):
+        self.triples = []
+        self._predicates = {}
+
+    @staticmethod
+    def _node(value):
+        """Get the blank node term for '_:' prefixed values, the IRI term otherwise."""
+        if value.startswith(u"_:"):
+            return Term(BNODE, value[2:], None, None)
+        return Term(URI, value, None, None)
+
+    def _predicate(self, predicate):
+        """Get the interned term of a predicate."""
+        term = self._predicates.get(predicate)
+        if term is None:
+            term = self._predicates[predicate] = Term(URI, predicate, None, None)
+        return term
+
+    def add_uri(self, subject, predicate, obj):
+        """Add a triple whose object is an IRI."""
+        self.triples.append((self._node(subject), self._predicate(predicate), self._node(obj)))
+
+    def add_literal(self, subject, predicate, value, datatype=None, lang=None):
+        """Add a triple whose object is a literal."""
+        self.triples.append((self._node(subject), self._predicate(predicate),
+                             Term(LITERAL, value, datatype, lang if datatype is None else None)))
+
+    def add_list(self, subject, predicate, items, new_node):
+        """Add a triple whose object is an RDF-list of items along with the triples of the list."""
+        first, rest = self._predicate(RDF_FIRST), self._predicate(RDF_REST)
+        node = self._node(new_node())
+        self.triples.append((self._node(subject), self._predicate(predicate), node))
+        for ind, item in enumerate(items):
+            if isinstance(item, string_types):
+                self.triples.append((node, first, Term(URI, item, None, None)))
+            else:
+                lit_value, datatype = item
+                self.triples.append((node, first, Term(LITERAL, lit_value, datatype, None)))
+            if ind != len(items) - 1:
+                next_node = self._node(new_node())
+                self.triples.append((node, rest, next_node))
+                node = next_node
+            else:
+                self.triples.append((node, rest, Term(URI, RDF_NIL, None, None)))
+
+    def pop(self):
+        """Return the triples collected so far and start over."""
+        triples, self.triples = self.triples, []
+        return triples
+
+
+class GraphBuilder(object):
+    """
+    Triple handler adding the triples into an rdflib Graph in batches, see nt_serializer.NTWriter.
+    Predicates are interned since they repeat on every row.
+    """
+
+    def __init__(self, graph, batch_size=GRAPH_BATCH_SIZE):
+        self.graph = graph
+        self.batch_size = batch_size
+        self._quads = []
+        self._predicates = {}
+
+    @staticmethod
+    def _node(value):
+        """Get the blank node for '_:' prefixed values, the IRI otherwise."""
+        if value.startswith(u"_:"):
+            return BNode(value[2:])
+        return URIRef(value)
+
+    def _predicate(self, predicate):
+        """Get the interned IRI of a predicate."""
+        term = self._predicates.get(predicate)
+        if term is None:
+            term = self._predicates[predicate] = URIRef(predicate)
+        return term
+
+    def _add(self, subject, predicate, obj):
+        """Add a triple of terms to the batch and flush it once it is full."""
+        self._quads.append((subject, predicate, obj, self.graph))
+        if len(self._quads) >= self.batch_size:
+            self.flush()
+
+    def add_uri(self, subject, predicate, obj):
+        """Add a triple whose object is an IRI."""
+        self._add(self._node(subject), self._predicate(predicate), self._node(obj))
+
+    def add_literal(self, subject, predicate, value, datatype=None, lang=None):
+        """Add a triple whose object is a literal."""
+        datatype = URIRef(datatype) if datatype is not None else None
+        self._add(self._node(subject), self._predicate(predicate),
+                  Literal(value, datatype=datatype, lang=lang if datatype is None else None))
+
+    def add_list(self, subject, predicate, items, new_node):
+        """Add a triple whose object is an RDF-list of items along with the triples of the list."""
+        node = self._node(new_node())
+        self._add(self._node(subject), self._predicate(predicate), node)
+        for ind, item in enumerate(items):
+            if isinstance(item, string_types):
+                self._add(node, RDF.first, URIRef(item))
+            else:
+                lit_value, datatype = item
+                self._add(node, RDF.first,
+                          Literal(lit_value, datatype=URIRef(datatype) if datatype else None))
+            if ind != len(items) - 1:
+                next_node = self._node(new_node())
+                self._add(node, RDF.rest, next_node)
+                node = next_node
+            else:
+                self._add(node, RDF.rest, RDF.nil)
+
+    def flush(self):
+        """Add the batch of triples into the graph."""
+        if self._quads:
+            self.graph.addN(self._quads)
+            self._quads = []
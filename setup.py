@@ -28,6 +28,8 @@ setup(
     ],
 
     keywords='csv metadata rdf json csvw',
+    # pycsvw.aio uses async/await and is only imported on Python 3.5+, installing on older
+    # versions reports a SyntaxError when byte-compiling it, which can be ignored
     packages=find_packages(),
     install_requires=['click', 'six', 'future', 'rdflib', 'rdflib-jsonld', 'python-dateutil'],
     tests_require=['pytest', 'mock'],
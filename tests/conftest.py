@@ -0,0 +1,35 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import sys
+
+import pytest
+
+# The asyncio variants use async/await syntax, which older versions fail to compile
+collect_ignore = ["test_aio.py"] if sys.version_info < (3, 5) else []
+
+
+@pytest.fixture
+def write_books(tmpdir):
+    """ Write a copy of tests/books.csv into tmpdir, with an extra cell in bad_row if given.
+    :return: A function of bad_row returning the path of the copy.
+    """
+    def write(bad_row=None):
+        csv_path = str(tmpdir.join("books.csv"))
+        with io.open("tests/books.csv", 'rb') as csv_file:
+            lines = csv_file.read().splitlines(True)
+        if bad_row is not None:
+            lines[bad_row] = lines[bad_row].replace(b",", b",,", 1)
+        with io.open(csv_path, 'wb') as csv_file:
+            csv_file.write(b"".join(lines))
+        return csv_path
+    return write
@@ -0,0 +1,97 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import pytest
+from rdflib import ConjunctiveGraph, BNode, URIRef
+
+from pycsvw import CSVW
+
+
+def to_nt(blank_nodes, csv_path, metadata_path, skolem_base=None):
+    csvw = CSVW(csv_path=csv_path, metadata_path=metadata_path,
+                blank_nodes=blank_nodes, skolem_base=skolem_base)
+    try:
+        return csvw.to_rdf(fmt="nt")
+    finally:
+        csvw.close()
+
+
+@pytest.mark.parametrize("csv_path,metadata_path", [
+    ("tests/simple.csv", "tests/simple.csv-metadata.json"),
+    ("tests/value_urls.csv", "tests/value_urls.csv-metadata.json")])
+def test_stable_blank_nodes(csv_path, metadata_path):
+    first = to_nt("stable", csv_path, metadata_path)
+    second = to_nt("stable", csv_path, metadata_path)
+    assert "_:" in first
+    assert first == second
+
+    # Random blank nodes differ between runs
+    assert to_nt("random", csv_path, metadata_path) != to_nt("random", csv_path, metadata_path)
+
+    g = ConjunctiveGraph()
+    g.parse(data=first, format="nt")
+    random_g = ConjunctiveGraph()
+    random_g.parse(data=to_nt("random", csv_path, metadata_path), format="nt")
+    assert len(g) == len(random_g)
+
+
+def test_stable_blank_nodes_of_rows():
+    g = ConjunctiveGraph()
+    g.parse(data=to_nt("stable", "tests/simple.csv", "tests/simple.csv-metadata.json"),
+            format="nt")
+    # A blank node per row, written as <_:label> for riot
+    assert len({x for x in g.subjects() if x.startswith("_:")}) == 2
+
+
+@pytest.mark.parametrize("blank_nodes", ["stable", "skolem"])
+def test_labels_independent_of_row_position(tmpdir, blank_nodes):
+    csv_path = str(tmpdir.join("simple.csv"))
+    with io.open("tests/simple.csv", 'rb') as csv_file:
+        lines = csv_file.read().splitlines(True)
+    with io.open(csv_path, 'wb') as csv_file:
+        csv_file.write(b"".join([lines[0], b"bus,to the airport,5\n"] + lines[1:]))
+    full = to_nt(blank_nodes, "tests/simple.csv", "tests/simple.csv-metadata.json",
+                 "http://example.org/")
+    inserted = to_nt(blank_nodes, csv_path, "tests/simple.csv-metadata.json",
+                     "http://example.org/")
+    # Inserting a row does not relabel the nodes of the other rows, so deltas stay small
+    assert set(full.splitlines()) < set(inserted.splitlines())
+
+
+def test_skolem_iris():
+    skolem_base = "http://example.org/"
+    first = to_nt("skolem", "tests/value_urls.csv", "tests/value_urls.csv-metadata.json",
+                  skolem_base)
+    second = to_nt("skolem", "tests/value_urls.csv", "tests/value_urls.csv-metadata.json",
+                   skolem_base)
+    assert first == second
+    assert "_:" not in first
+
+    g = ConjunctiveGraph()
+    g.parse(data=first, format="nt")
+    assert not [x for x in g.all_nodes() if isinstance(x, BNode)]
+    skolem_iris = {x for x in g.all_nodes()
+                   if isinstance(x, URIRef) and x.startswith("http://example.org/.well-known/genid/")}
+    assert skolem_iris
+
+
+def test_invalid_blank_nodes():
+    with pytest.raises(ValueError) as exc:
+        CSVW(csv_path="tests/simple.csv", metadata_path="tests/simple.csv-metadata.json",
+             blank_nodes="sequential")
+    assert "blank_nodes should be one of" in str(exc.value)
+
+    with pytest.raises(ValueError) as exc:
+        CSVW(csv_path="tests/simple.csv", metadata_path="tests/simple.csv-metadata.json",
+             blank_nodes="skolem")
+    assert "skolem_base is required" in str(exc.value)
@@ -18,7 +18,7 @@ import stat
 
 from six.moves import zip
 import pytest
-from rdflib import ConjunctiveGraph, Literal
+from rdflib import BNode, ConjunctiveGraph, Literal
 from rdflib.namespace import Namespace, XSD
 
 from pycsvw import CSVW
@@ -251,3 +251,114 @@ def test_context_mgr():
         assert any([f.endswith(".ttl") for f in created_files])
 
     assert len(os.listdir(tmp_dir)) == 0
+
+
+@pytest.mark.parametrize("fmt, validate_func, rdflib_input", [
+    ("turtle", validate_turtle, "turtle"),
+    ("nquads", lambda x: None, "nquads")
+])
+def test_parallel_riot(fmt, validate_func, rdflib_input):
+    tmp_dir = tempfile.mkdtemp(dir="/tmp")
+    with CSVW(csv_path="./tests/books.csv",
+              metadata_path="./tests/books.csv-metadata.json",
+              temp_dir=tmp_dir, riot_jobs=2) as csvw:
+        rdf_output = csvw.to_rdf(fmt=fmt)
+        # Books have one row per subject, so there should be two chunks
+        assert len(csvw._split_nt_output(2)) == 2
+    validate_func(rdf_output)
+    verify_rdf_contents(rdf_output, rdflib_input)
+    # Prefixes should be declared only once
+    prefix_lines = [x for x in rdf_output.splitlines() if x.startswith(u"@prefix")]
+    assert len(prefix_lines) == len(set(prefix_lines))
+    # Chunk files should have been removed
+    assert len(os.listdir(tmp_dir)) == 0
+
+
+@pytest.mark.parametrize("fmt, rdflib_input", [
+    ("turtle", "turtle"),
+    ("rdf", "xml"),
+    ("json-ld", "json-ld")
+])
+@patch("pycsvw.csvw.Popen")
+def test_rdflib_backend(mock_popen, fmt, rdflib_input):
+    csvw = CSVW(csv_path="./tests/books.csv",
+                metadata_path="./tests/books.csv-metadata.json",
+                backend="rdflib")
+    rdf_output = csvw.to_rdf(fmt=fmt)
+    verify_rdf_contents(rdf_output, rdflib_input)
+    assert csvw.chosen_backend == "rdflib"
+    assert mock_popen.call_count == 0
+
+
+def test_rdflib_backend_blank_nodes():
+    csvw = CSVW(csv_path='tests/virtual1.csv',
+                metadata_path='tests/virtual1.csv-metadata.json',
+                backend="rdflib")
+    g = ConjunctiveGraph()
+    g.parse(data=csvw.to_rdf(), format="turtle")
+    # Subjects of the rows without aboutUrl are blank nodes
+    assert len([x for x in set(g.subjects()) if isinstance(x, BNode)]) == 2
+
+
+@pytest.mark.parametrize("threshold, expected_backend", [
+    (1000, "rdflib"),
+    (10, "riot")
+])
+@patch("pycsvw.csvw.find_executable")
+def test_auto_backend(mock_find_executable, threshold, expected_backend):
+    mock_find_executable.return_value = True
+    csvw = CSVW(csv_path="./tests/books.csv",
+                metadata_path="./tests/books.csv-metadata.json",
+                backend="auto", auto_backend_threshold=threshold)
+    with patch.object(CSVW, "_convert_with_rdflib") as rdflib_mocked, \
+            patch("pycsvw.csvw.Popen") as popen_mocked:
+        popen_mocked.return_value.communicate.return_value = (None, None)
+        popen_mocked.return_value.returncode = 0
+        csvw.to_rdf()
+        assert rdflib_mocked.call_count == (1 if expected_backend == "rdflib" else 0)
+        assert popen_mocked.call_count == (1 if expected_backend == "riot" else 0)
+    assert csvw.chosen_backend == expected_backend
+    # 4 rows with 4 columns
+    assert "16 triples" in csvw.backend_reason
+
+
+@patch("pycsvw.csvw.find_executable")
+def test_auto_backend_without_riot(mock_find_executable):
+    mock_find_executable.return_value = None
+    csvw = CSVW(csv_path="./tests/books.csv",
+                metadata_path="./tests/books.csv-metadata.json",
+                backend="auto", auto_backend_threshold=0)
+    rdf_output = csvw.to_rdf()
+    validate_turtle(rdf_output)
+    assert csvw.chosen_backend == "rdflib"
+    assert "riot" in csvw.backend_reason
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        CSVW(csv_path="./tests/books.csv",
+             metadata_path="./tests/books.csv-metadata.json",
+             backend="jvm")
+
+
+@pytest.mark.parametrize("spool_max_size", [1 << 20, 100])
+@pytest.mark.parametrize("riot_jobs", [1, 2])
+def test_spooled_intermediates(spool_max_size, riot_jobs):
+    tmp_dir = tempfile.mkdtemp(dir="/tmp")
+    with CSVW(csv_path="./tests/books.csv",
+              metadata_path="./tests/books.csv-metadata.json",
+              temp_dir=tmp_dir, riot_jobs=riot_jobs, spool_max_size=spool_max_size) as csvw:
+        nt_output = csvw.to_rdf(fmt="nt")
+        ttl_output = csvw.to_rdf(fmt="turtle")
+        # Nothing is written into temporary directory
+        assert len(os.listdir(tmp_dir)) == 0
+
+        # Also into actual files
+        ttl_file = tempfile.TemporaryFile()
+        csvw.to_rdf_files([(ttl_file, "turtle")])
+        ttl_file.seek(0)
+        assert ttl_file.read().decode("utf-8") == ttl_output
+    validate_nt(nt_output)
+    verify_rdf_contents(nt_output, "nt")
+    validate_turtle(ttl_output)
+    verify_rdf_contents(ttl_output, "turtle")
@@ -0,0 +1,61 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.compare import isomorphic
+
+from pycsvw import CSVW
+
+
+CSV_AND_METADATA = [("tests/simple.csv", "tests/simple.csv-metadata.json"),
+                    ("tests/value_urls.csv", "tests/value_urls.csv-metadata.json"),
+                    ("tests/datatypes.others.csv", "tests/datatypes.others.csv-metadata.json"),
+                    ("tests/virtual1.csv", "tests/virtual1.invariant.csv-metadata.json")]
+
+
+def parse_nt(nt_output):
+    parsed = Graph()
+    parsed.parse(data=nt_output, format="nt")
+    # Blank nodes of rows are written as <_:label> for riot
+    to_node = lambda x: BNode(x[2:]) if isinstance(x, URIRef) and x.startswith("_:") else x
+    graph = Graph()
+    for subj, pred, obj in parsed:
+        graph.add((to_node(subj), pred, to_node(obj)))
+    return graph
+
+
+@pytest.mark.parametrize("csv_path,metadata_path", CSV_AND_METADATA)
+def test_to_graph(csv_path, metadata_path):
+    with CSVW(csv_path=csv_path, metadata_path=metadata_path) as csvw:
+        nt_graph = parse_nt(csvw.to_rdf("nt"))
+        graph = csvw.to_graph(batch_size=3)
+    assert len(graph) == len(nt_graph)
+    assert isomorphic(graph, nt_graph)
+
+
+def test_to_graph_multiple_tables():
+    with CSVW(csv_path=("tests/multiple_tables.Name-ID.csv", "tests/multiple_tables.ID-Age.csv"),
+              metadata_path="tests/multiple_tables.csv-metadata.json") as csvw:
+        nt_graph = parse_nt(csvw.to_rdf("nt"))
+        graph = Graph()
+        assert csvw.to_graph(graph) is graph
+    assert isomorphic(graph, nt_graph)
+    assert dict(graph.namespaces())["ids"] == URIRef("http://foo.example.org/CSV/People-IDs/")
+
+
+def test_to_graph_interns_predicates():
+    with CSVW(csv_path="tests/simple.csv", metadata_path="tests/simple.csv-metadata.json") as csvw:
+        graph = csvw.to_graph()
+    predicates = {}
+    for _, pred, _ in graph:
+        assert predicates.setdefault(pred, pred) is pred
+    assert Literal("taxi") in set(graph.objects())
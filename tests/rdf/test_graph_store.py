@@ -0,0 +1,161 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from threading import Event, Thread
+import time
+
+import pytest
+from rdflib import ConjunctiveGraph, Graph, URIRef
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.urllib.parse import parse_qs, urlsplit
+
+from pycsvw import CSVW
+from pycsvw.graph_store import GraphStoreError, GraphStoreWriter
+from pycsvw.triple_handlers import LITERAL, URI, Term
+
+
+MULTIPLE_TABLES = dict(csv_path=["tests/multiple_tables.Name-ID.csv",
+                                 "tests/multiple_tables.ID-Age.csv"],
+                       metadata_path="tests/multiple_tables.csv-metadata.json")
+AGE_ID_GRAPH = "file://" + os.path.abspath("tests/multiple_tables.ID-Age.csv")
+
+
+class StoreServer(ThreadingMixIn, HTTPServer):
+    """Stand-in store recording the requests, failing those with statuses queued in fail."""
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StoreHandler)
+        self.requests = []
+        self.fail = []
+        self.release = Event()
+        self.release.set()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/store".format(self.server_address[1])
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.release.wait()
+        status = self.server.fail.pop(0) if self.server.fail else 204
+        if status == 204:
+            self.server.requests.append((self.path, self.headers["Content-Type"],
+                                         body.decode("utf-8"), self.client_address))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def server():
+    store = StoreServer()
+    thread = Thread(target=store.serve_forever, kwargs={"poll_interval": 0.05})
+    thread.daemon = True
+    thread.start()
+    yield store
+    store.shutdown()
+    store.server_close()
+
+
+def expected_graphs():
+    graph = ConjunctiveGraph()
+    graph.parse(data=CSVW(backend="native", **MULTIPLE_TABLES).to_rdf("nquads"),
+                format="nquads")
+    return {x.identifier: set(x) for x in graph.contexts() if len(x)}
+
+
+def test_graph_store_protocol(server):
+    csvw = CSVW(**MULTIPLE_TABLES)
+    stats = csvw.to_graph_store(server.url, batch_triples=2, connections=2, retry_delay=0)
+    graphs = {}
+    for path, content_type, body, _ in server.requests:
+        assert content_type == "application/n-triples"
+        graph = URIRef(parse_qs(urlsplit(path).query)["graph"][0])
+        graphs.setdefault(graph, set()).update(Graph().parse(data=body, format="nt"))
+    assert graphs == expected_graphs()
+    assert stats == {"triples": 8, "batches": len(server.requests), "retries": 0}
+    # Batches end on row boundaries and never span tables
+    assert len(server.requests) == 4
+    assert len({x[3] for x in server.requests}) <= 2
+
+
+def test_update_protocol(server):
+    csvw = CSVW(graph_iris={"multiple_tables.Name-ID.csv": None}, **MULTIPLE_TABLES)
+    csvw.to_graph_store(server.url + "?key=1", protocol="update", batch_triples=100)
+    graph = ConjunctiveGraph()
+    for path, content_type, body, _ in server.requests:
+        assert path == "/store?key=1"
+        assert content_type == "application/sparql-update"
+        assert body.startswith("INSERT DATA {")
+        graph.update(body)
+    # Tables mapped to None are inserted into the default graph
+    assert sorted(("GRAPH <" + AGE_ID_GRAPH + ">") in x[2] for x in server.requests) == \
+        [False, True]
+    assert set(graph) == set.union(*expected_graphs().values())
+
+
+def test_retries(server):
+    server.fail = [503, 429]
+    stats = CSVW(**MULTIPLE_TABLES).to_graph_store(server.url, connections=1, retry_delay=0)
+    assert stats == {"triples": 8, "batches": 2, "retries": 2}
+
+
+def test_failed_batch(server):
+    server.fail = [400]
+    with pytest.raises(GraphStoreError):
+        CSVW(**MULTIPLE_TABLES).to_graph_store(server.url, connections=1, retry_delay=0)
+    server.fail = [500] * 3
+    with pytest.raises(GraphStoreError):
+        CSVW(**MULTIPLE_TABLES).to_graph_store(server.url, connections=1, retries=2,
+                                               retry_delay=0)
+
+
+def test_invalid_port():
+    with pytest.raises(GraphStoreError) as exc_info:
+        CSVW(**MULTIPLE_TABLES).to_graph_store("http://localhost:port/store", connections=1,
+                                               retries=1, retry_delay=0)
+    assert "nonnumeric port" in str(exc_info.value)
+
+
+def test_bounded_in_flight(server):
+    server.release.clear()
+    writer = GraphStoreWriter(server.url, batch_triples=1, connections=1, max_in_flight=2)
+    triple = (Term(URI, "http://example.org/s", None, None),
+              Term(URI, "http://example.org/p", None, None), Term(LITERAL, "o", None, None))
+    writer.start()
+    writer.start_table("http://example.org/table")
+    rows = Thread(target=lambda: [writer.write_triples([triple]) for _ in range(4)])
+    rows.start()
+    time.sleep(0.5)
+    # The third batch waits for the first two, which the store is holding on to
+    assert rows.is_alive()
+    server.release.set()
+    rows.join()
+    writer.finish()
+    assert writer.stats["batches"] == 4
+    assert len({x[3] for x in server.requests}) == 1
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        GraphStoreWriter("ftp://example.org/store")
+    with pytest.raises(ValueError):
+        GraphStoreWriter("http://example.org/store", protocol="put")
@@ -10,6 +10,7 @@
 # limitations under the License.
 
 import io
+import json
 from builtins import str as text
 
 from mock import patch, Mock
@@ -97,3 +98,54 @@ def test_multiple_tables_through_urls(mock_urlopen):
 
 
 
+
+
+@patch("pycsvw.csvw.urlopen")
+def test_multiple_tables_fetched_lazily(mock_urlopen):
+    metadata_path = "tests/multiple_tables.csv-metadata.json"
+    csv1_url = "multiple_tables.Name-ID.csv"
+    csv2_url = "multiple_tables.ID-Age.csv"
+    csv1_path = "tests/multiple_tables.Name-ID.csv"
+
+    with io.open(metadata_path, 'r') as metadata_f, io.open(csv1_path) as csv1_f:
+        metadata_json = json.loads(metadata_f.read())
+        csv1 = text(csv1_f.read())
+    metadata_json["tables"][1]["suppressOutput"] = True
+    metadata = io.StringIO(text(json.dumps(metadata_json)))
+
+    reader = Mock()
+    reader.read.side_effect = [csv1]
+    mock_urlopen.return_value = reader
+
+    with CSVW(csv_url=(csv1_url, csv2_url), metadata_handle=metadata) as csvw:
+        # Nothing is fetched until the tables are serialized
+        assert mock_urlopen.call_count == 0
+        rdf = csvw.to_rdf()
+
+    # Suppressed table is never fetched
+    mock_urlopen.assert_called_once_with(csv1_url)
+    assert '"Bob"' in rdf
+    assert "ages:age" not in rdf
+
+
+def test_multiple_tables_in_parallel():
+    metadata_path = "tests/multiple_tables.csv-metadata.json"
+    csv1_path = "tests/multiple_tables.Name-ID.csv"
+    csv2_path = "tests/multiple_tables.ID-Age.csv"
+
+    with io.open(csv2_path) as csv2_f:
+        csv2 = io.StringIO(csv2_f.read())
+
+    with CSVW(csv_path=(csv1_path, csv2_path), metadata_path=metadata_path) as csvw:
+        sequential_nt = csvw.to_rdf("nt")
+    # Tables given both by path and handle
+    with CSVW(csv_handle=[io.open(csv1_path), csv2], metadata_path=metadata_path,
+              table_jobs=2) as csvw:
+        parallel_nt = csvw.to_rdf("nt")
+        rdf = csvw.to_rdf()
+        # Row offsets of both tables are recorded
+        assert len(csvw._nt_row_offsets) == 4
+
+    # Output is in the order of the tables in metadata
+    assert parallel_nt == sequential_nt
+    verify_rdf(rdf)
@@ -0,0 +1,196 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import re
+
+from mock import patch
+import pytest
+from rdflib import ConjunctiveGraph, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+
+from pycsvw import CSVW
+from pycsvw.rdf_writers import JSONLDWriter, RDFXMLWriter, TriGWriter
+from pycsvw.triple_handlers import BNODE, LITERAL, URI, Term
+
+
+MULTIPLE_TABLES = dict(csv_path=["tests/multiple_tables.Name-ID.csv",
+                                 "tests/multiple_tables.ID-Age.csv"],
+                       metadata_path="tests/multiple_tables.csv-metadata.json")
+NAME_ID_GRAPH = URIRef("file://" + os.path.abspath("tests/multiple_tables.Name-ID.csv"))
+AGE_ID_GRAPH = URIRef("file://" + os.path.abspath("tests/multiple_tables.ID-Age.csv"))
+
+
+def parse_quads(contents, fmt):
+    g = ConjunctiveGraph()
+    g.parse(data=contents, format=fmt)
+    return {x.identifier: set(x) for x in g.contexts() if len(x)}
+
+
+@pytest.mark.parametrize("fmt", ["nquads", "trig"])
+def test_graph_per_table(fmt):
+    csvw = CSVW(backend="native", **MULTIPLE_TABLES)
+    graphs = parse_quads(csvw.to_rdf(fmt), fmt)
+    # Relative table urls are resolved against the location of the metadata
+    assert set(graphs) == {NAME_ID_GRAPH, AGE_ID_GRAPH}
+    assert all(len(x) == 4 for x in graphs.values())
+    assert csvw.chosen_backend == "native"
+
+
+@pytest.mark.parametrize("fmt", ["nquads", "trig"])
+def test_graph_iris(fmt):
+    csvw = CSVW(backend="native",
+                graph_iris={"multiple_tables.ID-Age.csv": "http://example.org/ages"},
+                **MULTIPLE_TABLES)
+    graphs = parse_quads(csvw.to_rdf(fmt), fmt)
+    assert set(graphs) == {NAME_ID_GRAPH, URIRef("http://example.org/ages")}
+
+
+def test_default_graph():
+    csvw = CSVW(backend="native", graph_iris={"multiple_tables.Name-ID.csv": None},
+                **MULTIPLE_TABLES)
+    contents = csvw.to_rdf("nquads")
+    lines = contents.splitlines()
+    assert len(lines) == 8
+    # Triples of the table mapped to None have no graph
+    assert len([x for x in lines if "multiple_tables" not in x]) == 4
+
+
+@pytest.mark.parametrize("csv_path, metadata_path", [
+    ("tests/books.csv", "tests/books.csv-metadata.json"),
+    ("tests/parsing.quoted_newlines.csv", "tests/parsing.quoted_newlines.csv-metadata.json"),
+    ("tests/parsing.escaped_quotes.csv", "tests/parsing.escaped_quotes.csv-metadata.json"),
+    ("tests/value_urls.csv", "tests/value_urls.csv-metadata.json"),
+    ("tests/virtual1.csv", "tests/virtual1.csv-metadata.json"),
+    ("tests/datatypes.others.csv", "tests/datatypes.others.csv-metadata.json")
+])
+@pytest.mark.parametrize("fmt, rdflib_fmt", [
+    ("nquads", "nquads"),
+    ("trig", "trig"),
+    ("json-ld", "json-ld"),
+    ("rdf", "xml")
+])
+def test_same_triples_as_nt(csv_path, metadata_path, fmt, rdflib_fmt):
+    with CSVW(csv_path=csv_path, metadata_path=metadata_path) as csvw:
+        expected = Graph()
+        # Blank nodes are written as <_:label> for riot
+        expected.parse(data=re.sub(r"<(_:[^>]+)>", r"\1", csvw.to_rdf("nt")), format="nt")
+    with CSVW(csv_path=csv_path, metadata_path=metadata_path, backend="native") as csvw:
+        graphs = parse_quads(csvw.to_rdf(fmt), rdflib_fmt)
+    assert len(graphs) == 1
+    actual = Graph()
+    for triple in list(graphs.values())[0]:
+        actual.add(triple)
+    assert isomorphic(actual, expected)
+
+
+def test_json_ld_context():
+    csvw = CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                backend="native")
+    document = json.loads(csvw.to_rdf("json-ld"))
+    context = document["@context"]
+    assert context["isbn"] == "http://www.books.org/isbn/"
+    assert context["pagecount"] == {"@id": "books:pagecount", "@type": "xsd:unsignedShort"}
+    # One node object per row subject, with values coerced by the terms of the context
+    assert len(document["@graph"]) == 4
+    assert document["@graph"][0] == {"@id": "isbn:0062316095", "isbnnumber": "0062316095",
+                                     "pagecount": "464", "hardcover": "true", "price": "21.00"}
+
+
+def test_rdf_xml_escaping():
+    output = io.BytesIO()
+    writer = RDFXMLWriter(output, {"ex": "http://example.org/"})
+    writer.start([])
+    writer.write_triples([
+        (Term(URI, u"http://example.org/a?b=1&c=\"2\"", None, None),
+         Term(URI, u"http://other.org/ns#prop", None, None),
+         Term(LITERAL, u"<tag> & \"quotes\"\r\n", None, "en")),
+        (Term(BNODE, u"0B1", None, None), Term(URI, u"http://example.org/p", None, None),
+         Term(URI, u"http://example.org/x<y>", None, None))
+    ])
+    writer.finish()
+    g = Graph()
+    g.parse(data=output.getvalue().decode("utf-8"), format="xml")
+    assert len(g) == 2
+    assert (URIRef(u"http://example.org/a?b=1&c=\"2\""), URIRef(u"http://other.org/ns#prop"),
+            Literal(u"<tag> & \"quotes\"\r\n", lang="en")) in g
+    assert URIRef(u"http://example.org/x<y>") in set(g.objects())
+
+
+def test_rdf_xml_invalid():
+    writer = RDFXMLWriter(io.BytesIO(), {})
+    with pytest.raises(ValueError):
+        writer.write_triples([(Term(URI, u"http://example.org/s", None, None),
+                               Term(URI, u"http://example.org/1", None, None),
+                               Term(LITERAL, u"a", None, None))])
+    with pytest.raises(ValueError):
+        writer.write_triples([(Term(URI, u"http://example.org/s", None, None),
+                               Term(URI, u"http://example.org/p", None, None),
+                               Term(LITERAL, u"bell \x07", None, None))])
+
+
+@pytest.mark.parametrize("writer_class", [JSONLDWriter, RDFXMLWriter, TriGWriter])
+def test_substituted_properties_not_cached(writer_class):
+    with io.open("tests/books.csv-metadata.json", encoding="utf-8") as md_file:
+        md_tables = CSVW.compile_metadata(metadata_handle=md_file)[1]["tables"]
+    writer = writer_class(io.BytesIO(), {"ex": "http://example.org/"})
+    writer.start(md_tables)
+    cached = dict(writer._tags if writer_class is RDFXMLWriter else writer._names._cache)
+    assert cached
+    # Properties from propertyUrl substitutions differ on every row
+    for ind in range(100):
+        writer.write_triples([(Term(URI, u"http://example.org/s", None, None),
+                               Term(URI, u"http://example.org/p{}".format(ind), None, None),
+                               Term(LITERAL, u"a", u"http://example.org/dt{}".format(ind),
+                                    None))])
+    writer.finish()
+    assert (writer._tags if writer_class is RDFXMLWriter else writer._names._cache) == cached
+
+
+def test_single_pass_without_nt():
+    csvw = CSVW(backend="native", **MULTIPLE_TABLES)
+    with patch("pycsvw.nt_serializer.serialize") as serialize_mocked:
+        csvw.to_rdf("trig")
+    assert serialize_mocked.call_count == 0
+
+
+@pytest.mark.parametrize("kwargs, reason", [
+    ({}, "not written natively"),
+    ({"sort_by": "spo"}, "sorted")
+])
+def test_native_fallback(kwargs, reason):
+    csvw = CSVW(backend="native", **dict(MULTIPLE_TABLES, **kwargs))
+    fmt = "turtle" if not kwargs else "trig"
+    assert csvw._choose_backend(fmt) == "riot"
+    assert reason in csvw.backend_reason
+
+
+def test_native_progress(tmpdir):
+    reports = []
+    csvw = CSVW(backend="native", progress=reports.append, progress_interval=0,
+                metrics_path=str(tmpdir.join("pycsvw.prom")), **MULTIPLE_TABLES)
+    csvw.to_rdf_files([(io.BytesIO(), "trig")])
+    counts = reports[-1]["tables"]
+    assert [counts[x]["rows"] for x in sorted(counts)] == [2, 2]
+    assert reports[-1]["triples"] == 8
+    assert [x["phase"] for x in reports][-1] == "done"
+    with io.open(str(tmpdir.join("pycsvw.prom")), encoding="utf-8") as metrics_file:
+        assert u'pycsvw_table_rows{table="multiple_tables.ID-Age.csv"} 2' in \
+            metrics_file.read()
+
+
+def test_native_checkpoint(tmpdir):
+    csvw = CSVW(backend="native", checkpoint_path=str(tmpdir.join("checkpoint.json")),
+                **MULTIPLE_TABLES)
+    with pytest.raises(ValueError):
+        csvw.to_rdf_files([(io.BytesIO(), "trig")])
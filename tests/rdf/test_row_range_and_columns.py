@@ -0,0 +1,81 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from rdflib import ConjunctiveGraph, Literal
+from rdflib.namespace import Namespace
+
+from pycsvw import CSVW
+
+
+BOOKS = Namespace("http://www.books.org/")
+ISBN = Namespace("http://www.books.org/isbn/")
+NS = Namespace("http://example.org/")
+
+
+def to_graph(**kwargs):
+    with CSVW(**kwargs) as csvw:
+        g = ConjunctiveGraph()
+        g.parse(data=csvw.to_rdf("nt"), format="nt")
+    return g
+
+
+def test_row_range():
+    g = to_graph(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                 row_start=2, row_end=3)
+    assert set(g.subjects()) == {ISBN["0374532508"], ISBN["1610391845"]}
+    assert len(g) == 8
+
+    g = to_graph(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                 row_start=4)
+    assert set(g.subjects()) == {ISBN["0374275637"]}
+
+    g = to_graph(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                 row_end=1)
+    assert set(g.subjects()) == {ISBN["0062316095"]}
+
+
+def test_row_range_row_numbers():
+    g = to_graph(csv_path="tests/virtual1.csv",
+                 metadata_path="tests/virtual1.invariant.csv-metadata.json", row_start=2)
+    assert (NS["sub-2"], NS["obj-2"], NS["pred-2"]) in g
+    assert (NS["sub-1"], NS["obj-1"], NS["pred-1"]) not in g
+    # Row-invariant triples are written with the first row in the range
+    assert (NS["expenses"], NS["description"], Literal("Expenses of the trip")) in g
+
+
+def test_column_projection():
+    g = to_graph(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                 columns=["pages", "price"])
+    assert set(g.predicates()) == {BOOKS["pagecount"], BOOKS["price"]}
+    # Projected out columns are still available to substitutions
+    assert ISBN["0062316095"] in set(g.subjects())
+
+    g = to_graph(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                 exclude_columns=["isbn", "hardcover"])
+    assert set(g.predicates()) == {BOOKS["pagecount"], BOOKS["price"]}
+
+    g = to_graph(csv_path="tests/virtual1.csv",
+                 metadata_path="tests/virtual1.invariant.csv-metadata.json",
+                 columns=["t1", "v2"])
+    assert len(g) == 3
+    assert (NS["expenses"], NS["source"], NS["simple.csv"]) in g
+
+
+def test_invalid_row_range_and_columns():
+    kwargs = {"csv_path": "tests/books.csv", "metadata_path": "tests/books.csv-metadata.json"}
+    with pytest.raises(ValueError):
+        CSVW(row_start=0, **kwargs)
+    with pytest.raises(ValueError):
+        CSVW(row_start=3, row_end=2, **kwargs)
+    with pytest.raises(ValueError) as exc:
+        CSVW(columns=["pages", "author"], **kwargs)
+    assert "['author']" in str(exc.value)
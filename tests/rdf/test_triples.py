@@ -0,0 +1,67 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.compare import isomorphic
+from rdflib.namespace import XSD
+
+from pycsvw import CSVW
+from pycsvw.triple_handlers import Term
+
+
+def to_rdflib(term):
+    if term.kind == "uri":
+        return URIRef(term.value)
+    if term.kind == "bnode":
+        return BNode(term.value)
+    return Literal(term.value, datatype=term.datatype, lang=term.lang)
+
+
+@pytest.mark.parametrize("csv_path,metadata_path", [
+    ("tests/simple.csv", "tests/simple.csv-metadata.json"),
+    ("tests/value_urls.csv", "tests/value_urls.csv-metadata.json"),
+    ("tests/datatypes.others.csv", "tests/datatypes.others.csv-metadata.json")])
+def test_iter_triples(csv_path, metadata_path):
+    with CSVW(csv_path=csv_path, metadata_path=metadata_path, blank_nodes="stable") as csvw:
+        graph = csvw.to_graph()
+        batches = list(csvw.iter_triples(batch_size=1))
+        assert len(list(csvw.iter_triples())) == 1
+
+    # Batches end on row boundaries
+    with open(csv_path) as csv_file:
+        assert len(batches) == len(csv_file.read().strip().splitlines()) - 1
+    triples = [x for batch in batches for x in batch]
+    terms_graph = Graph()
+    for triple in triples:
+        assert all(isinstance(x, Term) for x in triple)
+        terms_graph.add(tuple(to_rdflib(x) for x in triple))
+    assert len(triples) == len(graph)
+    assert isomorphic(terms_graph, graph)
+
+    # Predicates are reused across rows
+    predicates = {}
+    for _, pred, _ in triples:
+        assert predicates.setdefault(pred.value, pred) is pred
+
+
+def test_iter_triples_terms():
+    with CSVW(csv_path="tests/simple.csv", metadata_path="tests/simple.csv-metadata.json") as csvw:
+        triples = [x for batch in csvw.iter_triples() for x in batch]
+
+    assert len(triples) == 6
+    assert {x[0].kind for x in triples} == {"bnode"}
+    assert Term("literal", "taxi", None, None) in [x[2] for x in triples]
+
+    with CSVW(csv_path="tests/datatypes.others.csv",
+              metadata_path="tests/datatypes.others.csv-metadata.json") as csvw:
+        triples = [x for batch in csvw.iter_triples() for x in batch]
+    assert Term("literal", "-3", str(XSD.integer), None) in [x[2] for x in triples]
@@ -119,25 +119,30 @@ def test_negative_invalid_column():
         print(csvw.to_rdf())
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def test_row_invariant_columns():
+    metadata_path = 'tests/virtual1.invariant.csv-metadata.json'
+    ns = Namespace("http://example.org/")
+    expected = [(ns['expenses'], ns['source'], ns['simple.csv']),
+                (ns['expenses'], ns['description'], Literal("Expenses of the trip"))]
+
+    csvw = CSVW(csv_path='tests/virtual1.csv', metadata_path=metadata_path)
+    columns = csvw._metadata["tables"][0]["tableSchema"]["columns"]
+    assert [x["rowInvariant"] for x in columns] == [False, False, False, False, True, True]
+    once = csvw.to_rdf(fmt="nt")
+    csvw.close()
+
+    csvw = CSVW(csv_path='tests/virtual1.csv', metadata_path=metadata_path,
+                per_row_invariants=True)
+    per_row = csvw.to_rdf(fmt="nt")
+    csvw.close()
+
+    # Written with the first row only, unless per_row_invariants
+    assert len(once.splitlines()) == 10
+    assert len(per_row.splitlines()) == 12
+    for rdf_output in [once, per_row]:
+        g = ConjunctiveGraph()
+        g.parse(data=rdf_output, format="nt")
+        assert len(g) == 10
+        for triple in expected:
+            assert triple in g
+        assert (ns['sub-2'], ns['obj-2'], ns['pred-2']) in g
@@ -0,0 +1,168 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import pytest
+from rdflib import ConjunctiveGraph
+
+from pycsvw import CSVW
+from pycsvw.sinks import CallbackSink, Sink
+
+asyncio = pytest.importorskip("asyncio")
+aio = pytest.importorskip("pycsvw.aio")
+
+
+@pytest.fixture
+def loop():
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    yield event_loop
+    asyncio.set_event_loop(None)
+    event_loop.close()
+
+
+def test_ato_rdf_nt(loop):
+    with CSVW(csv_path="tests/simple.csv", metadata_path="tests/simple.csv-metadata.json") as csvw:
+        rdf_output = loop.run_until_complete(csvw.ato_rdf("nt"))
+        assert rdf_output == csvw.to_rdf("nt")
+
+
+@pytest.mark.parametrize("riot_jobs", [1, 2])
+def test_ato_rdf_files(loop, riot_jobs):
+    csvw = CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                riot_jobs=riot_jobs)
+    ttl_out = io.BytesIO()
+    nt_out = io.BytesIO()
+    loop.run_until_complete(csvw.ato_rdf_files([(ttl_out, "turtle"), (nt_out, "nt")]))
+    csvw.close()
+
+    ttl_graph = ConjunctiveGraph()
+    ttl_graph.parse(data=ttl_out.getvalue().decode("utf-8"), format="turtle")
+    nt_graph = ConjunctiveGraph()
+    nt_graph.parse(data=nt_out.getvalue().decode("utf-8"), format="nt")
+    assert len(ttl_graph) == len(nt_graph) == 16
+
+
+def test_concurrent_conversions(loop):
+    books = loop.run_until_complete(aio.open_csvw(csv_path="tests/books.csv",
+                                                  metadata_path="tests/books.csv-metadata.json"))
+    simple = loop.run_until_complete(aio.open_csvw(csv_path="tests/simple.csv",
+                                                   metadata_path="tests/simple.csv-metadata.json"))
+    # Both conversions run concurrently on the same loop
+    books_output, simple_output = loop.run_until_complete(
+        asyncio.gather(books.ato_rdf("turtle"), simple.ato_rdf("turtle")))
+    books.close()
+    simple.close()
+
+    books_graph = ConjunctiveGraph()
+    books_graph.parse(data=books_output, format="turtle")
+    simple_graph = ConjunctiveGraph()
+    simple_graph.parse(data=simple_output, format="turtle")
+    assert len(books_graph) == 16
+    assert len(simple_graph) == 6
+
+
+@pytest.mark.parametrize("fmt,backend", [("nt", "riot"), ("turtle", "riot"), ("rdf", "native")])
+def test_serialized_in_batches(loop, monkeypatch, fmt, backend):
+    batches = []
+    run_steps = aio._run_steps
+
+    def counting_run_steps(steps, num_steps):
+        batches.append(num_steps)
+        return run_steps(steps, num_steps)
+
+    monkeypatch.setattr(aio, "ASYNC_BATCH_ROWS", 1)
+    monkeypatch.setattr(aio, "_run_steps", counting_run_steps)
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              backend=backend) as csvw:
+        rdf_output = loop.run_until_complete(csvw.ato_rdf(fmt))
+    # One step per row and a last one finding no more rows
+    assert batches == [1] * 5
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              backend=backend) as csvw:
+        assert rdf_output == csvw.to_rdf(fmt)
+
+
+@pytest.mark.parametrize("riot_jobs", [1, 2])
+def test_ato_rdf_spooled(loop, riot_jobs):
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              riot_jobs=riot_jobs, spool_max_size=1 << 20) as csvw:
+        nt_output = loop.run_until_complete(csvw.ato_rdf("nt"))
+        ttl_output = loop.run_until_complete(csvw.ato_rdf("turtle"))
+    nt_graph = ConjunctiveGraph()
+    nt_graph.parse(data=nt_output, format="nt")
+    ttl_graph = ConjunctiveGraph()
+    ttl_graph.parse(data=ttl_output, format="turtle")
+    assert len(nt_graph) == len(ttl_graph) == 16
+
+
+def test_ato_rdf_native(loop):
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              backend="native") as csvw:
+        xml_output = loop.run_until_complete(csvw.ato_rdf("rdf"))
+        assert csvw.chosen_backend == "native"
+    xml_graph = ConjunctiveGraph()
+    xml_graph.parse(data=xml_output, format="xml")
+    assert len(xml_graph) == 16
+
+
+def test_ato_rdf_files_sinks(loop):
+    class AsyncSink(Sink):
+        def __init__(self):
+            self.batches = []
+            self.flushed = False
+
+        async def awrite_batch(self, data):
+            await asyncio.sleep(0)
+            self.batches.append(data)
+
+        async def aflush(self):
+            self.flushed = True
+
+    async_sink, batches = AsyncSink(), []
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              backend="native") as csvw:
+        loop.run_until_complete(csvw.ato_rdf_files([(async_sink, "nt"),
+                                                    (CallbackSink(batches.append), "n-quads")]))
+        assert b"".join(async_sink.batches).decode("utf-8") == csvw.to_rdf("nt")
+        assert b"".join(batches).decode("utf-8") == csvw.to_rdf("n-quads")
+    assert async_sink.flushed
+
+
+def test_ato_rdf_files_failing_sink(loop):
+    class FailingSink(CallbackSink):
+        closed = False
+
+        async def aclose(self):
+            self.closed = True
+
+    def fail(data):
+        raise IOError("queue is down")
+
+    sink = FailingSink(fail)
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              backend="native") as csvw:
+        with pytest.raises(IOError):
+            loop.run_until_complete(csvw.ato_rdf_files([(sink, "json-ld")], close_sinks=True))
+    assert sink.closed
+
+
+def test_ato_rdf_files_progress(loop, tmpdir):
+    reports = []
+    metrics_path = str(tmpdir.join("pycsvw.prom"))
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              progress=reports.append, metrics_path=metrics_path) as csvw:
+        out = io.BytesIO()
+        loop.run_until_complete(csvw.ato_rdf_files([(out, "nt")]))
+    assert [x["phase"] for x in reports if x["phase"] != "serialize"] == ["convert", "done"]
+    with io.open(metrics_path, encoding="utf-8") as metrics_file:
+        assert u'format="nt"}} {}'.format(len(out.getvalue())) in metrics_file.read()
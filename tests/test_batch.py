@@ -0,0 +1,139 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from click.testing import CliRunner
+from mock import patch
+from rdflib import ConjunctiveGraph
+
+from pycsvw import CSVW
+import pycsvw.batch
+from pycsvw.batch import get_compiled_metadata, init_worker, read_jobs, run_batch
+from pycsvw.scripts.cli import main
+
+
+def write_manifest(out_dir):
+    jobs = [
+        {"id": "books", "csv_path": "tests/books.csv",
+         "metadata_path": "tests/books.csv-metadata.json",
+         "rdf_dest": [["nt", os.path.join(out_dir, "books.nt")]]},
+        {"csv_path": ["tests/multiple_tables.Name-ID.csv", "tests/multiple_tables.ID-Age.csv"],
+         "metadata_path": "tests/multiple_tables.csv-metadata.json",
+         "rdf_dest": [["nt", os.path.join(out_dir, "multiple.nt")]]},
+        {"id": "missing", "csv_path": "tests/no_such_file.csv",
+         "metadata_path": "tests/books.csv-metadata.json",
+         "rdf_dest": [["nt", os.path.join(out_dir, "missing.nt")]]}
+    ]
+    manifest_path = os.path.join(out_dir, "manifest.jsonl")
+    with io.open(manifest_path, "w") as manifest:
+        for job in jobs:
+            manifest.write(json.dumps(job) + u"\n\n")
+    return manifest_path
+
+
+def num_triples(path):
+    g = ConjunctiveGraph()
+    g.parse(path, format="nt")
+    return len(g)
+
+
+def test_batch_command():
+    out_dir = tempfile.mkdtemp(dir="/tmp")
+    manifest_path = write_manifest(out_dir)
+    report_path = os.path.join(out_dir, "report.jsonl")
+
+    result = CliRunner().invoke(main, ["batch", manifest_path, "--jobs", "2",
+                                       "--report", report_path])
+    # One of the jobs fails
+    assert result.exit_code == 1
+    assert "3 jobs, 1 failed" in result.output
+
+    with io.open(report_path) as report:
+        results = {x["id"]: x for x in (json.loads(line) for line in report)}
+    # Id defaults to the line number of the job
+    assert set(results.keys()) == {"books", 3, "missing"}
+    assert results["books"]["status"] == "ok"
+    assert results[3]["status"] == "ok"
+    assert results["missing"]["status"] == "error"
+    assert "no_such_file.csv" in results["missing"]["error"]
+    assert all(x["seconds"] >= 0 for x in results.values())
+
+    assert num_triples(os.path.join(out_dir, "books.nt")) == 16
+    assert num_triples(os.path.join(out_dir, "multiple.nt")) == 6
+
+
+def test_metadata_compiled_once():
+    out_dir = tempfile.mkdtemp(dir="/tmp")
+    with io.open(write_manifest(out_dir)) as manifest:
+        jobs = read_jobs(manifest)
+
+    with patch.object(CSVW, "compile_metadata", wraps=CSVW.compile_metadata) as compile_mocked:
+        results = list(run_batch(jobs))
+    assert [x["status"] for x in results] == ["ok", "ok", "error"]
+    # books metadata is shared by two jobs
+    assert compile_mocked.call_count == 2
+    # All jobs are run in this process
+    assert set(x["worker"] for x in results) == {os.getpid()}
+
+
+def test_metadata_cache(tmpdir, monkeypatch):
+    monkeypatch.setattr(pycsvw.batch, "METADATA_CACHE_SIZE", 2)
+    init_worker({})
+    paths = []
+    for ind in range(3):
+        paths.append(str(tmpdir.join("books{}.csv-metadata.json".format(ind))))
+        shutil.copy("tests/books.csv-metadata.json", paths[-1])
+    with patch.object(CSVW, "compile_metadata", wraps=CSVW.compile_metadata) as compile_mocked:
+        for path in [paths[0], paths[1], paths[0], paths[2], paths[0]]:
+            get_compiled_metadata(path)
+        # The least recently used paths[1] was dropped to make room for paths[2]
+        assert compile_mocked.call_count == 3
+        get_compiled_metadata(paths[1])
+        assert compile_mocked.call_count == 4
+        # A file rewritten with other contents is compiled again, even within the same mtime
+        mtime = os.path.getmtime(paths[0])
+        with io.open(paths[0], 'ab') as metadata_file:
+            metadata_file.write(b"\n")
+        os.utime(paths[0], (mtime, mtime))
+        get_compiled_metadata(paths[0])
+        assert compile_mocked.call_count == 5
+    assert len(pycsvw.batch._METADATA_CACHE) == 2
+
+
+def test_batch_command_options():
+    out_dir = tempfile.mkdtemp(dir="/tmp")
+    manifest_path = write_manifest(out_dir)
+    report_path = os.path.join(out_dir, "report.jsonl")
+
+    result = CliRunner().invoke(main, ["--row-end", "2", "--on-error", "skip", "batch",
+                                       manifest_path, "--report", report_path])
+    assert result.exit_code == 1
+    with io.open(report_path) as report:
+        results = {x["id"]: x for x in (json.loads(line) for line in report)}
+    assert results["books"]["row_errors"] == {"policy": "skip", "errors": 0, "error_types": {}}
+    # Only the first two rows of each job are converted
+    assert num_triples(os.path.join(out_dir, "books.nt")) == 8
+
+
+def test_batch_command_per_job_options():
+    out_dir = tempfile.mkdtemp(dir="/tmp")
+    manifest_path = write_manifest(out_dir)
+    result = CliRunner().invoke(main, ["--checkpoint", os.path.join(out_dir, "checkpoint"),
+                                       "--rdf-dest", "nt", os.path.join(out_dir, "out.nt"),
+                                       "batch", manifest_path])
+    assert result.exit_code == 2
+    assert "--rdf-dest, --checkpoint cannot be used with 'batch'" in result.output
+    assert not os.path.exists(os.path.join(out_dir, "books.nt"))
@@ -0,0 +1,83 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+from click.testing import CliRunner
+import pytest
+
+from pycsvw import CSVW
+from pycsvw.scripts.cli import main
+from pycsvw.binary_triples import BinaryTriplesReader, BinaryTriplesWriter
+from pycsvw.triple_handlers import BNODE, LITERAL, URI, Term
+
+
+def test_round_trip(tmpdir):
+    path = str(tmpdir.join("books.bin"))
+    csvw = CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                blank_nodes="stable")
+    with io.open(path, "wb") as out:
+        csvw.to_rdf_files([(out, "binary")])
+    assert csvw.chosen_backend == "native"
+    expected = [x for batch in csvw.iter_triples() for x in batch]
+    with BinaryTriplesReader(path) as reader:
+        assert list(reader.iter_triples()) == expected
+
+
+def test_blocks_and_resets(tmpdir):
+    path = str(tmpdir.join("terms.bin"))
+    triples = [(Term(BNODE, "b{}".format(x), None, None),
+                Term(URI, "http://example.org/p{}".format(x % 3), None, None),
+                Term(LITERAL, u"é{}".format(x), "http://www.w3.org/2001/XMLSchema#string"
+                     if x % 2 else None, None if x % 2 else "fr")) for x in range(25)]
+    with io.open(path, "wb") as out:
+        writer = BinaryTriplesWriter(out, block_triples=4, max_terms=10)
+        writer.start()
+        for ind in range(0, len(triples), 2):
+            writer.write_triples(triples[ind:ind + 2])
+        writer.finish()
+    with BinaryTriplesReader(path) as reader:
+        blocks = list(reader.iter_blocks())
+        assert [len(x) for x in blocks] == [12, 12, 12, 12, 12, 12, 3]
+        assert len(reader.terms) <= 10 + 3 * 4
+    with BinaryTriplesReader(path) as reader:
+        assert list(reader.iter_triples()) == triples
+
+
+def test_invalid_file(tmpdir):
+    path = tmpdir.join("out.nt")
+    path.write("<http://example.org/s> <http://example.org/p> <http://example.org/o> .\n")
+    with pytest.raises(ValueError):
+        BinaryTriplesReader(str(path))
+    empty = tmpdir.join("empty.bin")
+    empty.write("")
+    with pytest.raises(ValueError):
+        BinaryTriplesReader(str(empty))
+
+
+def test_binary_not_sorted_or_text():
+    csvw = CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json")
+    with pytest.raises(ValueError):
+        csvw.to_rdf("binary")
+    csvw = CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+                sort_by="spo")
+    with pytest.raises(ValueError):
+        csvw.to_rdf_files([(io.BytesIO(), "binary")])
+
+
+def test_command_line(tmpdir):
+    path = str(tmpdir.join("books.bin"))
+    result = CliRunner().invoke(main, ["--csv-path", "tests/books.csv",
+                                       "--metadata-path", "tests/books.csv-metadata.json",
+                                       "--rdf-dest", "binary", path])
+    assert result.exit_code == 0
+    with BinaryTriplesReader(path) as reader:
+        assert len(list(reader.iter_triples())) > 0
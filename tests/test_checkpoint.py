@@ -0,0 +1,133 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+
+import pytest
+
+from pycsvw import CSVW
+from pycsvw.csvw_exceptions import NumberOfNonVirtualColumnsMismatch
+from pycsvw.checkpoint import CHECKPOINT_OUTPUT_SUFFIX, Checkpointer
+import pycsvw.nt_serializer
+
+METADATA_PATH = "tests/books.csv-metadata.json"
+
+
+def expected_nt():
+    with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH) as csvw:
+        return csvw.to_rdf("nt")
+
+
+def test_checkpoints_kept(tmpdir):
+    checkpoint_path = str(tmpdir.join("books.checkpoint"))
+    with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH,
+              checkpoint_path=checkpoint_path, checkpoint_rows=1) as csvw:
+        assert csvw.to_rdf("nt") == expected_nt()
+    with io.open(checkpoint_path, 'r') as checkpoint_file:
+        state = json.load(checkpoint_file)
+    assert state["complete"]
+    assert state["tables"] == ["http://example.org/books.csv"]
+    assert state["output_bytes"] == os.path.getsize(checkpoint_path + CHECKPOINT_OUTPUT_SUFFIX)
+
+
+def crash_at_row(monkeypatch, crash_row):
+    add_row = Checkpointer.add_row
+
+    def crashing_add_row(self, output_obj, table_ind, row_num):
+        if int(row_num) == crash_row:
+            raise KeyboardInterrupt()
+        add_row(self, output_obj, table_ind, row_num)
+    monkeypatch.setattr(Checkpointer, "add_row", crashing_add_row)
+
+
+def test_resume_after_failure(tmpdir, monkeypatch):
+    checkpoint_path = str(tmpdir.join("books.checkpoint"))
+    crash_at_row(monkeypatch, 3)
+    with pytest.raises(KeyboardInterrupt):
+        with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH,
+                  checkpoint_path=checkpoint_path, checkpoint_rows=1) as csvw:
+            csvw.to_rdf("nt")
+    monkeypatch.undo()
+    with io.open(checkpoint_path, 'r') as checkpoint_file:
+        state = json.load(checkpoint_file)
+    assert state["row"] == 2
+    assert not state["complete"]
+    # Triples written after the last checkpoint are dropped when resuming
+    with io.open(checkpoint_path + CHECKPOINT_OUTPUT_SUFFIX, 'ab') as nt_file:
+        nt_file.write(b"<http://example.org/partial> <http://example.org/p> ")
+
+    with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH,
+              checkpoint_path=checkpoint_path, checkpoint_rows=1, resume=True) as csvw:
+        assert csvw.to_rdf("nt") == expected_nt()
+
+
+def test_resume_changed_csv(tmpdir, write_books):
+    checkpoint_path = str(tmpdir.join("books.checkpoint"))
+    csv_path = write_books(bad_row=3)
+    with pytest.raises(NumberOfNonVirtualColumnsMismatch):
+        with CSVW(csv_path=csv_path, metadata_path=METADATA_PATH,
+                  checkpoint_path=checkpoint_path, checkpoint_rows=1) as csvw:
+            csvw.to_rdf("nt")
+
+    write_books()
+    with pytest.raises(ValueError):
+        with CSVW(csv_path=csv_path, metadata_path=METADATA_PATH,
+                  checkpoint_path=checkpoint_path, checkpoint_rows=1, resume=True) as csvw:
+            csvw.to_rdf("nt")
+
+
+def test_resume_rejects(tmpdir, monkeypatch, write_books):
+    csv_path = write_books(bad_row=2)
+    checkpoint_path = str(tmpdir.join("books.checkpoint"))
+    reject_path = str(tmpdir.join("rejects.jsonl"))
+    options = dict(csv_path=csv_path, metadata_path=METADATA_PATH, on_error="quarantine",
+                   reject_path=reject_path, checkpoint_path=checkpoint_path, checkpoint_rows=1)
+    crash_at_row(monkeypatch, 3)
+    with pytest.raises(KeyboardInterrupt):
+        with CSVW(**options) as csvw:
+            csvw.to_rdf("nt")
+    monkeypatch.undo()
+    with io.open(reject_path, 'r', encoding="utf-8") as reject_file:
+        assert [json.loads(x)["row"] for x in reject_file] == [2]
+
+    # The row quarantined after the last checkpoint is quarantined again when resuming
+    with CSVW(resume=True, **options) as csvw:
+        csvw.to_rdf("nt")
+    with io.open(reject_path, 'r', encoding="utf-8") as reject_file:
+        assert [json.loads(x)["row"] for x in reject_file] == [2]
+
+
+def test_resume_complete(tmpdir, monkeypatch):
+    checkpoint_path = str(tmpdir.join("books.checkpoint"))
+    with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH,
+              checkpoint_path=checkpoint_path) as csvw:
+        csvw.to_rdf("nt")
+    expected = expected_nt()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Serialized again")
+    monkeypatch.setattr(pycsvw.nt_serializer, "serialize", fail)
+    with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH,
+              checkpoint_path=checkpoint_path, resume=True) as csvw:
+        assert csvw.to_rdf("nt") == expected
+
+
+def test_resume_other_tables(tmpdir):
+    checkpoint_path = str(tmpdir.join("books.checkpoint"))
+    with CSVW(csv_path="tests/books.csv", metadata_path=METADATA_PATH,
+              checkpoint_path=checkpoint_path) as csvw:
+        csvw.to_rdf("nt")
+    with pytest.raises(ValueError):
+        with CSVW(csv_path="tests/simple.csv", metadata_path="tests/simple.csv-metadata.json",
+                  checkpoint_path=checkpoint_path, resume=True) as csvw:
+            csvw.to_rdf("nt")
@@ -9,6 +9,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 from builtins import str as text
 
 from click.testing import CliRunner
@@ -25,8 +26,9 @@ def test_main_using_paths():
 
     runner = CliRunner()
 
-    with patch.object(CSVW, "to_rdf") as rdf_mocked, patch.object(CSVW, "to_json") as json_mocked:
-        rdf_mocked.return_value = "some ttl contents"
+    with patch.object(CSVW, "to_rdf_files") as rdf_mocked, \
+            patch.object(CSVW, "to_json") as json_mocked:
+        rdf_mocked.return_value = None
         json_mocked.return_value = "some json"
         result = runner.invoke(main, ["--csv-path", csv_path,
                                       "--metadata-path", metadata_path,
@@ -47,19 +49,19 @@ def test_main_using_urls(mock_urlopen):
     csv_url = "http://example.org/simple.csv"
     csv_path = "tests/simple.csv"
 
-    with open(csv_path, 'r') as csv_file:
-        csv_contents = text(csv_file.read())
     with open(metadata_path, 'r') as metadata_file:
         metadata_contents = text(metadata_file.read())
 
     reader = Mock()
-    reader.read.side_effect = [csv_contents, metadata_contents]
+    # The csv file is only fetched when it is serialized, which to_rdf_files mocked below skips
+    reader.read.side_effect = [metadata_contents]
     mock_urlopen.return_value = reader
 
     runner = CliRunner()
 
-    with patch.object(CSVW, "to_rdf") as rdf_mocked, patch.object(CSVW, "to_json") as json_mocked:
-        rdf_mocked.return_value = "some ttl contents"
+    with patch.object(CSVW, "to_rdf_files") as rdf_mocked, \
+            patch.object(CSVW, "to_json") as json_mocked:
+        rdf_mocked.return_value = None
         json_mocked.return_value = "some json"
         result = runner.invoke(main, ["--csv-url", csv_url,
                                       "--metadata-path", metadata_path,
@@ -82,3 +84,22 @@ def test_non_ascii_characters():
                                   "--metadata-path", metadata_path,
                                   "--rdf-dest", "turtle", "/dev/null"])
     assert result.exit_code == 0
+
+
+def test_rdf_dest_streamed(tmpdir):
+    csv_path = "tests/books.csv"
+    metadata_path = "tests/books.csv-metadata.json"
+    dests = [(fmt, str(tmpdir.join("books." + fmt))) for fmt in ["json-ld", "n-quads", "nt"]]
+    args = ["--csv-path", csv_path, "--metadata-path", metadata_path, "--backend", "native"]
+    for fmt, dest in dests:
+        args.extend(["--rdf-dest", fmt, dest])
+
+    # Outputs are written into their files without being held in memory as strings
+    with patch.object(CSVW, "to_rdf") as rdf_mocked:
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0
+        assert rdf_mocked.call_count == 0
+    with CSVW(csv_path=csv_path, metadata_path=metadata_path, backend="native") as csvw:
+        for fmt, dest in dests:
+            with io.open(dest, encoding="utf-8") as rdf_file:
+                assert rdf_file.read() == csvw.to_rdf(fmt)
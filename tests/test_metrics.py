@@ -0,0 +1,75 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import re
+import shutil
+
+from pycsvw import CSVW
+
+SAMPLE = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+
+
+def read_metrics(metrics_path):
+    """ Read the samples of a metrics textfile into a dictionary from name and labels to value,
+    checking that each sample belongs to the metric of the last TYPE line."""
+    with io.open(metrics_path, 'r', encoding="utf-8") as metrics_file:
+        lines = metrics_file.read().splitlines()
+    assert lines[-1] == "# EOF"
+    samples = {}
+    metric_name = None
+    for line in lines:
+        if line.startswith("# TYPE "):
+            metric_name = line.split()[2]
+        elif not line.startswith("#"):
+            name, labels, value = SAMPLE.match(line).groups()
+            assert name == metric_name
+            samples[(name, labels)] = float(value)
+    return samples
+
+
+def test_metrics(tmpdir):
+    metrics_path = str(tmpdir.join("pycsvw.prom"))
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              metrics_path=metrics_path) as csvw:
+        nt = csvw.to_rdf("nt")
+    samples = read_metrics(metrics_path)
+    table = 'table="http://example.org/books.csv"'
+    assert samples[("pycsvw_table_rows", table)] == 4
+    assert samples[("pycsvw_table_triples", table)] == len(nt.splitlines())
+    assert samples[("pycsvw_table_bytes_read", table)] == os.path.getsize("tests/books.csv")
+    assert samples[("pycsvw_output_bytes", 'format="nt"')] == len(nt.encode("utf-8"))
+    for phase in ["metadata", "serialize", "convert"]:
+        assert samples[("pycsvw_phase_duration_seconds", 'phase="{}"'.format(phase))] >= 0
+    assert not os.path.exists(metrics_path + ".tmp")
+
+
+def test_riot_metrics(tmpdir):
+    metrics_path = str(tmpdir.join("pycsvw.prom"))
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              metrics_path=metrics_path) as csvw:
+        csvw.to_rdf("turtle")
+    samples = read_metrics(metrics_path)
+    assert samples[("pycsvw_riot_runs", 'exit_code="0"')] == 1
+    assert samples[("pycsvw_riot_warnings", None)] == 0
+
+
+def test_row_index_cache_metrics(tmpdir):
+    metrics_path = str(tmpdir.join("pycsvw.prom"))
+    csv_path = str(tmpdir.join("books.csv"))
+    shutil.copy("tests/books.csv", csv_path)
+    for expected_ratio in [0.0, 1.0]:
+        with CSVW(csv_path=csv_path, metadata_path="tests/books.csv-metadata.json",
+                  metrics_path=metrics_path, row_index=True, row_start=3) as csvw:
+            csvw.to_rdf("nt")
+        samples = read_metrics(metrics_path)
+        assert samples[("pycsvw_cache_hit_ratio", 'cache="row_index"')] == expected_ratio
@@ -0,0 +1,81 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+
+import pytest
+
+from pycsvw import CSVW
+from pycsvw.nt_sort import sort_nt, get_subject
+
+
+LINES = [b'<http://example.org/b> <http://example.org/p> "2" .\n',
+         b'<http://example.org/a> <http://example.org/q> "1" .\n',
+         b'<http://example.org/b> <http://example.org/o> "3" .\n',
+         b'<http://example.org/a> <http://example.org/q> "1" .\n',
+         b'<http://example.org/ab> <http://example.org/p> "4" .\n',
+         b'<http://example.org/a> <http://example.org/p> "5" .\n'] * 20
+
+
+def run_sort(tmpdir, **kwargs):
+    out = io.BytesIO()
+    sort_nt(io.BytesIO(b"".join(LINES)), out, temp_dir=str(tmpdir), **kwargs)
+    # Run files are removed
+    assert os.listdir(str(tmpdir)) == []
+    return out.getvalue().splitlines(True)
+
+
+@pytest.mark.parametrize("max_memory,jobs", [(1 << 20, 1), (512, 1), (512, 3)])
+def test_sort_by_subject(tmpdir, max_memory, jobs):
+    lines = run_sort(tmpdir, by="subject", max_memory=max_memory, jobs=jobs)
+    assert sorted(lines) == sorted(LINES)
+    subjects = [get_subject(x) for x in lines]
+    assert subjects == sorted(subjects)
+    # Order within each subject is kept
+    assert [x for x in lines if get_subject(x) == b"<http://example.org/b>"] == \
+        [x for x in LINES if get_subject(x) == b"<http://example.org/b>"]
+
+
+@pytest.mark.parametrize("max_memory,jobs", [(1 << 20, 1), (512, 1), (512, 3)])
+def test_sort_spo_unique(tmpdir, max_memory, jobs):
+    assert run_sort(tmpdir, by="spo", max_memory=max_memory, jobs=jobs) == sorted(LINES)
+    assert run_sort(tmpdir, by="spo", unique=True, max_memory=max_memory, jobs=jobs) == \
+        sorted(set(LINES))
+    assert run_sort(tmpdir, by="subject", unique=True, max_memory=max_memory, jobs=jobs) == \
+        sorted(set(LINES))
+
+
+def test_invalid_sort_key(tmpdir):
+    with pytest.raises(ValueError):
+        run_sort(tmpdir, by="object")
+    with pytest.raises(ValueError):
+        CSVW(csv_path="tests/virtual1.csv", metadata_path="tests/virtual1.csv-metadata.json",
+             sort_by="object")
+
+
+@pytest.mark.parametrize("spool_max_size", [None, 1 << 20])
+def test_sorted_unique_output(spool_max_size):
+    with CSVW(csv_path="tests/virtual1.csv",
+              metadata_path="tests/virtual1.invariant.csv-metadata.json",
+              per_row_invariants=True, blank_nodes="stable") as csvw:
+        unsorted = csvw.to_rdf("nt").splitlines(True)
+
+    with CSVW(csv_path="tests/virtual1.csv",
+              metadata_path="tests/virtual1.invariant.csv-metadata.json",
+              per_row_invariants=True, blank_nodes="stable", sort_by="subject", unique=True,
+              sort_memory=256, spool_max_size=spool_max_size) as csvw:
+        lines = csvw.to_rdf("nt").splitlines(True)
+        assert len(csvw._nt_row_offsets) == 0
+
+    # Row-invariant triples are repeated by each row
+    assert len(unsorted) == len(lines) + 2
+    assert lines == sorted(set(unsorted))
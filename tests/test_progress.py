@@ -0,0 +1,65 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from pycsvw import CSVW
+from pycsvw.progress import format_progress
+
+MULTIPLE_TABLES = ("tests/multiple_tables.Name-ID.csv", "tests/multiple_tables.ID-Age.csv")
+
+
+def test_progress_reports():
+    reports = []
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              progress=reports.append, progress_interval=0) as csvw:
+        nt = csvw.to_rdf("nt")
+    phases = [x["phase"] for x in reports]
+    assert phases[0] == "serialize"
+    assert phases[-2:] == ["convert", "done"]
+    last = reports[-1]
+    assert last["rows"] == 4
+    assert last["triples"] == len(nt.splitlines())
+    assert last["bytes_read"] == last["bytes_total"] == os.path.getsize("tests/books.csv")
+    assert last["table"] == "http://example.org/books.csv"
+    assert set(last["durations"]) == {"serialize", "convert"}
+    assert all(x["elapsed"] >= 0 for x in reports)
+
+
+def test_progress_throttled():
+    reports = []
+    with CSVW(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json",
+              progress=reports.append, progress_interval=3600) as csvw:
+        csvw.to_rdf("nt")
+    # Only phase changes are reported
+    assert [x["phase"] for x in reports] == ["serialize", "convert", "done"]
+
+
+def test_progress_in_parallel():
+    reports = []
+    with CSVW(csv_path=MULTIPLE_TABLES, metadata_path="tests/multiple_tables.csv-metadata.json",
+              progress=reports.append, progress_interval=0) as sequential:
+        sequential.to_rdf("nt")
+    parallel_reports = []
+    with CSVW(csv_path=MULTIPLE_TABLES, metadata_path="tests/multiple_tables.csv-metadata.json",
+              progress=parallel_reports.append, progress_interval=0, table_jobs=2) as parallel:
+        parallel.to_rdf("nt")
+    for key in ["rows", "triples", "bytes_read", "bytes_total"]:
+        assert parallel_reports[-1][key] == reports[-1][key]
+    assert reports[-1]["rows"] > 0
+
+
+def test_format_progress():
+    line = format_progress({"phase": "serialize", "table": "t.csv", "rows": 1200, "triples": 9600,
+                            "bytes_read": 2000000, "bytes_total": 8000000, "elapsed": 2.0,
+                            "rows_per_second": 600.0, "eta": 6.0, "durations": {}})
+    assert line == ("serialize: 1200 rows, 9600 triples, 2.0 of 8.0 MB read, 600 rows/s, "
+                    "ETA 6s, 2.0s elapsed")
@@ -0,0 +1,172 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import shutil
+
+import pytest
+from rdflib import ConjunctiveGraph, URIRef
+from rdflib.namespace import Namespace
+
+from pycsvw import CSVW
+from pycsvw.csvw_exceptions import NumberOfNonVirtualColumnsMismatch, TooManyRowErrors
+
+ISBN = Namespace("http://www.books.org/isbn/")
+EVENT = Namespace("https://www.example.org/event/")
+BOOKS_METADATA = "tests/books.csv-metadata.json"
+DATES_METADATA = "tests/datatypes.date.csv-metadata.json"
+DATES_ROW = u"{},20170109,20170110Z,2017-01-11,2002-09-24-06:00,2002-09-24+04:00\n"
+
+
+def write_dates(tmpdir):
+    csv_path = str(tmpdir.join("dates.csv"))
+    with io.open(csv_path, 'w', encoding="utf-8") as csv_file:
+        csv_file.write(u"id,date1,date2,date3,date4,date5\n")
+        csv_file.write(DATES_ROW.format(1))
+        csv_file.write(DATES_ROW.format(2).replace(u"20170109", u"notadate"))
+        csv_file.write(DATES_ROW.format(3))
+    return csv_path
+
+
+def write_invariants(tmpdir):
+    with io.open("tests/virtual1.invariant.csv-metadata.json", 'r', encoding="utf-8") as md_file:
+        metadata = json.load(md_file)
+    metadata["tableSchema"]["columns"][1]["datatype"] = "date"
+    metadata_path = str(tmpdir.join("invariants.csv-metadata.json"))
+    with io.open(metadata_path, 'w', encoding="utf-8") as md_file:
+        md_file.write(json.dumps(metadata, ensure_ascii=False))
+    csv_path = str(tmpdir.join("invariants.csv"))
+    with io.open(csv_path, 'w', encoding="utf-8") as csv_file:
+        csv_file.write(u"expense,date,description\ntaxi,notadate,taxi\ndinner,2017-01-11,dinner\n")
+    return csv_path, metadata_path
+
+
+def to_graph(**kwargs):
+    with CSVW(**kwargs) as csvw:
+        g = ConjunctiveGraph()
+        g.parse(data=csvw.to_rdf("nt"), format="nt")
+        return g, csvw.row_errors
+
+
+def read_rejects(reject_path):
+    with io.open(reject_path, 'r', encoding="utf-8") as reject_file:
+        return [json.loads(x) for x in reject_file]
+
+
+def test_fail(tmpdir, write_books):
+    with pytest.raises(NumberOfNonVirtualColumnsMismatch):
+        to_graph(csv_path=write_books(bad_row=3), metadata_path=BOOKS_METADATA)
+    with pytest.raises(ValueError):
+        to_graph(csv_path=write_dates(tmpdir), metadata_path=DATES_METADATA)
+
+
+def test_skip(write_books):
+    g, row_errors = to_graph(csv_path=write_books(bad_row=3), metadata_path=BOOKS_METADATA,
+                             on_error="skip")
+    assert set(g.subjects()) == {ISBN["0062316095"], ISBN["0374532508"], ISBN["0374275637"]}
+    assert row_errors.summary() == {"policy": "skip", "errors": 1,
+                                    "error_types": {"NumberOfNonVirtualColumnsMismatch": 1}}
+
+
+def test_quarantine(tmpdir):
+    reject_path = str(tmpdir.join("rejects.jsonl"))
+    g, row_errors = to_graph(csv_path=write_dates(tmpdir), metadata_path=DATES_METADATA,
+                             on_error="quarantine", reject_path=reject_path)
+    # None of the triples of the failed row are written
+    assert set(g.subjects()) == {EVENT["1"], EVENT["3"]}
+    assert row_errors.num_errors == 1
+    rejects = read_rejects(reject_path)
+    assert len(rejects) == 1
+    assert rejects[0]["row"] == 2
+    assert rejects[0]["table"] == "https://www.example.org"
+    assert rejects[0]["cells"][:2] == ["2", "notadate"]
+    assert rejects[0]["message"]
+
+
+def test_quarantine_graph(tmpdir):
+    reject_path = str(tmpdir.join("rejects.jsonl"))
+    with CSVW(csv_path=write_dates(tmpdir), metadata_path=DATES_METADATA,
+              on_error="quarantine", reject_path=reject_path) as csvw:
+        g = csvw.to_graph()
+    assert set(g.subjects()) == {EVENT["1"], EVENT["3"]}
+    assert [x["row"] for x in read_rejects(reject_path)] == [2]
+
+
+def test_max_errors(write_books):
+    with pytest.raises(TooManyRowErrors):
+        to_graph(csv_path=write_books(bad_row=3), metadata_path=BOOKS_METADATA,
+                 on_error="skip", max_errors=0)
+    g, row_errors = to_graph(csv_path=write_books(bad_row=3), metadata_path=BOOKS_METADATA,
+                             on_error="skip", max_errors=1)
+    assert row_errors.num_errors == 1
+
+
+def test_max_errors_in_parallel(tmpdir):
+    csv_paths = [str(tmpdir.join("multiple_tables.Name-ID.csv")),
+                 str(tmpdir.join("multiple_tables.ID-Age.csv"))]
+    shutil.copy("tests/multiple_tables.Name-ID.csv", csv_paths[0])
+    with io.open(csv_paths[1], 'w', encoding="utf-8") as csv_file:
+        csv_file.write(u"ID,Age\n1,34\n2,54\n" + u"3,45,extra\n" * 100000)
+    with pytest.raises(TooManyRowErrors):
+        with CSVW(csv_path=csv_paths, metadata_path="tests/multiple_tables.csv-metadata.json",
+                  on_error="skip", max_errors=0, table_jobs=2, progress=lambda x: None) as csvw:
+            csvw.to_rdf("nt")
+    # The worker aborts at the first failed row instead of reading the whole table
+    table_counts = csvw._progress.tables["multiple_tables.ID-Age.csv"]
+    assert table_counts[2] < os.path.getsize(csv_paths[1])
+
+
+@pytest.mark.parametrize("table_jobs", [1, 2])
+def test_max_errors_quarantined(tmpdir, table_jobs):
+    csv_paths = [str(tmpdir.join("multiple_tables.Name-ID.csv")),
+                 str(tmpdir.join("multiple_tables.ID-Age.csv"))]
+    with io.open(csv_paths[0], 'w', encoding="utf-8") as csv_file:
+        csv_file.write(u"Name,ID\nBob,1,extra\nJoe,2,extra\nAnn,3\n")
+    with io.open(csv_paths[1], 'w', encoding="utf-8") as csv_file:
+        csv_file.write(u"ID,Age\n1,34,extra\n2,54\n")
+    reject_path = str(tmpdir.join("rejects.jsonl"))
+    with pytest.raises(TooManyRowErrors):
+        with CSVW(csv_path=csv_paths, metadata_path="tests/multiple_tables.csv-metadata.json",
+                  on_error="quarantine", reject_path=reject_path, max_errors=1,
+                  table_jobs=table_jobs) as csvw:
+            csvw.to_rdf("nt")
+    rejects = [(x["table"], x["row"]) for x in read_rejects(reject_path)]
+    # The rows failing the first table are quarantined in both modes, and the rows that
+    # workers in parallel failed in other tables as well
+    expected = [("multiple_tables.Name-ID.csv", 1), ("multiple_tables.Name-ID.csv", 2)]
+    if table_jobs > 1:
+        expected.append(("multiple_tables.ID-Age.csv", 1))
+    assert rejects == expected
+
+
+def test_quarantine_requires_reject_path():
+    with pytest.raises(ValueError):
+        CSVW(csv_path="tests/books.csv", metadata_path=BOOKS_METADATA, on_error="quarantine")
+
+
+@pytest.mark.parametrize("output", ["nt", "n-quads", "graph", "triples"])
+def test_invariants_after_skipped_first_row(tmpdir, output):
+    csv_path, metadata_path = write_invariants(tmpdir)
+    with CSVW(csv_path=csv_path, metadata_path=metadata_path, on_error="skip",
+              backend="native") as csvw:
+        if output == "graph":
+            subjects = [x[0] for x in csvw.to_graph()]
+        elif output == "triples":
+            subjects = [URIRef(x[0].value) for batch in csvw.iter_triples() for x in batch]
+        else:
+            g = ConjunctiveGraph()
+            g.parse(data=csvw.to_rdf(output), format="nquads")
+            subjects = [x[0] for x in g]
+        assert csvw.row_errors.num_errors == 1
+    # The triples of row-invariant columns are written with the first row that succeeds
+    assert subjects.count(URIRef("http://example.org/expenses")) == 2
@@ -0,0 +1,89 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import shutil
+
+from pycsvw import CSVW
+from pycsvw.generator_utils import read_csv
+from pycsvw.row_index import get_row_index, RowIndex, ROW_INDEX_SUFFIX
+
+
+def copy_csv(tmpdir, name):
+    path = str(tmpdir.join(name))
+    shutil.copy(os.path.join("tests", name), path)
+    return path
+
+
+def read_rows_at(csv_path, offset):
+    with io.open(csv_path, 'rb') as raw:
+        raw.seek(offset)
+        with io.TextIOWrapper(raw, encoding="utf-8") as handle:
+            return list(read_csv(handle))
+
+
+def test_quoted_newlines(tmpdir):
+    csv_path = copy_csv(tmpdir, "parsing.quoted_newlines.csv")
+    with io.open(csv_path, 'r', encoding="utf-8") as handle:
+        rows = list(read_csv(handle))[1:]
+
+    index = get_row_index(csv_path, stride=1)
+    assert index.num_rows == len(rows) == 3
+    for row_num in range(1, index.num_rows + 1):
+        indexed_row, offset = index.locate(row_num)
+        assert indexed_row == row_num
+        assert read_rows_at(csv_path, offset) == rows[row_num - 1:]
+    assert index.locate(4) is None
+
+
+def test_stride(tmpdir):
+    csv_path = copy_csv(tmpdir, "books.csv")
+    index = get_row_index(csv_path, stride=2)
+    assert index.num_rows == 4
+    assert len(index.offsets) == 2
+    assert index.locate(1)[0] == 1
+    assert index.locate(2)[0] == 1
+    assert index.locate(3)[0] == 3
+    assert index.locate(4)[0] == 3
+
+
+def test_sidecar_reused_and_rebuilt(tmpdir):
+    csv_path = copy_csv(tmpdir, "parsing.quoted_newlines.csv")
+    index_path = csv_path + ROW_INDEX_SUFFIX
+    index = get_row_index(csv_path, stride=1)
+    assert os.path.exists(index_path)
+    loaded = RowIndex.load(index_path, index.signature, 1)
+    assert loaded.offsets == index.offsets
+    assert loaded.num_rows == index.num_rows
+    # A different stride does not reuse the sidecar
+    assert RowIndex.load(index_path, index.signature, 2) is None
+
+    with io.open(csv_path, 'ab') as csv_file:
+        csv_file.write(b"\nbreakfast,\"eggs\nand toast\",20\n")
+    assert RowIndex.load(index_path, index.signature, 1) is not None
+    rebuilt = get_row_index(csv_path, stride=1)
+    assert rebuilt.num_rows == 4
+    assert rebuilt.signature != index.signature
+    assert RowIndex.load(index_path, rebuilt.signature, 1).num_rows == 4
+
+
+def test_row_start_through_row_index(tmpdir):
+    csv_path = copy_csv(tmpdir, "parsing.quoted_newlines.csv")
+    metadata_path = "tests/parsing.quoted_newlines.csv-metadata.json"
+    for row_start, row_end in [(2, None), (3, 3), (2, 2)]:
+        with CSVW(csv_path=csv_path, metadata_path=metadata_path, row_start=row_start,
+                  row_end=row_end) as csvw:
+            expected = csvw.to_rdf("nt")
+        with CSVW(csv_path=csv_path, metadata_path=metadata_path, row_start=row_start,
+                  row_end=row_end, row_index=True, row_index_stride=1) as csvw:
+            assert csvw.to_rdf("nt") == expected
+    assert os.path.exists(csv_path + ROW_INDEX_SUFFIX)
@@ -0,0 +1,93 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import re
+
+import pytest
+
+from pycsvw import CSVW
+from pycsvw.sharding import get_shard_of_subject
+
+
+def read_shards(directory, manifest):
+    shards = []
+    for shard in manifest["shards"]:
+        with io.open(os.path.join(directory, shard["path"]), 'rb') as shard_file:
+            shards.append(shard_file.read().splitlines(True))
+    return shards
+
+
+def blank_nodes(lines, ind):
+    """ Labels of the blank nodes in the subjects (ind 0) or the objects (ind 2) of lines."""
+    return {x.split(b" ")[ind] for x in lines if re.match(b"_:", x.split(b" ")[ind])}
+
+
+def verify_shards(directory, manifest, full):
+    shards = read_shards(directory, manifest)
+    assert sorted(sum(shards, [])) == sorted(full)
+    assert manifest["triples"] == len(full)
+    for shard, lines in zip(manifest["shards"], shards):
+        assert shard["triples"] == len(lines)
+        assert shard["bytes"] == len(b"".join(lines))
+        # Blank nodes of lists never span shards
+        assert blank_nodes(lines, 0) == blank_nodes(lines, 2)
+    with io.open(os.path.join(directory, "manifest.json")) as manifest_file:
+        assert json.loads(manifest_file.read()) == manifest
+    return shards
+
+
+def test_shards_by_subject_hash(tmpdir):
+    with CSVW(csv_path="tests/value_urls.csv", metadata_path="tests/value_urls.csv-metadata.json",
+              blank_nodes="stable") as csvw:
+        full = csvw.to_rdf("nt").encode("utf-8").splitlines(True)
+        manifest = csvw.to_rdf_shards(str(tmpdir), num_shards=3)
+
+    assert manifest["partition"] == "subject-hash"
+    assert len(manifest["shards"]) == 3
+    shards = verify_shards(str(tmpdir), manifest, full)
+    assert any(blank_nodes(x, 0) for x in shards)
+    for ind, lines in enumerate(shards):
+        for line in lines:
+            subject = line.split(b" ")[0]
+            if not subject.startswith(b"_:"):
+                assert get_shard_of_subject(subject, 3) == ind
+
+
+@pytest.mark.parametrize("kwargs", [{"max_triples": 5}, {"max_bytes": 1000}])
+def test_shards_by_size(tmpdir, kwargs):
+    with CSVW(csv_path="tests/value_urls.csv", metadata_path="tests/value_urls.csv-metadata.json",
+              blank_nodes="stable", spool_max_size=1 << 20) as csvw:
+        full = csvw.to_rdf("nt").encode("utf-8").splitlines(True)
+        manifest = csvw.to_rdf_shards(str(tmpdir), **kwargs)
+
+    assert manifest["partition"] == "rollover"
+    assert len(manifest["shards"]) > 1
+    shards = verify_shards(str(tmpdir), manifest, full)
+    # Shards are in the order of the NT-serialization
+    assert sum(shards, []) == full
+
+
+def test_invalid_shards(tmpdir):
+    with CSVW(csv_path="tests/value_urls.csv", metadata_path="tests/value_urls.csv-metadata.json",
+              sort_by="subject") as csvw:
+        with pytest.raises(ValueError) as exc:
+            csvw.to_rdf_shards(str(tmpdir), num_shards=2)
+        assert "blank_nodes='skolem'" in str(exc.value)
+
+    with CSVW(csv_path="tests/value_urls.csv",
+              metadata_path="tests/value_urls.csv-metadata.json") as csvw:
+        with pytest.raises(ValueError):
+            csvw.to_rdf_shards(str(tmpdir), num_shards=2, max_triples=10)
+        with pytest.raises(ValueError):
+            csvw.to_rdf_shards(str(tmpdir))
@@ -0,0 +1,144 @@
+# Copyright 2017 Bloomberg Finance L.P.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+from threading import Event, Thread
+import time
+
+import pytest
+
+from pycsvw import CSVW
+from pycsvw.sinks import CallbackSink, FanOutSink, FileSink, PipeSink, QueuedSink, Sink, \
+    open_sink_file
+
+
+BOOKS = dict(csv_path="tests/books.csv", metadata_path="tests/books.csv-metadata.json")
+
+
+class BlockingSink(Sink):
+    def __init__(self):
+        self.batches = []
+        self.release = Event()
+
+    def write_batch(self, data):
+        self.release.wait()
+        self.batches.append(data)
+
+
+def test_sinks_one_pass():
+    csvw = CSVW(backend="native", **BOOKS)
+    batches, file_obj = [], io.BytesIO()
+    csvw.to_rdf_files([(FanOutSink([CallbackSink(batches.append), FileSink(file_obj)]), "trig"),
+                       (CallbackSink(batches.append), "nt")])
+    expected = csvw.to_rdf("trig")
+    assert file_obj.getvalue().decode("utf-8") == expected
+    assert b"".join(batches).decode("utf-8") == expected + csvw.to_rdf("nt")
+
+
+def test_file_sink_path(tmpdir):
+    path = str(tmpdir.join("books.nt"))
+    sink = FileSink(path)
+    csvw = CSVW(**BOOKS)
+    csvw.to_rdf_files([(sink, "nt")])
+    sink.close()
+    with io.open(path, encoding="utf-8") as nt_file:
+        assert nt_file.read() == csvw.to_rdf("nt")
+
+
+def test_batch_size():
+    batches = []
+    sink_file = open_sink_file(CallbackSink(batches.append), batch_size=10)
+    for _ in range(7):
+        sink_file.write(b"abcd")
+    sink_file.flush()
+    assert batches == [b"abcd" * 3, b"abcd" * 3, b"abcd"]
+    assert sink_file.tell() == 28
+
+
+def test_queued_sink_backpressure():
+    sink = BlockingSink()
+    queued = QueuedSink(sink, max_batches=2)
+    writer = Thread(target=lambda: [queued.write_batch(b"x") for _ in range(5)])
+    writer.start()
+    time.sleep(0.2)
+    # One batch is being written and two are queued
+    assert writer.is_alive()
+    sink.release.set()
+    writer.join()
+    queued.flush()
+    assert sink.batches == [b"x"] * 5
+
+
+def test_failing_sink():
+    def fail(data):
+        raise IOError("queue is down")
+
+    with pytest.raises(IOError):
+        CSVW(backend="native", **BOOKS).to_rdf_files([(CallbackSink(fail), "json-ld")])
+
+
+class ClosingSink(CallbackSink):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("close_sinks", [False, True])
+def test_close_sinks(close_sinks):
+    def fail(data):
+        raise IOError("queue is down")
+
+    batches = []
+    sink, failing_sink = ClosingSink(batches.append), ClosingSink(fail)
+    csvw = CSVW(**BOOKS)
+    csvw.to_rdf_files([(sink, "nt")], close_sinks=close_sinks)
+    assert sink.closed == close_sinks
+    assert b"".join(batches).decode("utf-8") == csvw.to_rdf("nt")
+    with pytest.raises(IOError):
+        csvw.to_rdf_files([(failing_sink, "nt")], close_sinks=close_sinks)
+    assert failing_sink.closed == close_sinks
+
+
+def test_queued_sink_close_after_error():
+    def fail(data):
+        raise IOError("queue is down")
+
+    sink = ClosingSink(fail)
+    queued = QueuedSink(sink)
+    queued.write_batch(b"x")
+    thread = queued._thread
+    with pytest.raises(IOError):
+        queued.close()
+    # The thread is joined and the sink closed even though it failed
+    assert not thread.is_alive()
+    assert sink.closed
+
+
+def test_pipe_sink(tmpdir):
+    out_path = tmpdir.join("out.nt")
+    with out_path.open("wb") as out:
+        sink = PipeSink("cat", stdout=out)
+        csvw = CSVW(**BOOKS)
+        csvw.to_rdf_files([(sink, "nt")])
+        sink.close()
+    assert out_path.read_binary().decode("utf-8") == csvw.to_rdf("nt")
+    sink = PipeSink(["false"])
+    with pytest.raises(IOError):
+        sink.close()
+
+
+@pytest.mark.parametrize("spool_max_size", [None, 1 << 20])
+def test_riot_into_sink(spool_max_size):
+    batches = []
+    csvw = CSVW(spool_max_size=spool_max_size, **BOOKS)
+    csvw.to_rdf_files([(CallbackSink(batches.append), "turtle")])
+    assert b"".join(batches).decode("utf-8") == csvw.to_rdf("turtle")